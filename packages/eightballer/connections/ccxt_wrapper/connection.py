@@ -17,6 +17,7 @@ from aea.configurations.base import PublicId
 
 from packages.eightballer.protocols.default import DefaultMessage
 from packages.eightballer.protocols.default.custom_types import ErrorCode
+from packages.eightballer.connections.ccxt_wrapper.registry import InFlightRegistry
 from packages.eightballer.connections.ccxt_wrapper.interfaces.interface import ConnectionProtocolInterface
 
 
@@ -56,6 +57,7 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         """Initialize the connection."""
         super().__init__(**kwargs)  # pragma: no cover
         self.exchange_configs = self.configuration.config.get("exchanges")
+        self.in_flight_config = self.configuration.config.get("in_flight", {})
 
         self._balances = None
 
@@ -64,8 +66,7 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         self._orders: asyncio.Queue = asyncio.Queue()
 
         self.done_task_checker: Task | None = None
-        self.task_to_request: dict[Task, Envelope] = {}
-        self.executing_tasks: list[Task] = []
+        self.in_flight = InFlightRegistry.from_config(self.in_flight_config, logger=self.logger)
         self.done_tasks: deque[Task] = deque()
         self.polling_tasks: list[Task] = []
         self.queue: asyncio.Queue | None = None
@@ -78,7 +79,7 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
             loop=self.loop,
             logger=self.logger,
             polling_tasks=self.polling_tasks,
-            executing_tasks=self.executing_tasks,
+            in_flight=self.in_flight,
             queue=self.queue,
             exchanges=self._exchanges,
             done_callback=self._handle_done_task,
@@ -114,13 +115,11 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
 
         self.state = ConnectionStates.disconnecting
 
+        self.in_flight.cancel_all()
         tasks = [
             task
             for task_list in [
-                self.task_to_request.values(),
                 self.done_task_checker,
-                self.task_to_request.keys(),
-                self.executing_tasks,
                 self.done_tasks,
                 self.polling_tasks,
             ]
@@ -129,8 +128,6 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         ]
 
         for task in tasks:
-            if isinstance(task, Envelope):
-                continue
             if not task.cancelled():  # pragma: nocover
                 task.cancel()
 
@@ -141,9 +138,8 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
     async def send(self, envelope: Envelope) -> None:
         """Send an envelope."""
         task = self._handle_req(envelope)
+        self.in_flight.add(task, envelope)
         task.add_done_callback(self._handle_done_task)
-        self.executing_tasks.append(task)
-        self.task_to_request[task] = envelope
 
     async def receive(self, *args: Any, **kwargs: Any) -> Envelope:  # noqa: ARG002
         """Receive a message."""
@@ -163,10 +159,20 @@ class CcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
 
     def _handle_done_task(self, task: Task) -> None:
         """Handle completed task."""
-        request = self.task_to_request.pop(task)
-        self.executing_tasks.remove(task)
-        response_message: Message | None = task.result()
-        response_envelope = self.protocol_interface.build_envelope(request, response_message)
+        request = self.in_flight.pop(task)
+        if request is None:
+            return
+        response_message: Message | None
+        if task.cancelled():
+            # the requester is always answered, whether the deadline passed or the connection is shutting down.
+            if request.expired:
+                error = TimeoutError(f"Request exceeded its {request.timeout}s deadline")
+            else:
+                error = asyncio.CancelledError("Request was cancelled before it completed")
+            response_message = self.get_error_message(error, request.envelope.message)
+        else:
+            response_message = task.result()
+        response_envelope = self.protocol_interface.build_envelope(request.envelope, response_message)
         if response_envelope is None:
             return
         self.logger.debug(f"Placing {response_message} in queue")
@@ -29,7 +29,7 @@ class ConnectionProtocolInterface:  # pylint: disable=too-many-instance-attribut
         self.loop = kwargs.get("loop")
         self.logger = kwargs.get("logger")
         self.polling_tasks = kwargs.get("polling_tasks")
-        self.executing_tasks = kwargs.get("executing_tasks")
+        self.in_flight = kwargs.get("in_flight")
         self.queue = kwargs.get("queue")
         self.exchanges: dict[str, ccxt.Exchange] = kwargs.get("exchanges")
         self.supported_protocols = {
@@ -0,0 +1,172 @@
+"""Registry of the requests currently being handled by the connection."""
+
+import time
+import asyncio
+from typing import Any
+from asyncio import Task
+from dataclasses import dataclass
+
+from aea.mail.base import Envelope
+
+
+DEFAULT_REQUEST_TIMEOUT = 10.0
+# requests that may already have submitted a transaction are never cancelled unless configured.
+DEFAULT_PERFORMATIVE_TIMEOUTS = {
+    "create_order": None,
+    "cancel_order": None,
+    "set_approval": None,
+    "request_bridge": None,
+}
+AGE_PERCENTILES = (50, 90, 99)
+
+
+@dataclass
+class InFlightRequest:
+    """A request being handled by the connection."""
+
+    task: Task
+    envelope: Envelope
+    dialogue_reference: str
+    started_at: float
+    timeout: float | None = None
+    timer: asyncio.TimerHandle | None = None
+    expired: bool = False
+    cancelled: bool = False
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of the values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class InFlightRegistry:
+    """In-flight requests indexed by task and by dialogue reference.
+
+    Every request gets a deadline from the configured timeouts; when it passes,
+    the task is cancelled and flagged as expired so the connection can reply
+    with an error instead of holding the slot.
+    """
+
+    def __init__(
+        self,
+        request_timeout: float | None = DEFAULT_REQUEST_TIMEOUT,
+        performative_timeouts: dict[str, float | None] | None = None,
+        logger: Any = None,
+    ) -> None:
+        """Initialise the registry."""
+        self.request_timeout = request_timeout
+        self.performative_timeouts = {**DEFAULT_PERFORMATIVE_TIMEOUTS, **(performative_timeouts or {})}
+        self.logger = logger
+        self._by_task: dict[Task, InFlightRequest] = {}
+        self._by_dialogue: dict[str, set[Task]] = {}
+        self.completed = 0
+        self.expired = 0
+        self.cancelled = 0
+
+    @classmethod
+    def from_config(cls, config: dict | None, logger: Any = None) -> "InFlightRegistry":
+        """Create the registry from the `in_flight` block of the connection configuration."""
+        config = config or {}
+        return cls(
+            request_timeout=config.get("request_timeout", DEFAULT_REQUEST_TIMEOUT),
+            performative_timeouts=config.get("performative_timeouts"),
+            logger=logger,
+        )
+
+    def __len__(self) -> int:
+        """Number of requests in flight."""
+        return len(self._by_task)
+
+    def __contains__(self, task: Task) -> bool:
+        """Whether the task is in flight."""
+        return task in self._by_task
+
+    def get_timeout(self, envelope: Envelope) -> float | None:
+        """Get the timeout for a request, None means it is never cancelled."""
+        return self.performative_timeouts.get(envelope.message.performative.value, self.request_timeout)
+
+    def add(self, task: Task, envelope: Envelope) -> InFlightRequest:
+        """Register a request and arm its deadline."""
+        loop = asyncio.get_running_loop()
+        request = InFlightRequest(
+            task=task,
+            envelope=envelope,
+            dialogue_reference=envelope.message.dialogue_reference[0],
+            started_at=time.monotonic(),
+            timeout=self.get_timeout(envelope),
+        )
+        if request.timeout is not None:
+            request.timer = loop.call_later(request.timeout, self._expire, task)
+        self._by_task[task] = request
+        self._by_dialogue.setdefault(request.dialogue_reference, set()).add(task)
+        return request
+
+    def pop(self, task: Task) -> InFlightRequest | None:
+        """Remove a finished request."""
+        request = self._by_task.pop(task, None)
+        if request is None:
+            return None
+        if request.timer is not None:
+            request.timer.cancel()
+        tasks = self._by_dialogue.get(request.dialogue_reference)
+        if tasks is not None:
+            tasks.discard(task)
+            if not tasks:
+                del self._by_dialogue[request.dialogue_reference]
+        self.completed += 1
+        return request
+
+    def is_expired(self, task: Task | None) -> bool:
+        """Whether the task was cancelled because its deadline passed."""
+        request = self._by_task.get(task)
+        return request is not None and request.expired
+
+    def _expire(self, task: Task) -> None:
+        request = self._by_task.get(task)
+        if request is None or task.done():
+            return
+        request.expired = True
+        self.expired += 1
+        if self.logger is not None:
+            self.logger.warning(
+                f"Request {request.envelope.message.performative} on dialogue {request.dialogue_reference} "
+                f"exceeded its {request.timeout}s deadline, cancelling."
+            )
+        task.cancel()
+
+    def cancel_by_dialogue(self, dialogue_reference: str) -> int:
+        """Cancel every request of a dialogue, returns how many were cancelled."""
+        tasks = [task for task in self._by_dialogue.get(dialogue_reference, ()) if not task.done()]
+        for task in tasks:
+            self._by_task[task].cancelled = True
+            task.cancel()
+        self.cancelled += len(tasks)
+        return len(tasks)
+
+    def cancel_all(self) -> None:
+        """Cancel every request in flight."""
+        for task in list(self._by_task):
+            if not task.done():
+                self._by_task[task].cancelled = True
+                task.cancel()
+                self.cancelled += 1
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return live counts and the age percentiles of the requests in flight."""
+        now = time.monotonic()
+        ages = [now - request.started_at for request in self._by_task.values()]
+        stats = {
+            "in_flight": len(self._by_task),
+            "dialogues": len(self._by_dialogue),
+            "completed": self.completed,
+            "expired": self.expired,
+            "cancelled": self.cancelled,
+            "oldest_age_seconds": max(ages, default=0.0),
+        }
+        for pct in AGE_PERCENTILES:
+            stats[f"age_p{pct}_seconds"] = percentile(ages, pct)
+        return stats
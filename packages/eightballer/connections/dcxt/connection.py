@@ -1,6 +1,7 @@
 """Connection for dcxt."""
 
 import asyncio
+import functools
 import traceback
 from typing import TYPE_CHECKING, Any, cast
 from asyncio import Task
@@ -14,6 +15,16 @@ from aea.configurations.base import PublicId
 from packages.eightballer.connections.dcxt import dcxt
 from packages.eightballer.protocols.default import DefaultMessage
 from packages.eightballer.protocols.default.custom_types import ErrorCode
+from packages.eightballer.connections.dcxt.executor import BlockingCallExecutor
+from packages.eightballer.connections.dcxt.scheduler import RequestScheduler
+from packages.eightballer.connections.dcxt.registry import InFlightRegistry
+from packages.eightballer.connections.dcxt.single_flight import SingleFlight
+from packages.eightballer.connections.dcxt.dcxt.fees import FeeOracle
+from packages.eightballer.connections.dcxt.dcxt.rpc_pool import RpcPool
+from packages.eightballer.connections.dcxt.dcxt.receipts import ReceiptWatcher
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.portfolio import PortfolioReader
+from packages.eightballer.connections.dcxt.dcxt.block_cache import BlockCache
 from packages.eightballer.connections.dcxt.interfaces.interface import (
     ConnectionProtocolInterface,
 )
@@ -41,6 +52,16 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         """Initialize the connection."""
         super().__init__(**kwargs)  # pragma: no cover
         self.exchange_configs = self.configuration.config.get("exchanges")
+        self.in_flight_config = self.configuration.config.get("in_flight", {})
+        self.executor_config = self.configuration.config.get("executor", {})
+        self.scheduler_config = self.configuration.config.get("scheduler", {})
+        self.single_flight_config = self.configuration.config.get("single_flight", {})
+        self.block_cache_config = self.configuration.config.get("block_cache", {})
+        self.receipt_watcher_config = self.configuration.config.get("receipt_watcher", {})
+        self.fee_oracle_config = self.configuration.config.get("fee_oracle", {})
+        self.rpc_pool_config = self.configuration.config.get("rpc_pool", {})
+        self.sessions_config = self.configuration.config.get("sessions", {})
+        self.token_metadata_path = self.configuration.config.get("token_metadata_path")
 
         self._balances = None
 
@@ -49,24 +70,37 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         self._orders: asyncio.Queue = asyncio.Queue()
 
         self.done_task_checker: Task | None = None
-        self.task_to_request: dict[Task, Envelope] = {}
-        self.executing_tasks: list[Task] = []
+        self.in_flight = InFlightRegistry.from_config(self.in_flight_config, logger=self.logger)
         self.done_tasks: deque[Task] = deque()
         self.polling_tasks: list[Task] = []
         self.queue: asyncio.Queue | None = None
         self.exchange_to_orders = {}
+        self.executor: BlockingCallExecutor | None = None
+        self.scheduler: RequestScheduler | None = None
+        self.block_caches: dict[str, BlockCache] = {}
+        self.receipt_watchers: dict[str, ReceiptWatcher] = {}
+        self.fee_oracles: dict[str, FeeOracle] = {}
+        self.rpc_pools: dict[str, RpcPool] = {}
+        self.sessions: SessionPool | None = None
+        self.portfolio = PortfolioReader(self._exchanges, logger=self.logger)
 
     async def connect(self) -> None:
         """Start done task checker as a coroutine."""
         self.queue = asyncio.Queue()
+        self.executor = BlockingCallExecutor.from_config(self.executor_config, logger=self.logger)
+        self.sessions = SessionPool.from_config(self.sessions_config)
+        self.scheduler = RequestScheduler.from_config(self.scheduler_config, self.exchange_configs, logger=self.logger)
         self.protocol_interface = ConnectionProtocolInterface(
             loop=self.loop,
             logger=self.logger,
             polling_tasks=self.polling_tasks,
-            executing_tasks=self.executing_tasks,
+            in_flight=self.in_flight,
             queue=self.queue,
             exchanges=self._exchanges,
             done_callback=self._handle_done_task,
+            executor=self.executor,
+            single_flight=SingleFlight.from_config(self.single_flight_config),
+            portfolio=self.portfolio,
         )
 
         for exchange_config in self.exchange_configs:
@@ -75,7 +109,18 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
             self.logger.info(f"Connecting to {exchange_name} with ledger_id {ledger_id}")
             try:
                 exchange_class = getattr(dcxt, exchange_name)
-                exchange = exchange_class(**exchange_config, logger=self.logger, loop=self.loop)
+                exchange = exchange_class(
+                    **exchange_config,
+                    logger=self.logger,
+                    loop=self.loop,
+                    executor=self.executor,
+                    sessions=self.sessions,
+                    rpc_pool=self.get_rpc_pool(ledger_id),
+                    block_cache=self.get_block_cache(exchange_config),
+                    receipt_watcher=self.get_receipt_watcher(exchange_config),
+                    fee_oracle=self.get_fee_oracle(exchange_config),
+                    token_metadata_path=self.token_metadata_path,
+                )
             except AttributeError as exc:
                 msg = f"Exchange {exchange_name} not found in dcxt"
                 raise ValueError(msg) from exc
@@ -86,6 +131,55 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
             self.logger.info(f"Successfully connected to {exchange_name} with ledger_id {ledger_id}")
         self.state = ConnectionStates.connected
 
+    def get_rpc_pool(self, ledger_id: str) -> RpcPool | None:
+        """Get the RPC pool shared by the exchanges of a ledger, over every url configured for it."""
+        if ledger_id not in self.rpc_pools:
+            urls = [
+                url
+                for exchange_config in self.exchange_configs
+                if exchange_config.get("ledger_id") == ledger_id
+                for url in [exchange_config.get("rpc_url"), *exchange_config.get("rpc_urls", [])]
+                if url
+            ]
+            if urls:
+                self.rpc_pools[ledger_id] = RpcPool.from_config(urls, self.rpc_pool_config)
+        return self.rpc_pools.get(ledger_id)
+
+    def get_block_cache(self, exchange_config: dict) -> BlockCache | None:
+        """Get the block cache shared by the exchanges of a ledger."""
+        ledger_id = exchange_config.get("ledger_id")
+        rpc_pool = self.get_rpc_pool(ledger_id)
+        if ledger_id not in self.block_caches and rpc_pool is not None:
+            self.block_caches[ledger_id] = BlockCache.from_web3(rpc_pool.web3(), self.block_cache_config)
+        return self.block_caches.get(ledger_id)
+
+    def get_receipt_watcher(self, exchange_config: dict) -> ReceiptWatcher | None:
+        """Get the receipt watcher shared by the exchanges of a ledger, polling on the ledger's block cache head."""
+        ledger_id = exchange_config.get("ledger_id")
+        block_cache = self.get_block_cache(exchange_config)
+        if ledger_id not in self.receipt_watchers and block_cache is not None:
+            self.receipt_watchers[ledger_id] = ReceiptWatcher.from_web3(
+                self.get_rpc_pool(ledger_id).web3(),
+                self.logger,
+                self.receipt_watcher_config,
+                get_block_number=block_cache.head_tracker.head,
+                run_blocking=functools.partial(self.executor.run, ledger_id),
+                loop=self.loop,
+            )
+        return self.receipt_watchers.get(ledger_id)
+
+    def get_fee_oracle(self, exchange_config: dict) -> FeeOracle | None:
+        """Get the fee oracle shared by the exchanges of a ledger, sampling on the ledger's block cache head."""
+        ledger_id = exchange_config.get("ledger_id")
+        block_cache = self.get_block_cache(exchange_config)
+        if ledger_id not in self.fee_oracles and block_cache is not None:
+            self.fee_oracles[ledger_id] = FeeOracle.from_web3(
+                self.get_rpc_pool(ledger_id).web3(),
+                block_cache.head_tracker.head,
+                self.fee_oracle_config,
+            )
+        return self.fee_oracles.get(ledger_id)
+
     async def disconnect(self) -> None:
         """Tear down the connection."""
         if self.is_disconnected:  # pragma: nocover
@@ -93,13 +187,11 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
 
         self.state = ConnectionStates.disconnecting
 
+        self.in_flight.cancel_all()
         tasks = [
             task
             for task_list in [
-                self.task_to_request.values(),
                 self.done_task_checker,
-                self.task_to_request.keys(),
-                self.executing_tasks,
                 self.done_tasks,
                 self.polling_tasks,
             ]
@@ -108,8 +200,6 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         ]
 
         for task in tasks:
-            if isinstance(task, Envelope):
-                continue
             if not task.cancelled():  # pragma: nocover
                 task.cancel()
 
@@ -117,13 +207,22 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
         for exchanges in self._exchanges.values():
             for exchange in exchanges.values():
                 await exchange.close()
+        if self.scheduler is not None:
+            self.scheduler.close()
+        if self.executor is not None:
+            self.executor.shutdown()
+        for receipt_watcher in self.receipt_watchers.values():
+            receipt_watcher.close()
+        for rpc_pool in self.rpc_pools.values():
+            rpc_pool.close()
+        if self.sessions is not None:
+            await self.sessions.close()
 
     async def send(self, envelope: Envelope) -> None:
         """Send an envelope."""
         task = self._handle_req(envelope)
+        self.in_flight.add(task, envelope)
         task.add_done_callback(self._handle_done_task)
-        self.executing_tasks.append(task)
-        self.task_to_request[task] = envelope
 
     async def receive(self, *args: Any, **kwargs: Any) -> Envelope:  # noqa: ARG002
         """Receive a message."""
@@ -132,7 +231,8 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
     async def _execute(self, envelope: Envelope) -> Message:
         try:
             self.protocol_interface.validate_envelope(envelope)
-            return await self.protocol_interface.handle_envelope(envelope)
+            async with self.scheduler.slot(envelope.message):
+                return await self.protocol_interface.handle_envelope(envelope)
         except Exception as error:  # pylint: disable=broad-except
             self.logger.exception(f"Couldn't execute task, e={error} traceback={traceback.print_exc()}")
             return self.get_error_message(error, envelope.message)
@@ -143,10 +243,20 @@ class DcxtConnection(Connection):  # pylint: disable=too-many-instance-attribute
 
     def _handle_done_task(self, task: Task) -> None:
         """Handle completed task."""
-        request = self.task_to_request.pop(task)
-        self.executing_tasks.remove(task)
-        response_message: Message | None = task.result()
-        response_envelope = self.protocol_interface.build_envelope(request, response_message)
+        request = self.in_flight.pop(task)
+        if request is None:
+            return
+        response_message: Message | None
+        if task.cancelled():
+            # the requester is always answered, whether the deadline passed or the connection is shutting down.
+            if request.expired:
+                error = TimeoutError(f"Request exceeded its {request.timeout}s deadline")
+            else:
+                error = asyncio.CancelledError("Request was cancelled before it completed")
+            response_message = self.get_error_message(error, request.envelope.message)
+        else:
+            response_message = task.result()
+        response_envelope = self.protocol_interface.build_envelope(request.envelope, response_message)
         if response_envelope is None:
             return
         self.logger.debug(f"Placing {response_message} in queue")
@@ -0,0 +1,194 @@
+"""Batched ERC-20 approvals: one allowance read for every approval requested together."""
+
+import asyncio
+import threading
+from typing import Any, ClassVar
+from dataclasses import dataclass
+from collections.abc import Callable, Iterable
+
+from web3 import Web3
+from eth_abi import encode
+
+from packages.eightballer.connections.dcxt.utils import function_selector
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError, TransactionReplaced
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import aggregate3
+
+
+ALLOWANCE_SELECTOR = function_selector("allowance(address,address)")
+# requests arriving within this window of the first one are planned together.
+DEFAULT_WINDOW = 0.05
+
+Allowances = dict[tuple[str, str], int]
+
+
+def read_allowances(
+    ledger_api: Any, owner: str, pairs: Iterable[tuple[str, str]], block_identifier: Any = "latest"
+) -> Allowances:
+    """Read the allowance the owner gives each (token, spender) pair in a single Multicall3 call.
+
+    Pairs whose call fails are reported with no allowance.
+    """
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs:
+        return {}
+    calls = [
+        {
+            "target": Web3.to_checksum_address(token),
+            "allowFailure": True,
+            "callData": ALLOWANCE_SELECTOR + encode(["address", "address"], [owner, spender]),
+        }
+        for token, spender in pairs
+    ]
+    results = aggregate3(ledger_api, calls, block_identifier)
+    return {
+        pair: int.from_bytes(data[:32], "big") if ok and len(data) >= 32 else 0
+        for pair, (ok, data) in zip(pairs, results, strict=False)
+    }
+
+
+@dataclass
+class ApprovalRequest:
+    """An approval asked for by an exchange, resolved with the hash of the transaction setting it."""
+
+    exchange: Any
+    token: str
+    spender: str
+    amount: int
+    future: asyncio.Future
+
+
+@dataclass
+class ApprovalsStats:
+    """Counters for an approvals planner."""
+
+    batches: int = 0
+    requests: int = 0
+    already_approved: int = 0
+    submitted: int = 0
+    failed: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dict."""
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "already_approved": self.already_approved,
+            "submitted": self.submitted,
+            "failed": self.failed,
+        }
+
+
+class ApprovalsPlanner:
+    """Plans the approvals of an account on a ledger, for every exchange sending from it.
+
+    Requests arriving together are planned as one batch: every allowance is
+    read in a single multicall, only the pairs short of the amount asked for
+    are approved, once each, and the approvals are sent concurrently with
+    local nonces before their receipts are awaited together.
+    """
+
+    _instances: ClassVar[dict[tuple[str, str], "ApprovalsPlanner"]] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        read: Callable[[list[tuple[str, str]]], Allowances],
+        window: float = DEFAULT_WINDOW,
+    ) -> None:
+        """Initialise the planner; `read(pairs)` reads the allowances of (token, spender) pairs."""
+        self._read = read
+        self.window = window
+        self.stats = ApprovalsStats()
+        self._queue: list[ApprovalRequest] = []
+        self._flush: asyncio.Task | None = None
+
+    @classmethod
+    def for_account(cls, ledger_api: Any, ledger_id: str, owner: str) -> "ApprovalsPlanner":
+        """Get the planner shared by every exchange approving from the account on the ledger."""
+        key = (ledger_id, owner)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(lambda pairs: read_allowances(ledger_api, owner, pairs))
+            return cls._instances[key]
+
+    async def request(self, exchange: Any, token: str, spender: str, amount: int) -> str | None:
+        """Ask for an approval, returning the hash of the transaction setting it, or None if already set.
+
+        The exchange sends with `send_approval(token, spender, amount)` and
+        waits with `wait_for_receipt(tx_hash)`; blocking calls go through its
+        `run_blocking`.
+        """
+        loop = asyncio.get_running_loop()
+        self._queue.append(ApprovalRequest(exchange, token, spender, amount, loop.create_future()))
+        future = self._queue[-1].future
+        if self._flush is None or self._flush.done():
+            self._flush = loop.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self) -> None:
+        await asyncio.sleep(self.window)
+        batch, self._queue = self._queue, []
+        # requests arriving while this batch is carried out start the next one.
+        self._flush = None
+        await self.execute(batch)
+
+    async def execute(self, batch: list[ApprovalRequest]) -> None:
+        """Plan and carry out a batch of requests, resolving each of them."""
+        if not batch:
+            return
+        self.stats.batches += 1
+        self.stats.requests += len(batch)
+        pairs = list(dict.fromkeys((request.token, request.spender) for request in batch))
+        try:
+            allowances = await batch[0].exchange.run_blocking(self._read, pairs)
+        except Exception as error:  # noqa
+            msg = f"Unable to read allowances: {error}"
+            self._fail(batch, RpcError(msg))
+            return
+
+        needed: dict[tuple[str, str], list[ApprovalRequest]] = {}
+        for request in batch:
+            pair = (request.token, request.spender)
+            if allowances.get(pair, 0) >= request.amount:
+                self.stats.already_approved += 1
+                self._resolve([request], None)
+            else:
+                needed.setdefault(pair, []).append(request)
+        await asyncio.gather(*(self._approve(requests) for requests in needed.values()))
+
+    async def _approve(self, requests: list[ApprovalRequest]) -> None:
+        # one transaction covers every request for the pair, at the largest amount asked for.
+        largest = max(requests, key=lambda request: request.amount)
+        exchange = largest.exchange
+        try:
+            tx_hash = await exchange.run_blocking(
+                exchange.send_approval, largest.token, largest.spender, largest.amount
+            )
+            self.stats.submitted += 1
+            receipt = await exchange.wait_for_receipt(tx_hash)
+        except TransactionReplaced as error:
+            self._fail(requests, RpcError(str(error)))
+            return
+        except Exception as error:  # noqa
+            self._fail(requests, error)
+            return
+        if receipt.get("status") == 0:
+            msg = f"Approval failed: {tx_hash}"
+            self._fail(requests, RpcError(msg))
+            return
+        self._resolve(requests, tx_hash)
+
+    def _resolve(self, requests: list[ApprovalRequest], tx_hash: str | None) -> None:
+        for request in requests:
+            if not request.future.done():
+                request.future.set_result(tx_hash)
+
+    def _fail(self, requests: list[ApprovalRequest], error: Exception) -> None:
+        self.stats.failed += len(requests)
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    def get_stats(self) -> dict[str, int]:
+        """Return the counters and the number of queued requests."""
+        return {**self.stats.to_dict(), "queued": len(self._queue)}
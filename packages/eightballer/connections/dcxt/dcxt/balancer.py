@@ -1,7 +1,6 @@
 """Balancer exchange."""
 
 import json
-import time
 import traceback
 from enum import Enum
 from glob import glob
@@ -15,9 +14,10 @@ from datetime import datetime
 from functools import cached_property
 
 import web3
+import numpy as np
 from balpy import balpy
 from aea.contracts.base import Contract
-from aea_ledger_ethereum import EthereumApi, EthereumCrypto
+from aea_ledger_ethereum import EthereumCrypto
 from aea.configurations.loader import ComponentType, ContractConfig, load_component_configuration
 
 from packages.eightballer.protocols.orders.custom_types import Order, Orders, OrderSide, OrderType, OrderStatus
@@ -27,19 +27,18 @@ from packages.eightballer.connections.dcxt.dcxt.exceptions import (
     ApprovalError,
     ExchangeError,
     ConfigurationError,
+    TransactionReplaced,
     SorRetrievalException,
 )
 from packages.eightballer.connections.dcxt.erc_20.contract import Erc20, Erc20Token
 from packages.eightballer.connections.dcxt.dcxt.data.tokens import (
     LEDGER_TO_TOKEN_LIST,
     SupportedLedgers,
-    read_token_list,
-)
-from packages.eightballer.connections.dcxt.dcxt.defi_exchange import (
-    BaseErc20Exchange,
-    signed_tx_to_dict,
-    try_send_signed_transaction,
 )
+from packages.eightballer.connections.dcxt.dcxt.quote_cache import QuoteCache
+from packages.eightballer.connections.dcxt.dcxt.balancer_math import BalancerPoolQuoter
+from packages.eightballer.connections.dcxt.dcxt.balancer_registry import BalancerPoolRegistry
+from packages.eightballer.connections.dcxt.dcxt.defi_exchange import BaseErc20Exchange
 
 
 GAS_PRICE_PREMIUM = 20
@@ -122,6 +121,7 @@ def get_buy_rate(
     amount: float,
     sender_address: str | None = None,
     sor_data: dict | None = None,
+    gas_price: int | None = None,
 ) -> float:
     """Perform a buy of base asset with quote asset."""
     params = get_params_for_swap(
@@ -131,6 +131,7 @@ def get_buy_rate(
         input_amount=amount,
         is_buy=True,
         sender_address=sender_address or bal.address,
+        gas_price=gas_price,
     )
     batch_swap = bal.balSorResponseToBatchSwapFormat(params, sor_data.get("ask")).get("batchSwap", None)
     mc_args = bal.balFormatBatchSwapData(batch_swap)
@@ -150,6 +151,7 @@ def get_sell_rate(
     amount: float,
     sender_address: str | None = None,
     sor_data: dict | None = None,
+    gas_price: int | None = None,
 ) -> None:
     """Perform a sell of base asset for quote asset."""
 
@@ -160,6 +162,7 @@ def get_sell_rate(
         input_amount=amount,
         is_buy=False,
         sender_address=sender_address or bal.address,
+        gas_price=gas_price,
     )
 
     batch_swap = bal.balSorResponseToBatchSwapFormat(params, sor_data.get("bid")).get("batchSwap", None)
@@ -180,9 +183,11 @@ def get_params_for_swap(
     is_buy: bool = False,
     slippage: float = 0.01,
     sender_address: str | None = None,
+    gas_price: int | None = None,
 ) -> dict:
     """Given the data, we get the params for the swap from the balancer exchange."""
-    gas_price = bal.web3.eth.gas_price * 2
+    # the router only uses the gas price to cost its routes, so it gets the price expected to be paid.
+    gas_price = gas_price if gas_price is not None else bal.web3.eth.gas_price
 
     # Use sender_address if provided, otherwise fall back to account address
     address_to_use = sender_address
@@ -210,7 +215,9 @@ def get_params_for_swap(
     }
 
 
-def parse_book_data(data, bal: balpy, quote_asset: str, base_asset: str, amount: float) -> dict:
+def parse_book_data(
+    data, bal: balpy, quote_asset: str, base_asset: str, amount: float, gas_price: int | None = None
+) -> dict:
     """Parse book data."""
     actual_buy_rate, buy_mc_args = get_buy_rate(
         bal=bal,
@@ -218,6 +225,7 @@ def parse_book_data(data, bal: balpy, quote_asset: str, base_asset: str, amount:
         base_asset=base_asset,
         amount=amount,
         sor_data=data,
+        gas_price=gas_price,
     )
     actual_sell_rate, sell_mc_args = get_sell_rate(
         bal=bal,
@@ -225,6 +233,7 @@ def parse_book_data(data, bal: balpy, quote_asset: str, base_asset: str, amount:
         base_asset=base_asset,
         amount=amount,
         sor_data=data,
+        gas_price=gas_price,
     )
     data["buy_mc_args"] = buy_mc_args
     data["sell_mc_args"] = sell_mc_args
@@ -263,10 +272,9 @@ class BalancerClient(BaseErc20Exchange):
                 "etherscanApiKey": self.etherscan_api_key,
             },
         )
-        self.mc = self.bal.mc
-        self.web3 = EthereumApi(
-            address=rpc_url,
-        )
+        self.setup_ledger_services(rpc_url, **kwargs)
+        if self.rpc_pool is not None:
+            self.bal.web3.provider = self.rpc_pool.provider
         self.gas_price = kwargs.get("gas_price", None)
         self.gas_price_premium = kwargs.get("gas_price_premium", GAS_PRICE_PREMIUM)
 
@@ -280,9 +288,14 @@ class BalancerClient(BaseErc20Exchange):
         configuration.directory = contract_dir
         # Not a nice way to do this, but connections cannot have contracts as a dependency.
         self.erc20_contract: Erc20 = Contract.from_config(configuration)
-        self.logger = kwargs.get("logger")
         self.tickers = {}
-        self.raw_token_data = read_token_list(self.bal.web3.eth.chain_id)
+        self.local_quotes = kwargs.get("local_quotes", True)
+        self.quote_cache = QuoteCache.from_config(
+            kwargs.get("quote_cache"), get_head=self.block_cache.head_tracker.head
+        )
+        self.pool_registry = BalancerPoolRegistry.for_deployment(
+            self.balancer_deployment.value, WHITELISTED_POOLS.get(self.ledger_id, [])
+        )
         self.tokens = {
             address: Erc20Token(
                 address=token["address"],
@@ -341,73 +354,83 @@ class BalancerClient(BaseErc20Exchange):
         :return(dict): The pool IDs.
         """
         # We read in the pool IDs from a file for now. we get this file from https://github.com/balancer/frontend-v2/blob/8563b8d33b6bff266148bd48d7ebc89f921374f4/src/lib/config/mainnet/pools.ts#L296
-        with open(
-            Path(__file__).parent / "data" / "balancer" / f"{self.balancer_deployment.value}.json",
-            encoding=DEFAULT_ENCODING,
-        ) as file:
-            json_data = json.loads(file.read())["pools"]
-        if "Element" in json_data:
-            del json_data["Element"]
-        return json_data
+        return self.pool_registry.get_pools_by_type(whitelisted_only=False)
 
-    async def build_tokens(self):
-        """Build the token data."""
-        params = (
-            self.pool_ids
-        )  # however as we are not able to collect for *all* ppols, we just select a few to get the data for.
+    def get_pools_of_interest(self) -> dict[str, list[str]]:
+        """Get the whitelisted pool ids, keyed by pool type."""
+        return self.pool_registry.get_pools_by_type()
+
+    def refresh_pools(self) -> None:
+        """Reload the pool registry from the deployment file."""
+        self.pool_registry.refresh()
+
+    @cached_property
+    def pool_quoter(self) -> BalancerPoolQuoter:
+        """Get the local quoter over the whitelisted pools."""
+        return BalancerPoolQuoter(
+            self.web3,
+            self.spender_address,
+            self.pool_registry,
+            get_decimals=self._get_decimals,
+            block_cache=self.block_cache,
+        )
+
+    def _get_decimals(self, addresses: list[str]) -> dict[str, int]:
+        tokens = {**self.tokens, **self.token_metadata.resolve(addresses)}
+        return {address: tokens[address].decimals for address in addresses if address in tokens}
 
-        # We use olas USDC as the base pair for now.
+    def get_local_book(self, base_asset: str, quote_asset: str, amount: float) -> dict | None:
+        """Get the bid and ask for the amount of base asset from the local pool math.
 
-        pools_of_interest = {}
-        for pool_type in params:
-            for pool_id in params[pool_type]:
-                if pool_id.lower() in WHITELISTED_POOLS[self.ledger_id]:
-                    if pool_type not in pools_of_interest:
-                        pools_of_interest[pool_type] = [pool_id]
-                    else:
-                        pools_of_interest[pool_type].append(pool_id)
+        None if no pool holds the pair or the pools cannot fill the amount on either side.
+        """
+        book = self.pool_quoter.get_book(base_asset, quote_asset, [amount])
+        if book is None:
+            return None
+        bid, ask = float(book[0][0]), float(book[1][0])
+        if not (np.isfinite(bid) and np.isfinite(ask) and bid > 0 and ask > 0):
+            return None
+        return {"actual_buy_rate": ask, "actual_sell_rate": bid}
+
+    def get_sor_book(self, base_asset: str, quote_asset: str, amount: float) -> dict:
+        """Get the routes and rates for the amount of base asset from the SOR."""
+        book_data = self.bal.graph.getTicker(
+            chain=self.balancer_deployment.value,
+            baseAsset=base_asset,
+            quoteAsset=quote_asset,
+            amount=amount,
+        )
+        book_data = parse_book_data(
+            book_data,
+            self.bal,
+            quote_asset=quote_asset,
+            base_asset=base_asset,
+            amount=amount,
+            gas_price=self.fee_oracle.gas_price(),
+        )
+        book_data["pair"] = (base_asset, quote_asset)
+        return book_data
+
+    def get_sor_rates(self, base_asset: str, quote_asset: str, amount: float) -> dict:
+        """Get the bid and ask for the amount of base asset from the SOR, without the routes."""
+        book_data = self.get_sor_book(base_asset, quote_asset, amount)
+        return {"actual_buy_rate": book_data["actual_buy_rate"], "actual_sell_rate": book_data["actual_sell_rate"]}
+
+    async def build_tokens(self):
+        """Build the token data."""
+        pools_of_interest = self.get_pools_of_interest()
 
         if not pools_of_interest:
             msg = "No pools of interest found!"
             raise SorRetrievalException(msg)
         self.bal.getOnchainData(pools_of_interest)
 
-        self.bal.mc.reset()
-
-        for token_address in self.bal.decimals:
-            contract = self.bal.erc20GetContract(token_address)
-            self.bal.mc.addCall(
-                token_address,
-                contract.abi,
-                "name",
-                args=[],
-            )
-        name_data = self.bal.mc.execute()
-        # We now get the symbols
-        self.bal.mc.reset()
-        for token_address in self.bal.decimals:
-            contract = self.bal.erc20GetContract(token_address)
-            self.bal.mc.addCall(
-                token_address,
-                contract.abi,
-                "symbol",
-                args=[],
-            )
-        symbol_data = self.bal.mc.execute()
-
-        # We create an array of ticker data.
-        for address, name, symbol in zip(self.bal.decimals, name_data[0], symbol_data[0], strict=False):
-            if not name or not symbol:
+        # name, symbol and decimals of every pool token, in a single call for the tokens not already known.
+        for address, token in self.token_metadata.resolve(self.bal.decimals).items():
+            if not token.name or not token.symbol:
                 continue
             if address not in self.tokens:
-                self.tokens[address] = Erc20Token(
-                    address=address,
-                    symbol=symbol[0],
-                    name=name[0],
-                    decimals=self.bal.decimals[address],
-                )
-            # We now get get the price for the swap
-            # We now make an erc20 representation of the token.
+                self.tokens[address] = token
 
     async def fetch_tickers(self, *args, **kwargs) -> Tickers:
         """Fetches the tickers.
@@ -423,7 +446,8 @@ class BalancerClient(BaseErc20Exchange):
         del args, kwargs
 
         # We temporarily assume that the tickers are the same as the markets, and use the pool IDs to get the tickers.
-        prices = self.bal.graph.getCurrentPrices(
+        prices = await self.run_blocking(
+            self.bal.graph.getCurrentPrices,
             chain=self.balancer_deployment.value,
         )
         prices = {price["address"]: price["price"] for price in prices}
@@ -456,11 +480,14 @@ class BalancerClient(BaseErc20Exchange):
         self.logger.debug(
             f"Getting price for {input_token_address} -> {output_token_address} for {amount} is_sell: {is_sell}"
         )
-        params = self.get_params_for_swap(
+        params = get_params_for_swap(
+            bal=self.bal,
             input_token_address=input_token_address,
             output_token_address=output_token_address,
             input_amount=amount,
             is_buy=not is_sell,
+            sender_address=self.account.address,
+            gas_price=self.fee_oracle.gas_price(),
         )
         # we query the smart router
         sor_result = {}
@@ -501,18 +528,29 @@ class BalancerClient(BaseErc20Exchange):
         quote_asset = self.look_up_by_symbol(asset_b, self.supported_ledger)
         symbol = f"{base_asset.symbol}/{quote_asset.symbol}"
 
-        book_data = self.bal.graph.getTicker(
-            chain=self.balancer_deployment.value,
-            baseAsset=base_asset.address,
-            quoteAsset=quote_asset.address,
-            amount=params["amount"],
-        )
-        self.last_sor_data = parse_book_data(
-            book_data, self.bal, quote_asset=quote_asset.address, base_asset=base_asset.address, amount=params["amount"]
-        )
+        def _get_book_data():
+            # the SOR is only needed for routes the whitelisted pools cannot quote.
+            if self.local_quotes:
+                try:
+                    book_data = self.get_local_book(base_asset.address, quote_asset.address, params["amount"])
+                except Exception:  # pylint: disable=W0718
+                    self.logger.exception(f"Local quote failed for {symbol}, falling back to the SOR")
+                    book_data = None
+                if book_data is not None:
+                    return book_data
+            # SOR rates for a nearby amount of the pair, fetched moments ago, are reused.
+            return self.quote_cache.get_or_fetch(
+                base_asset.address,
+                quote_asset.address,
+                "book",
+                params["amount"],
+                lambda: self.get_sor_rates(base_asset.address, quote_asset.address, params["amount"]),
+            )
 
-        ask_price = float(self.last_sor_data["actual_buy_rate"])
-        bid_price = float(self.last_sor_data["actual_sell_rate"])
+        book_data = await self.run_blocking(_get_book_data)
+
+        ask_price = float(book_data["actual_buy_rate"])
+        bid_price = float(book_data["actual_sell_rate"])
 
         msg = (
             f"Got bid: {bid_price} and ask: {ask_price} for {symbol} on Balancer "
@@ -574,7 +612,14 @@ class BalancerClient(BaseErc20Exchange):
         if not human_amount:
             msg = "Size not provided to create order"
             raise ValueError(msg)
+        if asset_b is None:
+            msg = "Quote asset not provided to create order"
+            raise ValueError(msg)
         asset_a_token = self.get_token(asset_a)
+        # every order is routed at its own size, with limits and a deadline built for it.
+        sor_data = await self.run_blocking(
+            self.get_sor_book, asset_a_token.address, self.get_token(asset_b).address, human_amount
+        )
 
         is_buy = kwargs.get("side") == "buy"
         if is_buy:
@@ -600,7 +645,7 @@ class BalancerClient(BaseErc20Exchange):
 
         if safe_contract_address:
             try:
-                batch_swap = self.last_sor_data.get("ask") if is_buy else self.last_sor_data.get("bid")
+                batch_swap = sor_data.get("ask") if is_buy else sor_data.get("bid")
                 batch_swap["funds"]["sender"] = safe_contract_address
                 batch_swap["funds"]["recipient"] = safe_contract_address
                 # i think this contains a lot of redundency i.e. extra calls within the bal sdk
@@ -633,11 +678,22 @@ class BalancerClient(BaseErc20Exchange):
                 ),
             )
 
-        mc_args = self.last_sor_data.get("buy_mc_args") if is_buy else self.last_sor_data.get("sell_mc_args")
+        mc_args = sor_data.get("buy_mc_args") if is_buy else sor_data.get("sell_mc_args")
 
-        tx_hash = self._handle_eoa_txn(
+        tx_hash = await self.run_blocking(
+            self._handle_eoa_txn,
             mc_args,
         )
+        self.logger.info(f"Waiting for transaction to be mined: {tx_hash}")
+        try:
+            receipt = await self.wait_for_receipt(tx_hash)
+        except TransactionReplaced as exc:
+            msg = f"Error sending transaction: {exc}"
+            raise ExchangeError(msg) from exc
+        self.logger.debug(f"Receipt: {receipt}")
+        if not receipt["status"]:
+            msg = f"Error sending transaction: Transaction failed: {receipt}"
+            raise ExchangeError(msg)
 
         return Order(
             id=tx_hash,
@@ -710,37 +766,20 @@ class BalancerClient(BaseErc20Exchange):
 
     def _do_txn(self, func):
         self.logger.info(f"Sending transaction to {self.rpc_url}")
-        base_fee = self.bal.web3.eth.fee_history(1, "latest")["baseFeePerGas"][-1]  # Get the current base fee
-        priority_fee = self.bal.web3.to_wei(
-            GAS_PRICE_PREMIUM, "gwei"
-        )  # Set a reasonable priority fee (at least 1 gwei)
-
-        kwargs = {
-            "from": self.account.address,
-            "nonce": self.bal.web3.eth.get_transaction_count(self.account.address),
-            "gas": 850_000,  # Estimated gas limit
-        }
-        if self.ledger_id == SupportedLedgers.GNOSIS:
-            kwargs["maxFeePerGas"] = base_fee + priority_fee
-            kwargs["maxPriorityFeePerGas"] = priority_fee
-        tx_1 = func.build_transaction(kwargs)
-        signed_tx = signed_tx_to_dict(self.account.entity.sign_transaction(tx_1))
-        tx_hash = try_send_signed_transaction(self.web3, signed_tx, raise_on_try=True)
-        # we wait for the transaction to be mined
-        self.logger.info(f"Waiting for transaction to be mined: {tx_hash}")
-        # we wait for the next block to be sure that the transaction nonce is correct
-        current_block = self.bal.web3.eth.block_number
-        while current_block == self.bal.web3.eth.block_number:
-            time.sleep(0.5)
-        self.logger.info("Waiting for transaction to be mined")
-        receipt = self.web3.api.eth.wait_for_transaction_receipt(tx_hash)
-        self.logger.info("Transaction mined")
-        self.logger.debug(f"Receipt: {receipt}")
-        was_successful = receipt["status"]
-        if not was_successful:
-            msg = f"Transaction failed: {receipt}"
-            raise ValueError(msg)
-        return tx_hash
+        fees = self.fee_oracle.fees("high")
+
+        def build(nonce: int) -> dict:
+            return func.build_transaction(
+                {
+                    "from": self.account.address,
+                    "nonce": nonce,
+                    "gas": 850_000,  # Estimated gas limit
+                    **fees,
+                }
+            )
+
+        # the nonce is allocated locally, so the next transaction need not wait for this one to be mined.
+        return self.send_transaction(build)
 
     def _handle_eoa_txn(  # pylint: disable=unused-argument
         self, mc_args
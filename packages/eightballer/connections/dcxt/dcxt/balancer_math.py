@@ -0,0 +1,325 @@
+"""Local Balancer quoting engine, computing swap quotes from on-chain pool state."""
+
+from typing import Any
+from dataclasses import dataclass
+from collections.abc import Callable
+
+import numpy as np
+from web3 import Web3
+from eth_abi import decode, encode
+from eth_abi.exceptions import DecodingError
+
+from packages.eightballer.connections.dcxt.utils import function_selector
+from packages.eightballer.connections.dcxt.dcxt.block_cache import BlockCache
+from packages.eightballer.connections.dcxt.dcxt.balancer_registry import BalancerPoolRegistry
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import aggregate3
+
+
+ONE = 10**18
+# the vault rejects swaps moving more than this share of a weighted pool's balance.
+MAX_WEIGHTED_RATIO = 0.3
+MAX_ITERATIONS = 255
+TOLERANCE = 1e-12
+
+WEIGHTED = "weighted"
+STABLE = "stable"
+POOL_TYPE_MATH = {
+    "Weighted": WEIGHTED,
+    "LiquidityBootstrapping": WEIGHTED,
+    "Investment": WEIGHTED,
+    "Managed": WEIGHTED,
+    "Stable": STABLE,
+    "MetaStable": STABLE,
+    "StablePhantom": STABLE,
+    "ComposableStable": STABLE,
+    "HighAmpComposableStable": STABLE,
+}
+
+
+GET_POOL_TOKENS = function_selector("getPoolTokens(bytes32)")
+GET_SWAP_FEE_PERCENTAGE = function_selector("getSwapFeePercentage()")
+GET_SCALING_FACTORS = function_selector("getScalingFactors()")
+GET_NORMALIZED_WEIGHTS = function_selector("getNormalizedWeights()")
+GET_AMPLIFICATION_PARAMETER = function_selector("getAmplificationParameter()")
+GET_BPT_INDEX = function_selector("getBptIndex()")
+CALLS_PER_POOL = 5
+
+
+def weighted_out_given_in(
+    balance_in: float, weight_in: float, balance_out: float, weight_out: float, amounts_in: np.ndarray
+) -> np.ndarray:
+    """Amounts out of a weighted pool for the amounts in, after fees."""
+    amounts_out = balance_out * (1 - (balance_in / (balance_in + amounts_in)) ** (weight_in / weight_out))
+    return np.where(amounts_in <= balance_in * MAX_WEIGHTED_RATIO, amounts_out, np.nan)
+
+
+def weighted_in_given_out(
+    balance_in: float, weight_in: float, balance_out: float, weight_out: float, amounts_out: np.ndarray
+) -> np.ndarray:
+    """Amounts into a weighted pool for the amounts out, before fees."""
+    valid = amounts_out <= balance_out * MAX_WEIGHTED_RATIO
+    remaining = np.where(valid, balance_out - amounts_out, balance_out)
+    amounts_in = balance_in * ((balance_out / remaining) ** (weight_out / weight_in) - 1)
+    return np.where(valid, amounts_in, np.nan)
+
+
+def stable_invariant(amplification: float, balances: np.ndarray) -> float:
+    """Invariant of a stable pool, by Newton iteration."""
+    n = len(balances)
+    total = float(np.sum(balances))
+    if total == 0:
+        return 0.0
+    amp_times_total = amplification * n
+    invariant = total
+    for _ in range(MAX_ITERATIONS):
+        d_p = invariant ** (n + 1) / (n**n * float(np.prod(balances)))
+        previous = invariant
+        invariant = (
+            (amp_times_total * total + d_p * n) * invariant / ((amp_times_total - 1) * invariant + (n + 1) * d_p)
+        )
+        if abs(invariant - previous) <= TOLERANCE * invariant:
+            break
+    return invariant
+
+
+def stable_balance_given_invariant(
+    amplification: float, balances: np.ndarray, invariant: float, index: int
+) -> np.ndarray:
+    """Balance of token `index` keeping the invariant, for each row of balances of the other tokens."""
+    n = balances.shape[1]
+    others = np.delete(balances, index, axis=1)
+    amp_times_total = amplification * n
+    c = invariant ** (n + 1) / (n**n * np.prod(others, axis=1) * amp_times_total)
+    b = np.sum(others, axis=1) + invariant / amp_times_total
+    balance = np.full(balances.shape[0], invariant)
+    for _ in range(MAX_ITERATIONS):
+        previous = balance
+        balance = (balance * balance + c) / (2 * balance + b - invariant)
+        if np.all(np.abs(balance - previous) <= TOLERANCE * balance):
+            break
+    return balance
+
+
+def stable_out_given_in(
+    amplification: float, balances: np.ndarray, index_in: int, index_out: int, amounts_in: np.ndarray
+) -> np.ndarray:
+    """Amounts out of a stable pool for the amounts in, after fees."""
+    invariant = stable_invariant(amplification, balances)
+    rows = np.tile(balances, (len(amounts_in), 1))
+    rows[:, index_in] += amounts_in
+    return balances[index_out] - stable_balance_given_invariant(amplification, rows, invariant, index_out)
+
+
+def stable_in_given_out(
+    amplification: float, balances: np.ndarray, index_in: int, index_out: int, amounts_out: np.ndarray
+) -> np.ndarray:
+    """Amounts into a stable pool for the amounts out, before fees."""
+    invariant = stable_invariant(amplification, balances)
+    rows = np.tile(balances, (len(amounts_out), 1))
+    rows[:, index_out] -= amounts_out
+    amounts_in = stable_balance_given_invariant(amplification, rows, invariant, index_in) - balances[index_in]
+    return np.where(amounts_out < balances[index_out], amounts_in, np.nan)
+
+
+@dataclass(frozen=True)
+class PoolState:
+    """State of a pool at a block, with balances scaled so that one unit of each token is worth its rate."""
+
+    pool_id: str
+    math: str
+    tokens: tuple[str, ...]
+    balances: np.ndarray
+    rates: np.ndarray
+    swap_fee: float
+    weights: np.ndarray | None = None
+    amplification: float | None = None
+
+    def index(self, token: str) -> int | None:
+        """Index of a token in the pool, None if the pool does not hold it."""
+        token = Web3.to_checksum_address(token)
+        return self.tokens.index(token) if token in self.tokens else None
+
+    def quote_exact_in(self, token_in: str, token_out: str, amounts_in: Any) -> np.ndarray:
+        """Amounts of `token_out` received for each amount of `token_in` sold, in human units."""
+        i, o = self.index(token_in), self.index(token_out)
+        amounts_in = np.asarray(amounts_in, dtype=float) * self.rates[i] * (1 - self.swap_fee)
+        if self.math == WEIGHTED:
+            amounts_out = weighted_out_given_in(
+                self.balances[i], self.weights[i], self.balances[o], self.weights[o], amounts_in
+            )
+        else:
+            amounts_out = stable_out_given_in(self.amplification, self.balances, i, o, amounts_in)
+        return amounts_out / self.rates[o]
+
+    def quote_exact_out(self, token_in: str, token_out: str, amounts_out: Any) -> np.ndarray:
+        """Amounts of `token_in` paid for each amount of `token_out` bought, in human units."""
+        i, o = self.index(token_in), self.index(token_out)
+        amounts_out = np.asarray(amounts_out, dtype=float) * self.rates[o]
+        if self.math == WEIGHTED:
+            amounts_in = weighted_in_given_out(
+                self.balances[i], self.weights[i], self.balances[o], self.weights[o], amounts_out
+            )
+        else:
+            amounts_in = stable_in_given_out(self.amplification, self.balances, i, o, amounts_out)
+        return amounts_in / (1 - self.swap_fee) / self.rates[i]
+
+
+def _decode(types: list[str], result: tuple[bool, bytes]) -> tuple | None:
+    success, data = result
+    if not success or not data:
+        return None
+    return decode(types, data)
+
+
+def parse_pool_state(
+    pool_id: str, math: str, results: list[tuple[bool, bytes]], decimals: dict[str, int]
+) -> PoolState | None:
+    """Build the state of a pool from its multicall results, None if it cannot be quoted locally."""
+    pool_tokens, swap_fee, scaling_factors, params, bpt_index = (
+        _decode(["address[]", "uint256[]", "uint256"], results[0]),
+        _decode(["uint256"], results[1]),
+        _decode(["uint256[]"], results[2]),
+        _decode(["uint256[]"] if math == WEIGHTED else ["uint256", "bool", "uint256"], results[3]),
+        _decode(["uint256"], results[4]),
+    )
+    if pool_tokens is None or swap_fee is None or params is None:
+        return None
+    tokens = [Web3.to_checksum_address(token) for token in pool_tokens[0]]
+    raw_balances = list(pool_tokens[1])
+    if scaling_factors is not None:
+        rates = [
+            factor / 10 ** (36 - decimals[token]) for token, factor in zip(tokens, scaling_factors[0], strict=True)
+        ]
+    else:
+        rates = [1.0] * len(tokens)
+    keep = [index for index in range(len(tokens)) if bpt_index is None or index != bpt_index[0]]
+    # composable stable pools hold their own pool token, which is not part of the swap math.
+    balances = np.array([raw_balances[i] / 10 ** decimals[tokens[i]] * rates[i] for i in keep], dtype=float)
+    return PoolState(
+        pool_id=pool_id,
+        math=math,
+        tokens=tuple(tokens[i] for i in keep),
+        balances=balances,
+        rates=np.array([rates[i] for i in keep], dtype=float),
+        swap_fee=swap_fee[0] / ONE,
+        weights=np.array([params[0][i] / ONE for i in keep], dtype=float) if math == WEIGHTED else None,
+        amplification=params[0] / params[2] if math == STABLE else None,
+    )
+
+
+class BalancerPoolQuoter:
+    """Quotes swaps against a set of Balancer pools from their on-chain state.
+
+    The state of every pool is read in a single Multicall3 call per block and
+    quotes are computed locally, vectorised over ladders of amounts. Only
+    single-pool routes are quoted; anything else is left to the SOR.
+    """
+
+    def __init__(
+        self,
+        ledger_api: Any,
+        vault_address: str,
+        registry: BalancerPoolRegistry,
+        get_decimals: Callable[[list[str]], dict[str, int]],
+        block_cache: BlockCache,
+    ) -> None:
+        """Initialise the quoter over the whitelisted pools of the registry."""
+        self.ledger_api = ledger_api
+        self.vault_address = Web3.to_checksum_address(vault_address)
+        self.registry = registry
+        self.pools = {
+            pool_id: POOL_TYPE_MATH[pool_type]
+            for pool_id, pool_type in registry.whitelisted.items()
+            if pool_type in POOL_TYPE_MATH
+        }
+        self.get_decimals = get_decimals
+        self.block_cache = block_cache
+
+    def _get_calls(self, pool_id: str, math: str) -> list[dict[str, Any]]:
+        pool_address = Web3.to_checksum_address(pool_id[:42])
+        pool_params = GET_NORMALIZED_WEIGHTS if math == WEIGHTED else GET_AMPLIFICATION_PARAMETER
+        return [
+            {
+                "target": self.vault_address,
+                "allowFailure": True,
+                "callData": GET_POOL_TOKENS + encode(["bytes32"], [bytes.fromhex(pool_id[2:])]),
+            },
+            {"target": pool_address, "allowFailure": True, "callData": GET_SWAP_FEE_PERCENTAGE},
+            {"target": pool_address, "allowFailure": True, "callData": GET_SCALING_FACTORS},
+            {"target": pool_address, "allowFailure": True, "callData": pool_params},
+            {"target": pool_address, "allowFailure": True, "callData": GET_BPT_INDEX},
+        ]
+
+    def fetch_states(self) -> dict[str, PoolState]:
+        """Read the state of every pool at the head block in a single call."""
+        calls = [call for pool_id, math in self.pools.items() for call in self._get_calls(pool_id, math)]
+        if not calls:
+            return {}
+        results = aggregate3(self.ledger_api, calls, self.block_cache.head_tracker.head())
+
+        pool_results = {
+            pool_id: results[index * CALLS_PER_POOL : (index + 1) * CALLS_PER_POOL]
+            for index, pool_id in enumerate(self.pools)
+        }
+        tokens = {
+            Web3.to_checksum_address(token)
+            for pool_tokens in (
+                _decode(["address[]", "uint256[]", "uint256"], result[0]) for result in pool_results.values()
+            )
+            if pool_tokens is not None
+            for token in pool_tokens[0]
+        }
+        decimals = self.get_decimals(sorted(tokens))
+        states = {}
+        for pool_id, result in pool_results.items():
+            try:
+                state = parse_pool_state(pool_id, self.pools[pool_id], result, decimals)
+            except (KeyError, DecodingError):
+                # pools with a token lacking metadata, or answering unexpectedly, are left to the SOR.
+                continue
+            if state is not None:
+                states[pool_id] = state
+        self.registry.index_tokens({pool_id: state.tokens for pool_id, state in states.items()})
+        return states
+
+    def get_states(self) -> dict[str, PoolState]:
+        """Get the state of every pool, read at most once per block."""
+        return self.block_cache.get_or_fetch(("balancer_pool_states", self.vault_address), self.fetch_states)
+
+    def get_pools_for(self, token_a: str, token_b: str) -> list[PoolState]:
+        """Get the pools holding both tokens, looked up through the registry's pair index."""
+        states = self.get_states()
+        return [states[pool_id] for pool_id in self.registry.get_pools_for(token_a, token_b) if pool_id in states]
+
+    def quote_exact_in(self, token_in: str, token_out: str, amounts_in: Any) -> np.ndarray | None:
+        """Best amounts out across the pools holding both tokens, NaN where none can fill, None if none holds them."""
+        pools = self.get_pools_for(token_in, token_out)
+        if not pools:
+            return None
+        quotes = np.vstack([pool.quote_exact_in(token_in, token_out, amounts_in) for pool in pools])
+        best = np.max(np.where(np.isnan(quotes), -np.inf, quotes), axis=0)
+        return np.where(np.isinf(best), np.nan, best)
+
+    def quote_exact_out(self, token_in: str, token_out: str, amounts_out: Any) -> np.ndarray | None:
+        """Cheapest amounts in across the pools holding both tokens.
+
+        NaN where none can fill, None if none holds them.
+        """
+        pools = self.get_pools_for(token_in, token_out)
+        if not pools:
+            return None
+        quotes = np.vstack([pool.quote_exact_out(token_in, token_out, amounts_out) for pool in pools])
+        best = np.min(np.where(np.isnan(quotes), np.inf, quotes), axis=0)
+        return np.where(np.isinf(best), np.nan, best)
+
+    def get_book(self, base: str, quote: str, amounts: Any) -> tuple[np.ndarray, np.ndarray] | None:
+        """Bid and ask prices of `base` in `quote` for each amount of base, None if no pool holds the pair.
+
+        Amounts the pools cannot fill come out as a zero bid and an infinite ask.
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        sold = self.quote_exact_in(base, quote, amounts)
+        bought = self.quote_exact_out(quote, base, amounts)
+        if sold is None or bought is None:
+            return None
+        return np.nan_to_num(sold, nan=0.0) / amounts, np.where(np.isnan(bought), np.inf, bought) / amounts
@@ -0,0 +1,109 @@
+"""Registry of the Balancer pools known to dcxt, indexed by type, id and token pair."""
+
+import json
+import threading
+from typing import ClassVar
+from pathlib import Path
+from collections.abc import Iterable
+
+from web3 import Web3
+
+
+DEFAULT_ENCODING = "utf-8"
+DATA_DIR = Path(__file__).parent / "data" / "balancer"
+# pool types listed in the deployment files that are not actual pools.
+EXCLUDED_POOL_TYPES = frozenset({"Element"})
+
+
+def get_pair_key(token_a: str, token_b: str) -> frozenset[str]:
+    """Get the key of an unordered token pair."""
+    return frozenset({Web3.to_checksum_address(token_a), Web3.to_checksum_address(token_b)})
+
+
+class BalancerPoolRegistry:
+    """Pools of a Balancer deployment, loaded once and kept in memory.
+
+    Pool ids and types come from the deployment file under `data/balancer`;
+    the tokens of each pool are only known once they have been read on chain,
+    after which pools can be looked up by unordered token pair.
+    """
+
+    _instances: ClassVar[dict[tuple[str, frozenset[str]], "BalancerPoolRegistry"]] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, deployment: str, whitelist: Iterable[str] | None = None, data_dir: Path = DATA_DIR) -> None:
+        """Initialise the registry, loading the deployment file."""
+        self.deployment = deployment
+        self.whitelist = frozenset(pool_id.lower() for pool_id in whitelist) if whitelist is not None else None
+        self.path = Path(data_dir) / f"{deployment}.json"
+        self._lock = threading.Lock()
+        self.by_type: dict[str, list[str]] = {}
+        self.by_id: dict[str, str] = {}
+        self.by_pair: dict[frozenset[str], list[str]] = {}
+        self.tokens: dict[str, tuple[str, ...]] = {}
+        self.refresh()
+
+    @classmethod
+    def for_deployment(cls, deployment: str, whitelist: Iterable[str] | None = None) -> "BalancerPoolRegistry":
+        """Get the registry shared by every client of the deployment, loading it on first use."""
+        key = (deployment, frozenset(pool_id.lower() for pool_id in whitelist or ()))
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(deployment, whitelist)
+            return cls._instances[key]
+
+    def refresh(self) -> None:
+        """Reload the deployment file, dropping the token index."""
+        pools = {}
+        if self.path.exists():
+            with open(self.path, encoding=DEFAULT_ENCODING) as file:
+                pools = json.loads(file.read())["pools"]
+        by_type = {
+            pool_type: list(pool_ids) for pool_type, pool_ids in pools.items() if pool_type not in EXCLUDED_POOL_TYPES
+        }
+        with self._lock:
+            self.by_type = by_type
+            self.by_id = {pool_id.lower(): pool_type for pool_type, pool_ids in by_type.items() for pool_id in pool_ids}
+            self.by_pair = {}
+            self.tokens = {}
+
+    def get_pool_type(self, pool_id: str) -> str | None:
+        """Get the type of a pool, None if the deployment does not list it."""
+        return self.by_id.get(pool_id.lower())
+
+    @property
+    def whitelisted(self) -> dict[str, str]:
+        """The whitelisted pools, keyed by id and valued by type."""
+        return {
+            pool_id: pool_type
+            for pool_id, pool_type in self.by_id.items()
+            if self.whitelist is None or pool_id in self.whitelist
+        }
+
+    def get_pools_by_type(self, whitelisted_only: bool = True) -> dict[str, list[str]]:
+        """Get the pool ids keyed by pool type."""
+        if not whitelisted_only:
+            return {pool_type: list(pool_ids) for pool_type, pool_ids in self.by_type.items()}
+        pools_by_type: dict[str, list[str]] = {}
+        for pool_id, pool_type in self.whitelisted.items():
+            pools_by_type.setdefault(pool_type, []).append(pool_id)
+        return pools_by_type
+
+    def index_tokens(self, pool_tokens: dict[str, Iterable[str]]) -> None:
+        """Record the tokens held by pools, so they can be looked up by pair."""
+        with self._lock:
+            for pool_id, tokens in pool_tokens.items():
+                pool_id = pool_id.lower()
+                tokens = tuple(Web3.to_checksum_address(token) for token in tokens)
+                if self.tokens.get(pool_id) == tokens:
+                    continue
+                self.tokens[pool_id] = tokens
+                for i, token_a in enumerate(tokens):
+                    for token_b in tokens[i + 1 :]:
+                        pool_ids = self.by_pair.setdefault(get_pair_key(token_a, token_b), [])
+                        if pool_id not in pool_ids:
+                            pool_ids.append(pool_id)
+
+    def get_pools_for(self, token_a: str, token_b: str) -> list[str]:
+        """Get the ids of the indexed pools holding both tokens."""
+        return list(self.by_pair.get(get_pair_key(token_a, token_b), ()))
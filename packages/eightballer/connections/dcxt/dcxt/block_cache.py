@@ -0,0 +1,165 @@
+"""Block-scoped cache for on-chain reads."""
+
+import time
+import threading
+from typing import Any
+from dataclasses import dataclass
+from collections.abc import Hashable, Callable
+
+from web3 import Web3
+
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_MAX_ENTRIES = 1024
+
+
+class HeadTracker:
+    """Tracks the head block of a ledger.
+
+    The block number is polled at most once per `poll_interval`, however many
+    callers ask for it, so reads within that window may be served from the
+    previous head.
+    """
+
+    def __init__(
+        self,
+        get_block_number: Callable[[], int],
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the tracker."""
+        self._get_block_number = get_block_number
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._head: int | None = None
+        self._checked_at: float | None = None
+
+    @property
+    def last_seen(self) -> int | None:
+        """The last head seen, without polling."""
+        return self._head
+
+    def head(self) -> int:
+        """Get the head block, polling the ledger if the last poll is older than the interval."""
+        with self._lock:
+            now = self._clock()
+            if self._checked_at is None or now - self._checked_at >= self.poll_interval:
+                self._observe(self._get_block_number())
+                self._checked_at = now
+            return self._head
+
+    def observe(self, block_number: int) -> None:
+        """Record a block seen elsewhere, e.g. in a transaction receipt."""
+        with self._lock:
+            self._observe(block_number)
+
+    def _observe(self, block_number: int | None) -> None:
+        if block_number is None:
+            return
+        if self._head is None or block_number > self._head:
+            self._head = block_number
+
+
+@dataclass
+class BlockCacheStats:
+    """Counters for a block cache."""
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    invalidations: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class BlockCache:
+    """Caches reads whose answer cannot change within a block.
+
+    Entries belong to the head block they were read at and are all dropped
+    as soon as the head tracker sees a new block.
+    """
+
+    def __init__(
+        self,
+        head_tracker: HeadTracker,
+        enabled: bool = True,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        """Initialise the cache."""
+        self.head_tracker = head_tracker
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.stats = BlockCacheStats()
+        self._lock = threading.Lock()
+        self._block: int | None = None
+        self._generation = 0
+        self._entries: dict[Hashable, Any] = {}
+
+    @classmethod
+    def from_web3(cls, web3: Web3, config: dict | None = None) -> "BlockCache":
+        """Create a cache whose head tracker polls the given web3 instance."""
+        config = config or {}
+        return cls(
+            HeadTracker(
+                lambda: web3.eth.block_number,
+                poll_interval=config.get("poll_interval", DEFAULT_POLL_INTERVAL),
+            ),
+            enabled=config.get("enabled", True),
+            max_entries=config.get("max_entries", DEFAULT_MAX_ENTRIES),
+        )
+
+    @classmethod
+    def from_rpc_url(cls, rpc_url: str, config: dict | None = None) -> "BlockCache":
+        """Create a cache tracking the head of the ledger behind the rpc url."""
+        return cls.from_web3(Web3(Web3.HTTPProvider(rpc_url)), config)
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], use_cache: bool = True) -> Any:
+        """Return the value read at the current head, calling `fetch` on a miss."""
+        if not self.enabled or not use_cache:
+            self.stats.bypassed += 1
+            return fetch()
+        block = self.head_tracker.head()
+        with self._lock:
+            if block != self._block:
+                self._roll(block)
+            if key in self._entries:
+                self.stats.hits += 1
+                return self._entries[key]
+            self.stats.misses += 1
+            generation = self._generation
+        value = fetch()
+        with self._lock:
+            # anything invalidated while the read was in flight is not stored.
+            if generation == self._generation and len(self._entries) < self.max_entries:
+                self._entries[key] = value
+        return value
+
+    def _roll(self, block: int) -> None:
+        if self._entries:
+            self.stats.invalidations += 1
+        self._entries.clear()
+        self._generation += 1
+        self._block = block
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        """Drop an entry, or every entry, e.g. after sending a transaction that changes them."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the counters and the block the entries belong to."""
+        return {**self.stats.to_dict(), "block": self._block, "entries": len(self._entries)}
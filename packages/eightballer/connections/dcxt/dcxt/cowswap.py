@@ -1,5 +1,6 @@
 """CowSwap client for swapping tokens on the CowSwap DEX."""
 
+import time
 import asyncio
 import logging
 import datetime
@@ -8,12 +9,13 @@ from ssl import SSLWantReadError
 from enum import Enum
 from typing import get_args
 from functools import lru_cache
+from dataclasses import dataclass
 
 import httpx
 import httpcore
 import rich_click as click
 from rich import print
-from aea_ledger_ethereum import Address, EthereumApi, EthereumCrypto
+from aea_ledger_ethereum import Address, EthereumApi
 from cowdao_cowpy.cow.swap import (
     Envs,
     Order as CowOrder,
@@ -28,11 +30,13 @@ from cowdao_cowpy.common.constants import CowContractAddress
 from cowdao_cowpy.common.api.errors import UnexpectedResponseError
 from cowdao_cowpy.order_book.config import OrderBookAPIConfigFactory
 from cowdao_cowpy.order_book.generated.model import (
+    Order as OrderBookOrder,
     OrderStatus as CowOrderStatus,
     TokenAmount,
     OrderQuoteSide1,
     OrderQuoteRequest,
     OrderQuoteResponse,
+    OrderQuoteValidity1,
     OrderQuoteSideKindSell,
 )
 
@@ -46,9 +50,16 @@ from packages.eightballer.connections.dcxt.dcxt.one_inch import (
     increase_allowance,
 )
 from packages.eightballer.protocols.tickers.custom_types import Ticker, Tickers
-from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError, ExchangeNotAvailable
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.exceptions import (
+    RpcError,
+    OrderNotFound,
+    RequestTimeout,
+    ExchangeNotAvailable,
+)
 from packages.eightballer.connections.dcxt.erc_20.contract import Erc20, Erc20Token
 from packages.eightballer.connections.dcxt.dcxt.data.tokens import NATIVE_ETH, LEDGER_TO_WRAPPER, SupportedLedgers
+from packages.eightballer.connections.dcxt.dcxt.order_tracker import OrderUpdate, OrderTracker
 from packages.eightballer.connections.dcxt.dcxt.defi_exchange import BaseErc20Exchange
 
 
@@ -56,6 +67,11 @@ APP_DATA = "0xf142fb87fd167a929b0aacb90fca1e6bf963fcf0513a57af7e4223897df4d93e"
 
 MAX_ORDER_ATTEMPTS = 5
 MAX_QUOTE_ATTEMPTS = 5
+DEFAULT_QUOTE_DEADLINE = 5.0
+# the oldest price a side that misses its deadline may fall back to.
+DEFAULT_MAX_QUOTE_STALENESS = 30.0
+QUOTE_PATH = "/api/v1/quote"
+ORDER_PATH = "/api/v1/orders/{uid}"
 SLIPPAGE_TOLERANCE = 0.00125
 # 1bps fee applied to all trades
 SPENDER = {
@@ -142,6 +158,73 @@ async def get_quote(
         raise ExchangeNotAvailable(msg) from err
 
 
+async def post_quote(
+    sessions: SessionPool,
+    order_book_api: OrderBookApi,
+    buy_token: Erc20Token,
+    sell_token: Erc20Token,
+    sell_amount_int: int,
+    address: Address,
+) -> OrderQuoteResponse:
+    """Get a quote for a token swap through the shared session pool, without retries."""
+    payload = {
+        **order_book_api.serialize_model(
+            OrderQuoteRequest(
+                sellToken=sell_token.address,
+                buyToken=buy_token.address,
+                from_=address,  # type: ignore # pyright doesn't recognize `populate_by_name=True`.
+            )
+        ),
+        **order_book_api.serialize_model(
+            OrderQuoteSide1(
+                kind=OrderQuoteSideKindSell.sell,
+                sellAmountBeforeFee=TokenAmount(str(sell_amount_int)),
+            )
+        ),
+        **order_book_api.serialize_model(OrderQuoteValidity1(validTo=None)),
+    }
+    try:
+        response = await sessions.post(order_book_api.config.get_base_url() + QUOTE_PATH, json=payload)
+    except httpx.TransportError as error:
+        msg = "CoW Swap API is not available"
+        raise ExchangeNotAvailable(msg) from error
+    if response.status_code != 200:
+        msg = f"Failed to get quote: {response.status_code} - {response.text}"
+        raise RpcError(msg)
+    return order_book_api.deserialize_model(response.json(), OrderQuoteResponse)
+
+
+def get_valid_to(uid: str) -> int:
+    """Read the expiry of an order from the last 4 bytes of its uid."""
+    return int(uid[-8:], 16)
+
+
+async def get_order(sessions: SessionPool, order_book_api: OrderBookApi, uid: str) -> OrderBookOrder:
+    """Get an order by uid through the shared session pool."""
+    try:
+        response = await sessions.get(order_book_api.config.get_base_url() + ORDER_PATH.format(uid=uid))
+    except httpx.TransportError as error:
+        msg = "CoW Swap API is not available"
+        raise ExchangeNotAvailable(msg) from error
+    if response.status_code == 404:
+        msg = f"CoW Swap order {uid} not found"
+        raise OrderNotFound(msg)
+    if response.status_code != 200:
+        msg = f"Failed to get order {uid}: {response.status_code} - {response.text}"
+        raise ExchangeNotAvailable(msg)
+    return order_book_api.deserialize_model(response.json(), OrderBookOrder)
+
+
+@dataclass
+class ReferencePrice:
+    """The last quoted bid and ask of a pair, and when each side was quoted."""
+
+    bid: float
+    ask: float
+    bid_at: float
+    ask_at: float
+
+
 class CowSwapClient(BaseErc20Exchange):
     """Class for interacting with the 1inch API."""
 
@@ -206,14 +289,20 @@ class CowSwapClient(BaseErc20Exchange):
         params = kwargs.get("params", {})
         amount = amoun if params and (amoun := params.get("amount")) else 0.5
         sell_amount_int = int(asset_a.to_machine(amount))
-        buy_quote = await self._get_quote(asset_a, asset_b, sell_amount_int)
-        bid_price = self.from_quote_to_rates(buy_quote, asset_a, asset_b, is_buying=True)
+        pair = (asset_a.address, asset_b.address)
+        if self.concurrent_quotes and pair in self.reference_prices:
+            bid_price, ask_price = await self._get_concurrent_rates(asset_a, asset_b, sell_amount_int)
+        else:
+            buy_quote = await self._get_quote(asset_a, asset_b, sell_amount_int)
+            bid_price = self.from_quote_to_rates(buy_quote, asset_a, asset_b, is_buying=True)
 
-        sell_quote = await self._get_quote(asset_b, asset_a, int(buy_quote.quote.buyAmount.root))
-        ask_price = self.from_quote_to_rates(sell_quote, asset_b, asset_a, is_buying=False)
+            sell_quote = await self._get_quote(asset_b, asset_a, int(buy_quote.quote.buyAmount.root))
+            ask_price = self.from_quote_to_rates(sell_quote, asset_b, asset_a, is_buying=False)
 
-        self.last_buy_quote = buy_quote
-        self.last_sell_quote = sell_quote
+            self.last_buy_quote = buy_quote
+            self.last_sell_quote = sell_quote
+            now = self.clock()
+            self.reference_prices[pair] = ReferencePrice(bid_price, ask_price, now, now)
 
         timestamp = datetime.datetime.now(tz=datetime.UTC)
         return Ticker(
@@ -228,6 +317,72 @@ class CowSwapClient(BaseErc20Exchange):
             datetime=timestamp.isoformat(),
         )
 
+    async def _get_concurrent_rates(
+        self, asset_a: Erc20Token, asset_b: Erc20Token, sell_amount_int: int
+    ) -> tuple[float, float]:
+        """Quote both sides at once, sizing the sell of B from the pair's last bid instead of the first quote.
+
+        A side that misses its deadline falls back to its last quoted price, unless
+        that price is older than `max_quote_staleness`.
+        """
+        reference = self.reference_prices[(asset_a.address, asset_b.address)]
+        sell_b_int = int(asset_b.to_machine(asset_a.to_human(sell_amount_int) * reference.bid))
+        buy_quote, sell_quote = await asyncio.gather(
+            self._post_quote_within_deadline(asset_a, asset_b, sell_amount_int),
+            self._post_quote_within_deadline(asset_b, asset_a, sell_b_int),
+            return_exceptions=True,
+        )
+        if isinstance(buy_quote, RequestTimeout) and isinstance(sell_quote, RequestTimeout):
+            msg = f"Both CoW Swap quotes for {asset_a.symbol}/{asset_b.symbol} missed their deadline"
+            raise RequestTimeout(msg)
+        now = self.clock()
+        if isinstance(buy_quote, RequestTimeout):
+            bid_price = self._fall_back(buy_quote, reference.bid, reference.bid_at, now)
+        elif isinstance(buy_quote, BaseException):
+            raise buy_quote
+        else:
+            self.last_buy_quote = buy_quote
+            bid_price = self.from_quote_to_rates(buy_quote, asset_a, asset_b, is_buying=True)
+            reference.bid, reference.bid_at = bid_price, now
+        if isinstance(sell_quote, RequestTimeout):
+            ask_price = self._fall_back(sell_quote, reference.ask, reference.ask_at, now)
+        elif isinstance(sell_quote, BaseException):
+            raise sell_quote
+        else:
+            self.last_sell_quote = sell_quote
+            ask_price = self.from_quote_to_rates(sell_quote, asset_b, asset_a, is_buying=False)
+            reference.ask, reference.ask_at = ask_price, now
+        return bid_price, ask_price
+
+    def _fall_back(self, error: RequestTimeout, price: float, quoted_at: float, now: float) -> float:
+        """Use the last price of a side that missed its deadline, while it is recent enough."""
+        age = now - quoted_at
+        if age > self.max_quote_staleness:
+            msg = f"{error}, and its last price is {age:.0f}s old"
+            raise RequestTimeout(msg) from error
+        self.logger.warning(f"{error}, using its last price from {age:.0f}s ago.")
+        return price
+
+    async def _post_quote_within_deadline(
+        self, asset_a: Erc20Token, asset_b: Erc20Token, sell_amount_int: int
+    ) -> OrderQuoteResponse:
+        """Quote a swap through the pooled client, giving up after the per-side deadline."""
+        try:
+            return await asyncio.wait_for(
+                post_quote(
+                    self.sessions,
+                    self.order_book_api,
+                    buy_token=asset_b,
+                    sell_token=asset_a,
+                    sell_amount_int=sell_amount_int,
+                    address=self.account.entity.address,
+                ),
+                timeout=self.quote_deadline,
+            )
+        except TimeoutError as error:
+            msg = f"CoW Swap quote of {asset_a.symbol} for {asset_b.symbol} missed its deadline"
+            raise RequestTimeout(msg) from error
+
     async def _get_quote(self, asset_a, asset_b, sell_amount_int):
         try:
             return await get_quote(
@@ -310,7 +465,7 @@ class CowSwapClient(BaseErc20Exchange):
             self.logger.exception(f"Failed to submit order: {error}")
             return await self.create_order(attempts=attempts + 1, **kwargs)
 
-        return self._parse_order(
+        order = self._parse_order(
             order=raw_order,
             exchange_id=self.exchange_id,
             symbol=symbol,
@@ -319,6 +474,8 @@ class CowSwapClient(BaseErc20Exchange):
             side=side,
             ledger_id=self.ledger_id,
         )
+        self.order_tracker.track(order.id, order=order, valid_to=get_valid_to(order.id))
+        return order
 
     @lru_cache(maxsize=128)  # noqa
     def get_assets_from_symbols(self, symbol_a, symbol_b):
@@ -411,9 +568,42 @@ class CowSwapClient(BaseErc20Exchange):
         ]
 
     async def fetch_open_orders(self, **kwargs):
-        """Fetch open orders."""
+        """Fetch open orders.
+
+        The account's order history is pulled once to seed the order tracker. After that only live orders are
+        polled, and the orders returned are the live ones plus those that closed since the last call.
+        """
         account = kwargs.get("params", {}).get("account", self.account.entity.address)
+        if account != self.account.entity.address or not self.orders_seeded:
+            pre_orders = await self._fetch_account_orders(account)
+            parsed_orders = [
+                self._parse_order(
+                    **order,
+                    exchange_id=self.exchange_id,
+                )
+                for order in pre_orders
+            ]
+            if account == self.account.entity.address:
+                for order, parsed_order in zip(pre_orders, parsed_orders, strict=True):
+                    self.order_tracker.track(
+                        parsed_order.id,
+                        status=order["status"],
+                        order=parsed_order,
+                        valid_to=order["order"].validTo,
+                        created_at=datetime.datetime.fromisoformat(order["order"].creationDate).timestamp(),
+                    )
+                self.orders_seeded = True
+            return Orders(
+                orders=parsed_orders,
+            )
+
+        changed = await self.order_tracker.poll(self._fetch_order_update)
+        closed = [entry.order for entry in changed if entry.is_terminal]
+        return Orders(
+            orders=[entry.order for entry in self.order_tracker.live] + closed,
+        )
 
+    async def _fetch_account_orders(self, account: str) -> list[dict]:
         try:
             orders: list[CowOrder] = await self.order_book_api.get_orders_by_owner(
                 owner=account,
@@ -421,19 +611,20 @@ class CowSwapClient(BaseErc20Exchange):
         except (httpcore.ReadTimeout, httpx.ReadTimeout, UnexpectedResponseError, SSLWantReadError) as error:
             msg = "CoW Swap API is not available"
             raise ExchangeNotAvailable(msg) from error
+        return self._process_submitted_orders(orders)
 
-        pre_orders = self._process_submitted_orders(orders)
-
-        parsed_orders = [
-            self._parse_order(
-                **order,
-                exchange_id=self.exchange_id,
-            )
-            for order in pre_orders
-        ]
-        return Orders(
-            orders=parsed_orders,
-        )
+    async def _fetch_order_update(self, uid: str) -> OrderUpdate:
+        """Get the current state of a tracked order."""
+        try:
+            cow_order = await get_order(self.sessions, self.order_book_api, uid)
+        except OrderNotFound:
+            self.logger.warning(f"CoW Swap order {uid} is no longer known to the order book.")
+            order = self.order_tracker.get(uid).order
+            if order is not None:
+                order.status = OrderStatus.CANCELLED
+            return OrderUpdate(OrderStatus.CANCELLED, order)
+        [order] = self._process_submitted_orders([cow_order])
+        return OrderUpdate(order["status"], self._parse_order(**order, exchange_id=self.exchange_id), cow_order.validTo)
 
     async def fetch_positions(self, **kwargs):
         """Fetch positions."""
@@ -452,6 +643,14 @@ class CowSwapClient(BaseErc20Exchange):
         self.order_book_api = OrderBookApi(
             OrderBookAPIConfigFactory.get_config(env=env, chain_id=SupportedChainId(self.chain.value[0]))
         )
+        self.concurrent_quotes = kwargs.get("concurrent_quotes", False)
+        self.quote_deadline = kwargs.get("quote_deadline", DEFAULT_QUOTE_DEADLINE)
+        self.max_quote_staleness = kwargs.get("max_quote_staleness", DEFAULT_MAX_QUOTE_STALENESS)
+        self.clock = time.monotonic
+        # last prices of each pair, used to size the second side of concurrent quotes.
+        self.reference_prices: dict[tuple[str, str], ReferencePrice] = {}
+        self.order_tracker = OrderTracker.from_config(kwargs.get("order_tracker"))
+        self.orders_seeded = False
 
     @property
     def spender_address(self):
@@ -506,20 +705,15 @@ def main(
 
     ledger = SupportedLedgers(ledger_id)
 
-    api = EthereumApi(
-        chain_id=LEDGER_TO_CHAIN_ID[ledger],
-        address=LEDGER_TO_RPC[ledger],
-    )
-    crypto = EthereumCrypto(
-        private_key_path="ethereum_private_key.txt",
-    )
-
     logger = logging.getLogger(__name__)
 
     # We make sure to log to the console
 
     logger.setLevel("INFO")
     logger.addHandler(logging.StreamHandler())
+    # the approval is sent through the exchange, so it shares its nonces and receipt watcher.
+    exchange = CowSwapClient(ledger.value, LEDGER_TO_RPC[ledger], "ethereum_private_key.txt", logger)
+    api, crypto = exchange.web3, exchange.account
     erc_20 = load_contract(PublicId.from_str("eightballer/erc_20:0.1.0"))
 
     OrderBookApi()
@@ -545,12 +739,11 @@ def main(
     print(f"Current allowance: {allowance}")
     if allowance < amount:
         print(f"Allowance is sufficient: {allowance} > {amount}")
-        result = increase_allowance(
+        result, _txn_hash = increase_allowance(
+            exchange,
             token_address=sell_token.address,
             spender=SPENDER[ledger],
             amount=amount * 1e18,
-            ledger_api=api,
-            crypto=crypto,
         )
         if not result:
             msg = "Failed to increase allowance"
@@ -3,7 +3,10 @@
 import json
 import functools
 from enum import Enum
+from types import MappingProxyType
 from pathlib import Path
+from dataclasses import dataclass
+from collections.abc import Mapping
 
 
 class SupportedLedgers(Enum):
@@ -170,15 +173,68 @@ TOKEN_LIST_PATH = Path(__file__).parent / "token_list.json"
 DEFAULT_ENCODING = "utf-8"
 
 
-@functools.lru_cache
-def read_token_list(chain_id: int):
-    """Read the token list."""
+@dataclass(frozen=True)
+class TokenIndex:
+    """Read-only index of the token list of a single chain."""
+
+    chain_id: int
+    tokens: Mapping[str, dict]
+    by_address: Mapping[str, dict]
+    by_symbol: Mapping[str, tuple[dict, ...]]
+
+    @classmethod
+    def build(cls, chain_id: int, token_list: list[dict]) -> "TokenIndex":
+        """Build the index from the entries of the token list for the chain, keeping their order."""
+        tokens, by_address, by_symbol = {}, {}, {}
+        for token in token_list:
+            tokens[token["address"]] = token
+            by_address[token["address"].lower()] = token
+            by_symbol.setdefault(token["symbol"].upper(), []).append(token)
+        return cls(
+            chain_id=chain_id,
+            tokens=MappingProxyType(tokens),
+            by_address=MappingProxyType(by_address),
+            by_symbol=MappingProxyType({symbol: tuple(matches) for symbol, matches in by_symbol.items()}),
+        )
+
+    def get_by_address(self, address: str) -> dict | None:
+        """Get a token by address, checksummed or not."""
+        return self.by_address.get(address.lower())
+
+    def get_all_by_symbol(self, symbol: str) -> tuple[dict, ...]:
+        """Get every token sharing a symbol, case-insensitively."""
+        return self.by_symbol.get(symbol.upper(), ())
+
+    def get_by_symbol(self, symbol: str) -> dict | None:
+        """Get the first token with the symbol, preferring an exact case match."""
+        matches = self.get_all_by_symbol(symbol)
+        for token in matches:
+            if token["symbol"] == symbol:
+                return token
+        return matches[0] if matches else None
+
+
+@functools.cache
+def load_token_indexes() -> Mapping[int, TokenIndex]:
+    """Parse the token list once and index it by chain."""
     with open(TOKEN_LIST_PATH, encoding=DEFAULT_ENCODING) as file:
         token_list = json.loads(file.read())["tokens"]
 
-    tokens = filter(lambda t: str(t["chainId"]) == str(chain_id), token_list)
-    token_map = {t["address"]: t for t in tokens}
-    if not token_map:
+    per_chain: dict[int, list[dict]] = {}
+    for token in token_list:
+        per_chain.setdefault(int(token["chainId"]), []).append(token)
+    return MappingProxyType({chain_id: TokenIndex.build(chain_id, tokens) for chain_id, tokens in per_chain.items()})
+
+
+def get_token_index(chain_id: int) -> TokenIndex:
+    """Get the token index of a chain."""
+    index = load_token_indexes().get(int(chain_id))
+    if index is None:
         msg = f"No tokens found for chain {chain_id}"
         raise ValueError(msg)
-    return token_map
+    return index
+
+
+def read_token_list(chain_id: int) -> Mapping[str, dict]:
+    """Read the token list."""
+    return get_token_index(chain_id).tokens
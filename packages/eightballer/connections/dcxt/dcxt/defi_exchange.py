@@ -1,12 +1,11 @@
 """Base exchange to be used to for erc20 exchanges."""
 
-import contextlib
 from typing import Any, cast
-from functools import cache, lru_cache
+from collections.abc import Callable
 
 import requests
 from web3 import Web3
-from multicaller import multicaller
+from web3.exceptions import Web3Exception
 from aea_ledger_ethereum import (
     HexBytes,
     JSONLike,
@@ -19,13 +18,22 @@ from aea.configurations.base import PublicId
 
 from packages.eightballer.connections.dcxt.utils import load_contract
 from packages.eightballer.protocols.balances.custom_types import Balance, Balances
-from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError, BadSymbol
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError, BadSymbol, TransactionReplaced
+from packages.eightballer.connections.dcxt.dcxt.rpc_pool import RpcPool
+from packages.eightballer.connections.dcxt.dcxt.fees import FeeOracle
+from packages.eightballer.connections.dcxt.dcxt.approvals import ApprovalsPlanner
+from packages.eightballer.connections.dcxt.dcxt.nonces import NonceManager
+from packages.eightballer.connections.dcxt.dcxt.receipts import ReceiptWatcher
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.block_cache import BlockCache
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import TokenMetadataResolver
+from packages.eightballer.connections.dcxt.dcxt.portfolio import AccountBalances, read_account_balances
 from packages.eightballer.connections.dcxt.erc_20.contract import Erc20, Erc20Token
 from packages.eightballer.connections.dcxt.dcxt.data.tokens import (
     LEDGER_TO_TOKEN_LIST,
     LEDGER_TO_NATIVE_SYMBOL,
     SupportedLedgers,
-    read_token_list,
+    get_token_index,
 )
 
 
@@ -97,22 +105,6 @@ def try_send_signed_transaction(ethereum_api: EthereumApi, tx_signed: JSONLike,
     return tx_digest
 
 
-def sign_and_send_txn(txn, crypto, ledger_api):
-    """Sign and send transaction."""
-
-    def _sign_swap_txn(swap_transaction):
-        """Sign the swap transaction."""
-        return signed_tx_to_dict(crypto.entity.sign_transaction(swap_transaction))
-
-    signed_txn = _sign_swap_txn(txn)
-    txn_hash = try_send_signed_transaction(ledger_api, signed_txn)
-    with contextlib.suppress(Exception):
-        result = ledger_api.api.eth.wait_for_transaction_receipt(txn_hash, timeout=600)
-        if result.get("status") == 0:
-            return False, txn_hash
-    return True, txn_hash
-
-
 class BaseErc20Exchange:
     """Base exchange to be used to for erc20 exchanges."""
 
@@ -120,26 +112,92 @@ class BaseErc20Exchange:
 
     def __init__(self, ledger_id, rpc_url, key_path, logger, *args, **kwargs):
         """Initialize the exchange."""
-        del args, kwargs
-        self.web3 = EthereumApi(
-            address=rpc_url,
-        )
+        del args
         self.account = EthereumCrypto(private_key_path=key_path)
         self.ledger_id = SupportedLedgers(ledger_id)
+        self.setup_ledger_services(rpc_url, logger=logger, **kwargs)
+        self.erc20_contract: Erc20 = load_contract(PublicId.from_str("eightballer/erc_20:0.1.0"))
+        self.tokens = {}
+
+    def setup_ledger_services(self, rpc_url: str, **kwargs) -> None:
+        """Set up the web3 client and the services shared by every exchange on the ledger.
 
-        self.mc = multicaller.multicaller(
-            _chainId=LEDGER_TO_CHAIN_ID[self.ledger_id],
-            _web3=self.web3.api,
-            _maxRetries=10,
-            _verbose=False,
-            _allowFailure=True,
+        Call once `ledger_id` and `account` are set. Services the connection
+        does not pass in are created for the exchange alone.
+        """
+        self.logger = kwargs.get("logger")
+        self.executor = kwargs.get("executor")
+        self.web3 = EthereumApi(
+            address=rpc_url,
+        )
+        self.sessions: SessionPool = kwargs.get("sessions") or SessionPool()
+        self.rpc_pool: RpcPool | None = kwargs.get("rpc_pool")
+        if self.rpc_pool is not None:
+            self.web3.api.provider = self.rpc_pool.provider
+        self.block_cache: BlockCache = kwargs.get("block_cache") or BlockCache.from_web3(self.web3.api)
+        self.nonces = NonceManager.for_account(self.web3.api, self.ledger_id.value, self.account.address)
+        self.approvals = ApprovalsPlanner.for_account(self.web3, self.ledger_id.value, self.account.address)
+        self.fee_oracle: FeeOracle = kwargs.get("fee_oracle") or FeeOracle.from_web3(
+            self.web3.api, self.block_cache.head_tracker.head
+        )
+        self.receipt_watcher: ReceiptWatcher = kwargs.get("receipt_watcher") or ReceiptWatcher.from_web3(
+            self.web3.api,
+            self.logger,
+            get_block_number=self.block_cache.head_tracker.head,
+            loop=kwargs.get("loop"),
+        )
+        self.token_index = get_token_index(LEDGER_TO_CHAIN_ID[self.ledger_id])
+        self.raw_token_data = self.token_index.tokens
+        self.token_metadata = TokenMetadataResolver.for_chain(
+            self.web3,
+            LEDGER_TO_CHAIN_ID[self.ledger_id],
+            store_path=kwargs.get("token_metadata_path"),
+            seed=self.raw_token_data,
         )
-        self.logger = logger
 
-        self.erc20_contract: Erc20 = load_contract(PublicId.from_str("eightballer/erc_20:0.1.0"))
-        self.raw_token_data = read_token_list(LEDGER_TO_CHAIN_ID[self.ledger_id])
-        self.names_to_addresses = {v["symbol"]: k for k, v in self.raw_token_data.items()}
-        self.tokens = {}
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run a blocking call on the connection executor, or inline when running standalone."""
+        if self.executor is None:
+            return func(*args, **kwargs)
+        return await self.executor.run(self.ledger_id.value, func, *args, **kwargs)
+
+    def get_gas_price(self, use_cache: bool = True) -> int:
+        """Get the gas price at the current head."""
+        return self.block_cache.get_or_fetch(("gas_price",), lambda: self.web3.api.eth.gas_price, use_cache=use_cache)
+
+    def send_transaction(self, build: Callable[[int], dict]) -> str:
+        """Build a transaction at the next local nonce of the account, then sign and send it."""
+        with self.nonces.use() as nonce:
+            signed_tx = signed_tx_to_dict(self.account.entity.sign_transaction(build(nonce)))
+            tx_hash = try_send_signed_transaction(self.web3, signed_tx, raise_on_try=True)
+            self.nonces.sent(nonce, tx_hash)
+        self.block_cache.invalidate()
+        return tx_hash
+
+    async def wait_for_receipt(self, tx_hash: str, timeout: float | None = None) -> dict[str, Any]:
+        """Wait for the receipt of a transaction sent with `send_transaction`."""
+        nonce = self.nonces.nonce_of(tx_hash)
+        try:
+            receipt = await self.receipt_watcher.wait(tx_hash, self.account.address, nonce, timeout)
+        except TransactionReplaced:
+            self.nonces.confirm(tx_hash)
+            raise
+        return self._on_receipt(tx_hash, receipt)
+
+    def wait_for_receipt_blocking(self, tx_hash: str, timeout: float | None = None) -> dict[str, Any]:
+        """Wait for a receipt from a blocking call, handing the wait to the receipt watcher."""
+        nonce = self.nonces.nonce_of(tx_hash)
+        try:
+            receipt = self.receipt_watcher.wait_blocking(tx_hash, self.account.address, nonce, timeout)
+        except TransactionReplaced:
+            self.nonces.confirm(tx_hash)
+            raise
+        return self._on_receipt(tx_hash, receipt)
+
+    def _on_receipt(self, tx_hash: str, receipt: dict[str, Any]) -> dict[str, Any]:
+        self.nonces.confirm(tx_hash)
+        self.block_cache.head_tracker.observe(receipt.get("blockNumber"))
+        return receipt
 
     def _from_decimals_amt_to_token(self, address, balance):
         """Convert the balance to a token balance."""
@@ -153,44 +211,13 @@ class BaseErc20Exchange:
             is_native=False,
         )
 
-    @cache  # noqa
-    def get_token(self, address):
+    def get_token(self, address) -> Erc20Token:
         """Get the token from the address."""
-        # We check if the token is already in the raw token data.
         address = Web3.to_checksum_address(address)
         if address in self.tokens:
             return self.tokens[address]
-        if address in self.raw_token_data:
-            token_data = self.raw_token_data[address]
-            token = Erc20Token(
-                address=address,
-                symbol=token_data["symbol"],
-                name=token_data["name"],
-                decimals=token_data["decimals"],
-            )
-            self.tokens[address] = token
-            return self.get_token(address)
-        # We retrieve the token from the balancer contract.
-
-        name = self.erc20_contract.name(
-            self.web3,
-            address,
-        )["str"]
-        symbol = self.erc20_contract.symbol(
-            self.web3,
-            address,
-        )["str"]
-        decimals = self.erc20_contract.decimals(
-            self.web3,
-            address,
-        )["int"]
-        self.tokens[address] = Erc20Token(
-            address=address,
-            name=name,
-            symbol=symbol,
-            decimals=decimals,
-        )
-        return self.get_token(address)
+        # unknown tokens are resolved by the metadata service shared by every exchange on the ledger.
+        return self.token_metadata.resolve_one(address)
 
     async def fetch_balance(self, *args, **kwargs) -> Balances:
         """Fetch the balance.
@@ -199,40 +226,55 @@ class BaseErc20Exchange:
         """
         del args
 
-        self.mc.reset()
         use_external_address = kwargs.get("address", None)
-        address_to_check = use_external_address or self.account.address
+        address_to_check = Web3.to_checksum_address(use_external_address or self.account.address)
         self.logger.debug(
             f"Checking balance for {address_to_check} with for tokens {LEDGER_TO_TOKEN_LIST[self.ledger_id]}"
         )
-        abi = self.erc20_contract.get_instance(self.web3).abi
-
-        for token_address in LEDGER_TO_TOKEN_LIST[self.ledger_id]:
-            self.mc.addCall(
-                token_address,
-                abi,
-                "balanceOf",
-                args=[address_to_check],
+
+        def _fetch_balances():
+            # native and token balances are read in a single call, pinned to the same block.
+            accounts = read_account_balances(
+                self.web3,
+                self.ledger_id.value,
+                [address_to_check],
+                self.get_balance_tokens(),
+                self.block_cache.head_tracker.head(),
             )
+            return accounts[address_to_check]
 
         try:
-            balance_data = self.mc.execute()
-            native = self.web3.api.eth.get_balance(address_to_check)
+            account = await self.run_blocking(
+                self.block_cache.get_or_fetch,
+                ("balances", address_to_check),
+                _fetch_balances,
+                use_cache=kwargs.get("use_cache", True),
+            )
         except requests.exceptions.HTTPError as err:
             self.logger.exception(f"Error fetching balance: {err}")
             msg = "Error fetching balance"
             raise RpcError(msg) from err
+        return self.balances_from_snapshot(account)
 
+    def get_balance_tokens(self) -> list[str]:
+        """Get the tokens whose balances are reported, resolving any unknown one in a single batch."""
+        tokens = list(LEDGER_TO_TOKEN_LIST[self.ledger_id])
+        self.token_metadata.resolve(tokens)
+        return tokens
+
+    def balances_from_snapshot(self, account: AccountBalances) -> Balances:
+        """Convert the raw balances of an account to balances."""
+        native = Web3.from_wei(account.native, "ether")
         return Balances(
             balances=[
-                self._from_decimals_amt_to_token(token_address, balance[0])
-                for token_address, balance in zip(LEDGER_TO_TOKEN_LIST[self.ledger_id], balance_data[0], strict=False)
+                self._from_decimals_amt_to_token(token_address, balance)
+                for token_address, balance in account.tokens.items()
             ]
             + [
                 Balance(
                     asset_id=LEDGER_TO_NATIVE_SYMBOL[self.ledger_id],
-                    free=Web3.from_wei(native, "ether"),
-                    total=Web3.from_wei(native, "ether"),
+                    free=native,
+                    total=native,
                     is_native=True,
                     used=0,
                 )
@@ -240,68 +282,93 @@ class BaseErc20Exchange:
         )
 
     @classmethod
-    @lru_cache(
-        maxsize=128,
-    )
     def look_up_by_symbol(cls, symbol: str, ledger: SupportedLedgers) -> Erc20Token:
         """Look up a token by symbol."""
-        token_list = read_token_list(LEDGER_TO_CHAIN_ID[ledger])
-        for token, data in token_list.items():
-            if data["symbol"] == symbol:
-                return Erc20Token(
-                    address=token,
-                    symbol=data["symbol"],
-                    decimals=data["decimals"],
-                    name=data["name"],
-                )
-        return None
+        data = get_token_index(LEDGER_TO_CHAIN_ID[ledger]).get_by_symbol(symbol)
+        if data is None:
+            return None
+        return Erc20Token(
+            address=data["address"],
+            symbol=data["symbol"],
+            decimals=data["decimals"],
+            name=data["name"],
+        )
 
-    def set_approval(self, asset_id, amount, is_eoa):
-        """Set approval for an asset."""
-        self.logger.info(f"Setting approval for {asset_id} on {self.exchange_id}")
+    def get_approval_token(self, asset_id) -> Erc20Token:
+        """Get the token an approval is asked for."""
         token = self.look_up_by_symbol(asset_id, ledger=self.supported_ledger)
         if not token:
             msg = f"Token {asset_id} not found for exchange {self.exchange_id} on ledger {self.ledger_id}"
             raise BadSymbol(msg)
+        return token
+
+    def set_approval(self, asset_id, amount, is_eoa):
+        """Set approval for an asset."""
+        self.logger.info(f"Setting approval for {asset_id} on {self.exchange_id}")
+        token = self.get_approval_token(asset_id)
 
         if is_eoa:
-            current_approval = self.erc20_contract.allowance(
-                self.web3,
-                token.address,
-                self.account.address,
-                self.spender_address,
-            )["int"]
+            current_approval = self.block_cache.get_or_fetch(
+                ("allowance", token.address, self.account.address, self.spender_address),
+                lambda: self.erc20_contract.allowance(
+                    self.web3,
+                    token.address,
+                    self.account.address,
+                    self.spender_address,
+                )["int"],
+            )
             if current_approval >= amount:
                 self.logger.info(f"Approval already set for {token.symbol} on {self.exchange_id}")
                 return
             self.logger.info(f"Setting approval for {token.symbol} on {self.exchange_id}")
-            func = self.erc20_contract.approve(
-                ledger_api=self.web3,
-                contract_address=token.address,
-                to=self.spender_address,
-                value=amount,
-            )
-            # we call it to verify it will succeed
-            func.call(
-                {"from": self.account.address},
-            )
-            txn_data = func.build_transaction(
-                {
-                    "from": self.account.address,
-                    "gas": 1000000,
-                    "gasPrice": self.web3.api.eth.gas_price * 5,
-                    "nonce": self.web3.api.eth.get_transaction_count(self.account.address),
-                }
-            )
-            result, txn_hash = sign_and_send_txn(
-                txn_data,
-                self.account,
-                self.web3,
-            )
-            if not result:
+            txn_hash = self.send_approval(token.address, self.spender_address, amount)
+            try:
+                receipt = self.wait_for_receipt_blocking(txn_hash)
+            except TransactionReplaced as exc:
+                raise RpcError(str(exc)) from exc
+            if receipt.get("status") == 0:
                 msg = f"Transaction failed: {txn_hash}"
                 raise RpcError(msg)
-            self.logger.info(f"Transaction sent: {txn_hash} with result: {result}")
+            self.logger.info(f"Transaction mined: {txn_hash} in block {receipt.get('blockNumber')}")
+
+    async def approve(self, asset_id, amount, is_eoa) -> str | None:
+        """Set approval for an asset, planned together with the other approvals asked for from the account."""
+        token = self.get_approval_token(asset_id)
+        if not is_eoa:
+            return None
+        txn_hash = await self.approvals.request(self, token.address, self.spender_address, amount)
+        if txn_hash is None:
+            self.logger.info(f"Approval already set for {token.symbol} on {self.exchange_id}")
+        else:
+            self.logger.info(f"Approval set for {token.symbol} on {self.exchange_id}: {txn_hash}")
+        return txn_hash
+
+    def send_approval(self, token_address: str, spender: str, amount: int) -> str:
+        """Send an approval of the spender for the amount of a token, returning the transaction hash."""
+        func = self.erc20_contract.approve(
+            ledger_api=self.web3,
+            contract_address=token_address,
+            to=spender,
+            value=amount,
+        )
+        # we call it to verify it will succeed
+        func.call(
+            {"from": self.account.address},
+        )
+        try:
+            return self.send_transaction(
+                lambda nonce: func.build_transaction(
+                    {
+                        "from": self.account.address,
+                        "gas": 1000000,
+                        "nonce": nonce,
+                        **self.fee_oracle.fees("medium"),
+                    }
+                )
+            )
+        except (ValueError, Web3Exception) as exc:
+            msg = f"Unable to send approval for {token_address}: {exc}"
+            raise RpcError(msg) from exc
 
     @property
     def spender_address(self):
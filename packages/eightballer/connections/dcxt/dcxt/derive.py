@@ -9,9 +9,11 @@ from pathlib import Path
 from itertools import starmap
 
 from derive_client import AsyncHTTPClient as DeriveAsyncClient
+from derive_client.config import CONFIGS
 from derive_client.data_types import (
     Currency,
     AssetType,
+    Environment,
     OrderType as DeriveOrderType,
 )
 from derive_client.exceptions import ApiException
@@ -30,7 +32,7 @@ from packages.eightballer.protocols.tickers.custom_types import Ticker, Tickers
 from packages.eightballer.protocols.balances.custom_types import Balance, Balances
 from packages.eightballer.connections.dcxt.dcxt.exceptions import ExchangeError
 from packages.eightballer.protocols.positions.custom_types import Position
-from packages.eightballer.protocols.order_book.custom_types import OrderBook
+from packages.eightballer.connections.dcxt.dcxt.derive_market_data import DeriveMarketData
 
 
 TZ = datetime.datetime.now().astimezone().tzinfo
@@ -203,6 +205,14 @@ class DeriveClient:
             logger=kwargs["logger"],
         )
         self.logger = kwargs["logger"]
+        self.market_data: DeriveMarketData | None = None
+        if kwargs.get("market_data"):
+            self.market_data = DeriveMarketData.from_config(
+                kwargs["market_data"],
+                url=CONFIGS[Environment(kwargs["environment"])].ws_address,
+                snapshot=self.fetch_ticker_snapshot,
+                logger=self.logger,
+            )
 
     async def ensure_connected(self):
         """Ensure the client is connected."""
@@ -254,6 +264,9 @@ class DeriveClient:
 
         instrument_name = f"{asset_a}/{asset_b}".upper() if not symbol else symbol.upper().replace("/", "-")
         try:
+            if self.market_data is not None and instrument_name.replace("/", "-") in self.market_data:
+                self.market_data.start()
+                return to_ticker(instrument_name, await self.market_data.get_ticker(instrument_name.replace("/", "-")))
             result = await self.client.markets.get_tickers(
                 instrument_type=AssetType.erc20,
                 currency=asset_a,
@@ -264,6 +277,14 @@ class DeriveClient:
             msg = f"Failed to fetch ticker: {error}"
             raise ExchangeError(msg) from error
 
+    async def fetch_ticker_snapshot(self, instrument_name: str) -> TickerSlimSchema:
+        """Fetch the ticker of an instrument over REST."""
+        result = await self.client.markets.get_tickers(
+            instrument_type=AssetType.erc20,
+            currency=instrument_name.split("-")[0],
+        )
+        return result[instrument_name]
+
     async def fetch_balance(self, *args, **kwargs):
         """Fetch all balances."""
         await self.ensure_connected()
@@ -312,22 +333,19 @@ class DeriveClient:
         )
 
     async def watch_order_book(self, *args, **kwargs):
-        """Watch the order book."""
+        """Watch the order book.
+
+        Not served: the order book protocol carries int32 levels, which cannot hold Derive prices.
+        The local books of the `market_data` instruments are only used to sequence-check the feed.
+        """
+        del args, kwargs
         msg = f"{self.__class__.__name__}.watch_order_book"
         raise NotImplementedError(msg)
-        params = kwargs.get("params", {})
-        try:
-            result = await self.client.watch_order_book(instrument_name=args[0], **params)
-        except Exception:
-            traceback.print_exc()
-            raise
-        return OrderBook(
-            **result,
-            exchange_id=self.exchange_id,
-        )
 
     async def close(self):
         """Close the client."""
+        if self.market_data is not None:
+            await self.market_data.stop()
         return True
 
     async def create_order(self, *args, retries=0, **kwargs):
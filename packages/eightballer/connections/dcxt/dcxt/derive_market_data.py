@@ -0,0 +1,290 @@
+"""Local Derive tickers and order books, kept current from websocket subscriptions."""
+
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Self
+from dataclasses import dataclass
+from collections.abc import Callable, Iterable, Awaitable
+
+import msgspec
+import websockets
+from derive_client.data_types.generated_models import TickerSlimSchema
+
+
+# the 100ms channels publish on every change, and once a second otherwise.
+DEFAULT_INTERVAL = "100"
+DEFAULT_GROUP = "1"
+DEFAULT_DEPTH = "10"
+# a ticker older than this is read from REST instead.
+DEFAULT_MAX_AGE = 5.0
+DEFAULT_RECONNECT_DELAY = 1.0
+DEFAULT_MAX_RECONNECT_DELAY = 30.0
+
+
+@dataclass(frozen=True)
+class L2Book:
+    """Bid and ask (price, amount) levels of an instrument, best first, as of one publish."""
+
+    instrument_name: str
+    bids: list[tuple[float, float]]
+    asks: list[tuple[float, float]]
+    publish_id: int
+    timestamp: int
+
+
+@dataclass
+class InstrumentState:
+    """The local ticker and book of an instrument."""
+
+    ticker: TickerSlimSchema | None = None
+    ticker_received_at: float = 0.0
+    book: L2Book | None = None
+    # set when a gap or a reconnect means the local ticker may have missed updates.
+    needs_resync: bool = True
+
+
+@dataclass
+class MarketDataStats:
+    """Counters for the market data feed."""
+
+    messages: int = 0
+    tickers: int = 0
+    books: int = 0
+    stale: int = 0
+    gaps: int = 0
+    hits: int = 0
+    resyncs: int = 0
+    reconnects: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dict."""
+        return {
+            "messages": self.messages,
+            "tickers": self.tickers,
+            "books": self.books,
+            "stale": self.stale,
+            "gaps": self.gaps,
+            "hits": self.hits,
+            "resyncs": self.resyncs,
+            "reconnects": self.reconnects,
+        }
+
+
+class ReplayConnection:
+    """A websocket stand-in that plays back recorded messages, for running the feed offline."""
+
+    def __init__(self, messages: Iterable[dict[str, Any]]) -> None:
+        """Initialise the connection with the messages to play back."""
+        self.messages = list(messages)
+        self.sent: list[dict[str, Any]] = []
+
+    def __call__(self, url: str) -> Self:
+        """Stand in for `websockets.connect`."""
+        del url
+        return self
+
+    async def __aenter__(self) -> Self:
+        """Open the connection."""
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        """Close the connection."""
+
+    async def send(self, message: str) -> None:
+        """Record a message sent to the server."""
+        self.sent.append(json.loads(message))
+
+    async def __aiter__(self):
+        """Play back the recorded messages."""
+        for message in self.messages:
+            await asyncio.sleep(0)
+            yield json.dumps(message)
+
+
+class DeriveMarketData:
+    """Tickers and L2 books of the configured instruments, held in memory.
+
+    A single websocket carries the ticker and order book channels of every
+    instrument. Order book publishes are sequence-checked: stale ones are
+    dropped, and a gap or a reconnect marks the instrument for a REST ticker
+    resync on its next read. Each book publish is a full snapshot of its
+    depth, so the book itself recovers with the next message.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        instruments: Iterable[str],
+        snapshot: Callable[[str], Awaitable[TickerSlimSchema]],
+        logger: logging.Logger,
+        connect: Callable[[str], Any] = websockets.connect,
+        interval: str = DEFAULT_INTERVAL,
+        group: str = DEFAULT_GROUP,
+        depth: str = DEFAULT_DEPTH,
+        max_age: float = DEFAULT_MAX_AGE,
+        reconnect_delay: float = DEFAULT_RECONNECT_DELAY,
+        max_reconnect_delay: float = DEFAULT_MAX_RECONNECT_DELAY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the feed; `snapshot` reads an instrument's ticker over REST."""
+        self.url = url
+        self.instruments = {name: InstrumentState() for name in instruments}
+        self.snapshot = snapshot
+        self.logger = logger
+        self.connect = connect
+        self.interval = interval
+        self.group = group
+        self.depth = depth
+        self.max_age = max_age
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.clock = clock
+        self.stats = MarketDataStats()
+        self._task: asyncio.Task | None = None
+        self._request_id = 0
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict,
+        url: str,
+        snapshot: Callable[[str], Awaitable[TickerSlimSchema]],
+        logger: logging.Logger,
+    ) -> "DeriveMarketData":
+        """Create the feed from the `market_data` block of the exchange configuration."""
+        return cls(
+            url=config.get("url", url),
+            instruments=config["instruments"],
+            snapshot=snapshot,
+            logger=logger,
+            interval=str(config.get("interval", DEFAULT_INTERVAL)),
+            group=str(config.get("group", DEFAULT_GROUP)),
+            depth=str(config.get("depth", DEFAULT_DEPTH)),
+            max_age=config.get("max_age", DEFAULT_MAX_AGE),
+        )
+
+    def __contains__(self, instrument_name: str) -> bool:
+        """Whether the instrument is subscribed to."""
+        return instrument_name in self.instruments
+
+    @property
+    def channels(self) -> list[str]:
+        """The channels subscribed to."""
+        return [
+            channel
+            for name in self.instruments
+            for channel in (
+                f"ticker_slim.{name}.{self.interval}",
+                f"orderbook.{name}.{self.group}.{self.depth}",
+            )
+        ]
+
+    def start(self) -> None:
+        """Start the subscriptions in the background, if they are not running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the subscriptions."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run(self) -> None:
+        """Keep the subscriptions up, reconnecting with backoff."""
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with self.connect(self.url) as websocket:
+                    await self.consume(websocket)
+                    delay = self.reconnect_delay
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:  # noqa
+                self.logger.warning(f"Derive market data connection failed: {error}")
+            for state in self.instruments.values():
+                state.needs_resync = True
+            self.stats.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def consume(self, websocket: Any) -> None:
+        """Subscribe on an open connection and apply its messages until it closes."""
+        self._request_id += 1
+        await websocket.send(
+            json.dumps({"method": "subscribe", "params": {"channels": self.channels}, "id": self._request_id})
+        )
+        async for raw in websocket:
+            self.handle_message(json.loads(raw))
+
+    def handle_message(self, message: dict[str, Any]) -> None:
+        """Apply a subscription notification, ignoring anything else."""
+        if message.get("method") != "subscription":
+            return
+        self.stats.messages += 1
+        channel, data = message["params"]["channel"], message["params"]["data"]
+        kind, instrument_name = channel.split(".")[:2]
+        state = self.instruments.get(instrument_name)
+        if state is None:
+            return
+        if kind == "ticker_slim":
+            self._apply_ticker(state, msgspec.convert(data["instrument_ticker"], TickerSlimSchema, strict=False))
+        elif kind == "orderbook":
+            self._apply_book(state, data)
+
+    def _apply_ticker(self, state: InstrumentState, ticker: TickerSlimSchema) -> None:
+        if state.ticker is not None and ticker.t < state.ticker.t:
+            self.stats.stale += 1
+            return
+        self.stats.tickers += 1
+        state.ticker = ticker
+        state.ticker_received_at = self.clock()
+
+    def _apply_book(self, state: InstrumentState, data: dict[str, Any]) -> None:
+        publish_id = int(data["publish_id"])
+        if state.book is not None:
+            if publish_id <= state.book.publish_id:
+                self.stats.stale += 1
+                return
+            if publish_id != state.book.publish_id + 1:
+                self.stats.gaps += 1
+                state.needs_resync = True
+        self.stats.books += 1
+        state.book = L2Book(
+            instrument_name=data["instrument_name"],
+            bids=[(float(price), float(amount)) for price, amount in data["bids"]],
+            asks=[(float(price), float(amount)) for price, amount in data["asks"]],
+            publish_id=publish_id,
+            timestamp=int(data["timestamp"]),
+        )
+
+    async def get_ticker(self, instrument_name: str) -> TickerSlimSchema:
+        """Get the ticker from memory, resyncing it over REST when it is missing, stale or may have gaps."""
+        state = self.instruments[instrument_name]
+        if (
+            state.ticker is not None
+            and not state.needs_resync
+            and self.clock() - state.ticker_received_at <= self.max_age
+        ):
+            self.stats.hits += 1
+            return state.ticker
+        self.stats.resyncs += 1
+        ticker = await self.snapshot(instrument_name)
+        self._apply_ticker(state, ticker)
+        state.needs_resync = False
+        return state.ticker
+
+    def get_order_book(self, instrument_name: str) -> L2Book | None:
+        """Get the latest book of an instrument, if one has arrived."""
+        return self.instruments[instrument_name].book
+
+    def get_stats(self) -> dict[str, int]:
+        """Return the counters."""
+        return self.stats.to_dict()
@@ -67,3 +67,7 @@ class RpcError(Exception):
 
 class UnsupportedAsset(Exception):
     """Raised when the asset is not supported by the exchange."""
+
+
+class TransactionReplaced(Exception):
+    """Raised when another transaction was mined at the nonce of a watched one."""
@@ -0,0 +1,160 @@
+"""Per-ledger fee oracle, sampling fees once per block."""
+
+import threading
+import statistics
+from typing import Any
+from dataclasses import field, dataclass
+from collections.abc import Callable
+
+from web3 import Web3
+
+
+DEFAULT_HISTORY_BLOCKS = 5
+# headroom for the base fee to rise while a transaction waits, ~6 full blocks at +12.5% each.
+DEFAULT_BASE_FEE_MULTIPLIER = 2.0
+DEFAULT_MIN_PRIORITY_FEE = 0
+DEFAULT_URGENCY = "medium"
+# the priority fee percentile paid at each urgency.
+URGENCY_PERCENTILES = {"low": 10, "medium": 50, "high": 90}
+# the premium over the node's gas price paid at each urgency, on ledgers without EIP-1559.
+LEGACY_MULTIPLIERS = {"low": 1.0, "medium": 1.1, "high": 1.5}
+
+
+@dataclass(frozen=True)
+class FeeSample:
+    """The fees of a ledger as of a block."""
+
+    block: int
+    # the base fee of the next block, None on ledgers without EIP-1559.
+    base_fee: int | None = None
+    priority_fees: dict[str, int] = field(default_factory=dict)
+    # the node's gas price, set on ledgers without EIP-1559.
+    gas_price: int | None = None
+
+    @property
+    def is_legacy(self) -> bool:
+        """Whether the ledger prices gas without EIP-1559."""
+        return self.base_fee is None
+
+
+@dataclass
+class FeeOracleStats:
+    """Counters for a fee oracle."""
+
+    samples: int = 0
+    hits: int = 0
+    legacy: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dict."""
+        return {"samples": self.samples, "hits": self.hits, "legacy": self.legacy}
+
+
+class FeeOracle:
+    """Serves transaction fees of a ledger from a sample taken once per block.
+
+    Each sample reads the fee history of the last `history_blocks` blocks;
+    the priority fee of an urgency is the median, over those blocks, of its
+    reward percentile, and `maxFeePerGas` leaves room for the next block's
+    base fee to rise by `base_fee_multiplier`. Ledgers whose blocks carry no
+    base fee are priced with a premium over the node's legacy gas price.
+    """
+
+    def __init__(
+        self,
+        get_head: Callable[[], int],
+        get_fee_history: Callable[[int, list[int]], dict[str, Any]],
+        get_gas_price: Callable[[], int],
+        history_blocks: int = DEFAULT_HISTORY_BLOCKS,
+        base_fee_multiplier: float = DEFAULT_BASE_FEE_MULTIPLIER,
+        min_priority_fee: int = DEFAULT_MIN_PRIORITY_FEE,
+        max_fee: int | None = None,
+    ) -> None:
+        """Initialise the oracle; `get_fee_history(blocks, percentiles)` reads up to the latest block."""
+        self._get_head = get_head
+        self._get_fee_history = get_fee_history
+        self._get_gas_price = get_gas_price
+        self.history_blocks = history_blocks
+        self.base_fee_multiplier = base_fee_multiplier
+        self.min_priority_fee = min_priority_fee
+        self.max_fee = max_fee
+        self.stats = FeeOracleStats()
+        self._lock = threading.Lock()
+        self._sample: FeeSample | None = None
+
+    @classmethod
+    def from_web3(cls, web3: Web3, get_head: Callable[[], int], config: dict | None = None) -> "FeeOracle":
+        """Create an oracle reading through the given web3 instance, sampling on each new head."""
+        config = config or {}
+        return cls(
+            get_head,
+            lambda blocks, percentiles: web3.eth.fee_history(blocks, "latest", percentiles),
+            lambda: web3.eth.gas_price,
+            history_blocks=config.get("history_blocks", DEFAULT_HISTORY_BLOCKS),
+            base_fee_multiplier=config.get("base_fee_multiplier", DEFAULT_BASE_FEE_MULTIPLIER),
+            min_priority_fee=config.get("min_priority_fee", DEFAULT_MIN_PRIORITY_FEE),
+            max_fee=config.get("max_fee"),
+        )
+
+    def sample(self) -> FeeSample:
+        """Get the fees as of the current head, sampling them on the first call in each block."""
+        block = self._get_head()
+        with self._lock:
+            if self._sample is not None and self._sample.block == block:
+                self.stats.hits += 1
+                return self._sample
+        sample = self._read(block)
+        with self._lock:
+            self.stats.samples += 1
+            if self._sample is None or sample.block >= self._sample.block:
+                self._sample = sample
+        return sample
+
+    def _read(self, block: int) -> FeeSample:
+        urgencies = list(URGENCY_PERCENTILES)
+        history = self._get_fee_history(self.history_blocks, [URGENCY_PERCENTILES[u] for u in urgencies])
+        base_fees = history.get("baseFeePerGas") or []
+        if not base_fees or not base_fees[-1]:
+            self.stats.legacy += 1
+            return FeeSample(block, gas_price=self._get_gas_price())
+        rewards = [reward for reward in history.get("reward") or [] if reward]
+        priority_fees = {
+            urgency: max(
+                int(statistics.median(reward[i] for reward in rewards)) if rewards else 0,
+                self.min_priority_fee,
+            )
+            for i, urgency in enumerate(urgencies)
+        }
+        # the history ends with the base fee of the block after the latest.
+        return FeeSample(block, base_fee=base_fees[-1], priority_fees=priority_fees)
+
+    def fees(self, urgency: str = DEFAULT_URGENCY) -> dict[str, int]:
+        """Get the fee fields of a transaction: `maxFeePerGas` and `maxPriorityFeePerGas`, or `gasPrice`."""
+        sample = self.sample()
+        if sample.is_legacy:
+            gas_price = int(sample.gas_price * LEGACY_MULTIPLIERS[urgency])
+            return {"gasPrice": self._cap(gas_price)}
+        priority_fee = sample.priority_fees[urgency]
+        max_fee = self._cap(int(sample.base_fee * self.base_fee_multiplier) + priority_fee)
+        return {"maxFeePerGas": max_fee, "maxPriorityFeePerGas": min(priority_fee, max_fee)}
+
+    def gas_price(self, urgency: str = DEFAULT_URGENCY) -> int:
+        """Get the price per gas a transaction is expected to pay, e.g. for costing routes in quotes."""
+        sample = self.sample()
+        if sample.is_legacy:
+            return self._cap(int(sample.gas_price * LEGACY_MULTIPLIERS[urgency]))
+        return self._cap(sample.base_fee + sample.priority_fees[urgency])
+
+    def _cap(self, fee: int) -> int:
+        return fee if self.max_fee is None else min(fee, self.max_fee)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the counters and the latest sample."""
+        sample = self._sample
+        return {
+            **self.stats.to_dict(),
+            "block": None if sample is None else sample.block,
+            "base_fee": None if sample is None else sample.base_fee,
+            "priority_fees": {} if sample is None else dict(sample.priority_fees),
+            "gas_price": None if sample is None else sample.gas_price,
+        }
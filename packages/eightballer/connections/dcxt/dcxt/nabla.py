@@ -1,17 +1,16 @@
 """Nabla Finance client for swapping tokens on the Nabla Finance DEX."""
 
 import json
+import asyncio
 import datetime
 from typing import Any, Literal
 from pathlib import Path
 from functools import lru_cache
 
-import requests
 from pydantic import BaseModel
-from web3.exceptions import TimeExhausted
 from aea.configurations.base import PublicId
 
-from packages.eightballer.connections.dcxt.utils import load_contract
+from packages.eightballer.connections.dcxt.utils import load_contract, contract_instance
 from packages.eightballer.protocols.orders.custom_types import (
     Order,
     Orders,
@@ -20,19 +19,26 @@ from packages.eightballer.protocols.orders.custom_types import (
     OrderStatus,
 )
 from packages.eightballer.protocols.tickers.custom_types import Ticker, Tickers
-from packages.eightballer.connections.dcxt.dcxt.exceptions import UnsupportedAsset
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RequestTimeout, UnsupportedAsset
 from packages.eightballer.connections.dcxt.dcxt.data.tokens import SupportedLedgers
-from packages.eightballer.connections.dcxt.dcxt.defi_exchange import (
-    BaseErc20Exchange,
-    signed_tx_to_dict,
-    try_send_signed_transaction,
+from packages.eightballer.connections.dcxt.dcxt.nabla_depth import (
+    DEFAULT_GAS_PER_QUOTE,
+    DEFAULT_MAX_BATCH_GAS,
+    DEFAULT_MAX_BATCH_BYTES,
+    DepthCurve,
+    read_batch,
+    chunk_calls,
+    decode_quote,
+    get_reference_amount,
+    encode_quote_with_reference_price,
 )
+from packages.eightballer.connections.dcxt.dcxt.nabla_price_feed import DEFAULT_TTL, NablaPriceFeed
+from packages.eightballer.connections.dcxt.dcxt.defi_exchange import BaseErc20Exchange
 
 
 # ruff: noqa: ARG002
 
 ZERO_PRICE_FEED = "0000000000000000000000000000000000000000000000000000000000000000"
-MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
 
 
 class Pool(BaseModel):
@@ -134,7 +140,6 @@ class PriceFeedResponse(BaseModel):
 NABLA_CONFIG = NablaConfig.load()
 NABLA_PORTAL_PUBLIC_ID = "dakavon/nabla_portal:0.1.0"
 NABLA_QUOTE_PUBLIC_ID = "dakavon/nabla_quote:0.1.0"
-MULTICALL3_PUBLIC_ID = "dakavon/multicall3:0.1.0"
 NABLA_DIRECT_PRICE_ORACLE_ID = "zarathustra/direct_price_oracle:0.1.0"
 NABLA_PRICE_API_URL: str = "https://antenna.nabla.fi/v1/updates/price/latest"
 
@@ -171,7 +176,18 @@ class NablaFinanceClient(BaseErc20Exchange):
         self.supported_ledger = SupportedLedgers(ledger_id)
         self.config = NABLA_CONFIG[self.supported_ledger.name]
         self.direct_price_oracle = load_contract(PublicId.from_str(NABLA_DIRECT_PRICE_ORACLE_ID))
+        depth_config = kwargs.get("depth") or {}
+        self.depth_budget = {
+            "gas_per_call": depth_config.get("gas_per_quote", DEFAULT_GAS_PER_QUOTE),
+            "max_batch_gas": depth_config.get("max_batch_gas", DEFAULT_MAX_BATCH_GAS),
+            "max_batch_bytes": depth_config.get("max_batch_bytes", DEFAULT_MAX_BATCH_BYTES),
+        }
         self.nabla_price_feed_ids = {}  # Cache for asset (string) to price feed ID (bytes32)
+        self.price_feed = NablaPriceFeed(
+            self.sessions,
+            NABLA_PRICE_API_URL,
+            ttl=kwargs.get("price_feed_ttl", DEFAULT_TTL),
+        )
 
     async def close(self):
         """Close the client."""
@@ -208,63 +224,12 @@ class NablaFinanceClient(BaseErc20Exchange):
     ) -> tuple[float, float]:
         """Quote a swap both ways and return (ask_price, bid_price).
 
-        ask_price = amount of B you get per 1 A (sell A → B)
-        bid_price = amount of A you get per 1 B (sell B → A)
+        ask_price = amount of B paid per 1 A (buy A with B)
+        bid_price = amount of B you get per 1 A (sell A → B)
         """
-        # fetch price data once
-        price_feed_response = self.fetch_price_data([asset_a, asset_b])
-        token_a = self.get_token(asset_a)
-        token_b = self.get_token(asset_b)
-        token_prices = price_feed_response.token_prices
-
-        # helper to call get_swap_quote
-        async def quote(from_addr: str, to_addr: str, amt_units: int) -> int:
-            return await self.get_swap_quote(
-                from_token_address=from_addr,
-                to_token_address=to_addr,
-                amount=amt_units,
-                token_prices=token_prices,
-            )
-
-        # 1) quote(A → B) is the bid price (B per A)
-        units_a = int(amount * 10**token_a.decimals)
-        out_b_units = await quote(asset_a, asset_b, units_a)
-        out_b = out_b_units / 10**token_b.decimals
-        bid_price = out_b / amount  # B per A
-
-        self.logger.info(
-            "Bid quote %s→%s: %.6f %s → %.6f %s; bid = %.6f %s/%s",
-            token_a.symbol,
-            token_b.symbol,
-            amount,
-            token_a.symbol,
-            out_b,
-            token_b.symbol,
-            bid_price,
-            token_b.symbol,
-            token_a.symbol,
-        )
-
-        # 2) quote(B → A) inverted is the ask price (B per A)
-        units_b = int(out_b * 10**token_b.decimals)
-        out_a_units = await quote(asset_b, asset_a, units_b)
-        out_a = out_a_units / 10**token_a.decimals
-        ask_price = out_b / out_a  # B per A
-
-        self.logger.info(
-            "Ask quote %s→%s: %.6f %s → %.6f %s; ask = %.6f %s/%s",
-            token_b.symbol,
-            token_a.symbol,
-            out_b,
-            token_b.symbol,
-            out_a,
-            token_a.symbol,
-            ask_price,
-            token_b.symbol,
-            token_a.symbol,
-        )
-
-        return ask_price, bid_price
+        # both directions are quoted by a single call, at the same block.
+        depth = await self.get_depth({(asset_a, asset_b): [amount]})
+        return depth[(asset_a, asset_b)].levels[0]
 
     async def get_nabla_quote(
         self,
@@ -289,32 +254,24 @@ class NablaFinanceClient(BaseErc20Exchange):
 
         """
         # fetch price data
-        price_feed_response = self.fetch_price_data([asset_a, asset_b])
+        price_feed_response = await self.fetch_price_data([asset_a, asset_b])
         token_a = self.get_token(asset_a)
         token_b = self.get_token(asset_b)
         token_prices = price_feed_response.token_prices
 
-        # load the NablaQuote contract
-        nabla_quote_contract = load_contract(PublicId.from_str(NABLA_QUOTE_PUBLIC_ID))
-        params = {
-            "amount_in": int(amount * 10**token_a.decimals),
-            "token_path": [token_a.address, token_b.address],
-            "router_path": [self.router_address],
-            "token_prices": [
+        # call the quote function on the NablaQuote contract
+        nabla_quote_contract = contract_instance(NABLA_QUOTE_PUBLIC_ID, self.web3, self.nabla_quote_address)
+        amount_out_token_b_units, amount_out_token_a_units = nabla_quote_contract.functions.quote(
+            _amountIn=int(amount * 10**token_a.decimals),
+            _tokenPath=[token_a.address, token_b.address],
+            _routerPath=[self.router_address],
+            _tokenPrices=[
                 token_prices[token_a.address],
                 token_prices[token_b.address],
             ],
-        }
-
-        # call the quote function on the NablaQuote contract
-        nabla_quote = nabla_quote_contract.quote(
-            ledger_api=self.web3,
-            contract_address=self.nabla_quote_address,
-            **params,
-        )
+        ).call()
 
         # 1) BID price: Quote (sell A → B), i.e. market buy price for B using A
-        amount_out_token_b_units = nabla_quote["bidAmountOut_"]
         amount_out_token_b = amount_out_token_b_units / 10**token_b.decimals
         bid_price = amount_out_token_b / amount  # B per A ($B/$A)
 
@@ -332,7 +289,6 @@ class NablaFinanceClient(BaseErc20Exchange):
         )
 
         # ASK price: Quote (buy A ← B), i.e. market sell price for B using A
-        amount_out_token_a_units = nabla_quote["askAmountOut_"]
         amount_out_token_a = amount_out_token_a_units / 10**token_a.decimals
         ask_price = amount_out_token_b / amount_out_token_a  # B per A ($B/$A)
 
@@ -376,13 +332,13 @@ class NablaFinanceClient(BaseErc20Exchange):
         """
         return from_amount * (from_price / to_price) / (10 ** (from_token_decimals - to_token_decimals))
 
-    async def get_orderbook(self, asset_a: str, asset_b: str, amounts: list[float]) -> list[tuple[float, float]]:  # noqa: PLR0914
+    async def get_orderbook(self, asset_a: str, asset_b: str, amounts: list[float]) -> list[tuple[float, float]]:
         """Get the orderbook for a given token pair.
 
         Args:
         ----
-            from_token_address (str): Address of the token to swap from.
-            to_token_address (str): Address of the token to swap to.
+            asset_a (str): Address of the base token.
+            asset_b (str): Address of the quote token.
             amounts (list[float]): List of amounts to get quotes for.
 
         Returns:
@@ -390,132 +346,88 @@ class NablaFinanceClient(BaseErc20Exchange):
             list[tuple[float, float]]: List of tuples containing (ask_price, bid_price) for each amount.
 
         """
-        # fetch price data
-        price_feed_response = self.fetch_price_data([asset_a, asset_b])
-        token_a = self.get_token(asset_a)
-        token_b = self.get_token(asset_b)
-        token_prices = price_feed_response.token_prices
+        depth = await self.get_depth({(asset_a, asset_b): amounts})
+        return depth[(asset_a, asset_b)].levels or [(None, None)] * len(amounts)
 
-        # load the Multicall3 contract
-        multicall3_contract = load_contract(PublicId.from_str(MULTICALL3_PUBLIC_ID))
-        # load the NablaQuote contract
-        nabla_quote_contract = load_contract(PublicId.from_str(NABLA_QUOTE_PUBLIC_ID))
-
-        # Prepare the calls for the Multicall3 contract
-        bid_amounts = []
-        ask_amounts = []
-        call3s = []
-        quotes = []
-
-        for amount in amounts:
-            # Prepare amounts in token units
-            bid_amount_in = int(amount * 10**token_a.decimals)
-            ask_amount_in = int(
-                await self.convert_amount(
-                    from_amount=bid_amount_in,
-                    from_price=token_prices[token_a.address],
-                    to_price=token_prices[token_b.address],
-                    from_token_decimals=token_a.decimals,
-                    to_token_decimals=token_b.decimals,
-                )
-            )
+    async def get_depth(self, ladders: dict[tuple[str, str], list[float]]) -> dict[tuple[str, str], DepthCurve]:
+        """Quote both sides of every pair at each amount of its ladder, all read at the same block.
 
-            # Save bid/ask amounts in decimals
-            bid_amounts.append(amount)
-            ask_amounts.append(ask_amount_in / 10**token_b.decimals)
-
-            params = {
-                "bid_amount_in": bid_amount_in,
-                "ask_amount_in": ask_amount_in,
-                "token_path": [token_a.address, token_b.address],
-                "router_path": [self.router_address],
-                "token_prices": [
-                    token_prices[token_a.address],
-                    token_prices[token_b.address],
-                ],
-            }
+        Every quote goes into one Multicall3 call, split into several only when
+        it would exceed the gas or calldata budget of a single call.
 
-            nabla_quote_calldata = nabla_quote_contract.quote_with_reference_price_calldata(
-                ledger_api=self.web3,
-                contract_address=self.nabla_quote_address,
-                **params,
-            )
+        Args:
+        ----
+            ladders (dict[tuple[str, str], list[float]]): Amounts of base token to quote,
+                keyed by (base, quote) address.
 
-            quote_call3_struct = {
-                "target": self.nabla_quote_address,
-                "allowFailure": True,
-                "callData": nabla_quote_calldata,
-            }
+        Returns:
+        -------
+            dict[tuple[str, str], DepthCurve]: The ask and bid prices for each amount, keyed by pair.
 
-            call3s.append(quote_call3_struct)
+        """
+        assets = list(dict.fromkeys(asset for pair in ladders for asset in pair))
+        token_prices = (await self.fetch_price_data(assets)).token_prices
+
+        calls, ask_amounts = [], []
+        for (base, quote), amounts in ladders.items():
+            token_a, token_b = self.get_token(base), self.get_token(quote)
+            prices = [token_prices[base], token_prices[quote]]
+            for amount in amounts:
+                bid_amount_in = int(amount * 10**token_a.decimals)
+                ask_amount_in = get_reference_amount(bid_amount_in, *prices, token_a.decimals, token_b.decimals)
+                ask_amounts.append(ask_amount_in / 10**token_b.decimals)
+                calls.append(
+                    {
+                        "target": self.nabla_quote_address,
+                        "allowFailure": True,
+                        "callData": encode_quote_with_reference_price(
+                            bid_amount_in,
+                            ask_amount_in,
+                            [token_a.address, token_b.address],
+                            [self.router_address],
+                            prices,
+                        ),
+                    }
+                )
 
-        # Call the Multicall3 contract to aggregate the quotes
-        multicall3_quotes_calldata = multicall3_contract.aggregate3(
-            ledger_api=self.web3, contract_address=MULTICALL3_ADDRESS, calls=call3s
+        block_number = await self.run_blocking(self.block_cache.head_tracker.head)
+        batches = chunk_calls(calls, **self.depth_budget)
+        batch_results = await asyncio.gather(
+            *(self.run_blocking(read_batch, self.web3, batch, block_number) for batch in batches)
         )
-        multicall3_quotes_returned = multicall3_quotes_calldata.call()
-
-        # Decode the multicall3 returned data
-        for i, (success, returned_data) in enumerate(multicall3_quotes_returned):
-            if not success:
-                self.logger.error(f"Multicall3 call {i} for amount {bid_amounts[i]} failed.")
-                quotes.append((None, None))
-                continue
-
-            if len(returned_data) < 64:
-                self.logger.error(f"Multicall3 call {i} for amount {bid_amounts[i]} returned unexpected data length.")
-                quotes.append((None, None))
-                continue
-
-            # Decode bid and ask as uint256
-            amount_out_token_b_units = int.from_bytes(returned_data[:32], byteorder="big")
-            amount_out_token_a_units = int.from_bytes(returned_data[32:64], byteorder="big")
-
-            # Convert to decimals
-            amount_out_token_b = amount_out_token_b_units / 10**token_b.decimals
-            amount_out_token_a = amount_out_token_a_units / 10**token_a.decimals
-
-            # BID price: Quote (sell A → B), i.e. market buy price for B using A, i.e. B per A ($B/$A)
-            bid_price = amount_out_token_b / bid_amounts[i] if bid_amounts[i] != 0.0 else 0.0
-
-            self.logger.info(
-                "### BID quote $%s → $%s: %.6f $%s → %.6f $%s; bid_price = %.6f $%s/$%s",
-                token_a.symbol,
-                token_b.symbol,
-                bid_amounts[i],
-                token_a.symbol,
-                amount_out_token_b,
-                token_b.symbol,
-                bid_price,
-                token_b.symbol,
-                token_a.symbol,
+        results = iter([result for batch_result in batch_results for result in batch_result])
+        ask_amounts = iter(ask_amounts)
+
+        depth = {}
+        for (base, quote), amounts in ladders.items():
+            token_a, token_b = self.get_token(base), self.get_token(quote)
+            asks, bids = [], []
+            for amount in amounts:
+                ask_amount_in = next(ask_amounts)
+                quote_out = decode_quote(*next(results))
+                if quote_out is None:
+                    self.logger.error(f"Nabla quote of {amount} {token_a.symbol}/{token_b.symbol} failed.")
+                    asks.append(None)
+                    bids.append(None)
+                    continue
+                # bid: sell A for B, ask: buy A with B, both in B per A.
+                amount_out_b = quote_out[0] / 10**token_b.decimals
+                amount_out_a = quote_out[1] / 10**token_a.decimals
+                bids.append(amount_out_b / amount if amount and amount_out_b else None)
+                asks.append(ask_amount_in / amount_out_a if amount_out_a and ask_amount_in else None)
+            depth[(base, quote)] = DepthCurve(
+                base=base,
+                quote=quote,
+                amounts=tuple(amounts),
+                asks=tuple(asks),
+                bids=tuple(bids),
+                block_number=block_number,
             )
-
-            # ASK price: Quote (buy A ← B), i.e. market sell price for B using A, i.e. B per A ($B/$A)
-
-            ask_price = ask_amounts[i] / amount_out_token_a if amount_out_token_a != 0.0 else 0.0
-
-            self.logger.info(
-                "### ASK quote $%s → $%s: %.6f $%s → %.6f $%s; ask_price = %.6f $%s/$%s",
-                token_b.symbol,
-                token_a.symbol,
-                ask_amounts[i],
-                token_b.symbol,
-                amount_out_token_a,
-                token_a.symbol,
-                ask_price,
-                token_b.symbol,
-                token_a.symbol,
+            self.logger.debug(
+                f"Nabla depth {token_a.symbol}/{token_b.symbol} at block {block_number}: "
+                f"asks {asks} bids {bids} for amounts {amounts}"
             )
-
-            quotes.append(
-                (
-                    ask_price if ask_price != 0.0 else None,
-                    bid_price if bid_price != 0.0 else None,
-                )
-            )
-
-        return quotes or [(None, None)] * len(amounts)
+        return depth
 
     async def fetch_ticker(
         self,
@@ -538,7 +450,7 @@ class NablaFinanceClient(BaseErc20Exchange):
         asset_b = self.look_up_by_symbol(b_sym, ledger=self.supported_ledger)
 
         if not asset_a or not asset_b:
-            msg = f"Could not find token addresses for `{asset_a}` and `{asset_b}` " f"with symbols {a_sym} and {b_sym}"
+            msg = f"Could not find token addresses for `{asset_a}` and `{asset_b}` with symbols {a_sym} and {b_sym}"
             raise ValueError(msg)
 
         # get live ask/bid for X units of asset A from NablaQuote contract
@@ -589,7 +501,7 @@ class NablaFinanceClient(BaseErc20Exchange):
     ):
         """Create an order."""
 
-        price_feed_response = self.fetch_price_data([asset_a, asset_b])
+        price_feed_response = await self.fetch_price_data([asset_a, asset_b])
         token_a = self.get_token(asset_a)
         token_b = self.get_token(asset_b)
 
@@ -621,20 +533,22 @@ class NablaFinanceClient(BaseErc20Exchange):
             price_update_data=[price_feed_response.price_update_data],
         )
 
-        swap_tx = swap_fn.build_transaction(
-            {
-                "from": self.account.address,
-                "nonce": self.web3.api.eth.get_transaction_count(self.account.address),
-                "gas": 850_000,
-                "gasPrice": int(self.web3.api.eth.gas_price * 1.1),
-            }
-        )
-        self.logger.info("Built swap transaction", extra={"tx": swap_tx})
-        signed_tx = signed_tx_to_dict(self.account.entity.sign_transaction(swap_tx))
-        tx_hash = try_send_signed_transaction(self.web3, signed_tx, raise_on_try=True)
+        def build(nonce: int) -> dict:
+            swap_tx = swap_fn.build_transaction(
+                {
+                    "from": self.account.address,
+                    "nonce": nonce,
+                    "gas": 850_000,
+                    **self.fee_oracle.fees("medium"),
+                }
+            )
+            self.logger.info("Built swap transaction", extra={"tx": swap_tx})
+            return swap_tx
+
+        tx_hash = await self.run_blocking(self.send_transaction, build)
 
         try:
-            receipt = self.web3.api.eth.wait_for_transaction_receipt(tx_hash, timeout=60, poll_latency=1)
+            receipt = await self.wait_for_receipt(tx_hash, timeout=60)
             if receipt.get("status") == 1:
                 self.logger.info(
                     "Transaction succeeded",
@@ -647,9 +561,9 @@ class NablaFinanceClient(BaseErc20Exchange):
             else:
                 self.logger.info("Transaction failed on-chain", extra={"receipt": receipt})
                 status = OrderStatus.FAILED
-        except TimeExhausted:
+        except RequestTimeout:
             self.logger.exception(f"Timeout waiting for transaction receipt: {tx_hash}")
-            receipt = None
+            status = OrderStatus.SUBMITTED
 
         return Order(
             exchange_id=self.exchange_id.lower(),
@@ -701,25 +615,18 @@ class NablaFinanceClient(BaseErc20Exchange):
 
         """
 
-        nabla_portal_contract = load_contract(PublicId.from_str(NABLA_PORTAL_PUBLIC_ID))
-        token_prices = [
-            token_prices[from_token_address],
-            token_prices[to_token_address],
-        ]
-        params = {
-            "amount_in": int(amount),
-            "token_path": [from_token_address, to_token_address],
-            "router_path": [self.router_address],
-            "token_prices": token_prices,
-        }
-        swap_amount_out = nabla_portal_contract.quote_swap_exact_tokens_for_tokens(
-            ledger_api=self.web3,
-            contract_address=self.spender_address,
-            **params,
-        )
-        return swap_amount_out["amountOut_"]
+        nabla_portal_contract = contract_instance(NABLA_PORTAL_PUBLIC_ID, self.web3, self.spender_address)
+        return nabla_portal_contract.functions.quoteSwapExactTokensForTokens(
+            _amountIn=int(amount),
+            _tokenPath=[from_token_address, to_token_address],
+            _routerPath=[self.router_address],
+            _tokenPrices=[
+                token_prices[from_token_address],
+                token_prices[to_token_address],
+            ],
+        ).call()
 
-    def fetch_price_data(self, asset_addresses) -> PriceFeedResponse:
+    async def fetch_price_data(self, asset_addresses) -> PriceFeedResponse:
         """Fetch price data from the Nabla Finance API.
 
         Args:
@@ -735,15 +642,12 @@ class NablaFinanceClient(BaseErc20Exchange):
 
         """
 
-        price_feeds = {addr: self.get_price_feed_id(addr) for addr in asset_addresses}
+        missing = [addr for addr in asset_addresses if addr not in self.nabla_price_feed_ids]
+        if missing:
+            # feed ids never change, so the oracle is only asked once per asset.
+            await self.run_blocking(lambda: [self.get_price_feed_id(addr) for addr in missing])
+        price_feeds = {addr: self.nabla_price_feed_ids[addr] for addr in asset_addresses}
         feed_to_address = {feed_id.hex(): addr for addr, feed_id in price_feeds.items()}
 
-        params = [("ids[]", id_) for id_ in price_feeds.values()]
-        response = requests.get(NABLA_PRICE_API_URL, data=params, timeout=10)
-
-        if response.status_code != 200:
-            msg = f"Failed to fetch price data: {response.status_code} - {response.text}"
-            raise ValueError(msg)
-
-        payload = {**response.json(), "feed_to_address": feed_to_address}
-        return PriceFeedResponse.parse_obj(payload)
+        payload = await self.price_feed.get_prices(price_feeds.values())
+        return PriceFeedResponse.parse_obj({**payload, "feed_to_address": feed_to_address})
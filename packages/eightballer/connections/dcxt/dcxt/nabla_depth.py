@@ -0,0 +1,91 @@
+"""Depth curves for many Nabla pairs, quoted through chunked Multicall3 batches pinned to one block."""
+
+from typing import Any
+from dataclasses import dataclass
+
+from eth_abi import encode
+
+from packages.eightballer.connections.dcxt.utils import function_selector
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import aggregate3
+
+
+QUOTE_WITH_REFERENCE_PRICE = function_selector("quoteWithReferencePrice(uint256,uint256,address[],address[],uint256[])")
+QUOTE_ARGUMENT_TYPES = ["uint256", "uint256", "address[]", "address[]", "uint256[]"]
+
+# a reference-priced quote walks both swap directions through the router.
+DEFAULT_GAS_PER_QUOTE = 500_000
+# kept well below the eth_call gas cap of public RPC endpoints.
+DEFAULT_MAX_BATCH_GAS = 25_000_000
+DEFAULT_MAX_BATCH_BYTES = 96_000
+# the call struct around each calldata: target, allowFailure, offset and length words.
+CALL_OVERHEAD_BYTES = 4 * 32
+
+
+@dataclass(frozen=True)
+class DepthCurve:
+    """Ask and bid prices of `base` in `quote` for each amount of base, None where the pool cannot quote."""
+
+    base: str
+    quote: str
+    amounts: tuple[float, ...]
+    asks: tuple[float | None, ...]
+    bids: tuple[float | None, ...]
+    block_number: int
+
+    @property
+    def levels(self) -> list[tuple[float | None, float | None]]:
+        """The (ask, bid) prices for each amount."""
+        return list(zip(self.asks, self.bids, strict=True))
+
+
+def get_reference_amount(amount: int, from_price: int, to_price: int, from_decimals: int, to_decimals: int) -> int:
+    """Convert an amount of one token to another at their reference prices, in token units."""
+    return int(amount * (from_price / to_price) / (10 ** (from_decimals - to_decimals)))
+
+
+def encode_quote_with_reference_price(
+    bid_amount_in: int,
+    ask_amount_in: int,
+    token_path: list[str],
+    router_path: list[str],
+    token_prices: list[int],
+) -> bytes:
+    """Encode a `quoteWithReferencePrice` call without going through a contract instance."""
+    return QUOTE_WITH_REFERENCE_PRICE + encode(
+        QUOTE_ARGUMENT_TYPES, [bid_amount_in, ask_amount_in, token_path, router_path, token_prices]
+    )
+
+
+def chunk_calls(
+    calls: list[dict[str, Any]],
+    gas_per_call: int = DEFAULT_GAS_PER_QUOTE,
+    max_batch_gas: int = DEFAULT_MAX_BATCH_GAS,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+) -> list[list[dict[str, Any]]]:
+    """Split calls into the fewest consecutive batches that stay within the gas and calldata budgets."""
+    batches: list[list[dict[str, Any]]] = []
+    batch: list[dict[str, Any]] = []
+    batch_gas = batch_bytes = 0
+    for call in calls:
+        call_bytes = len(call["callData"]) + CALL_OVERHEAD_BYTES
+        if batch and (batch_gas + gas_per_call > max_batch_gas or batch_bytes + call_bytes > max_batch_bytes):
+            batches.append(batch)
+            batch, batch_gas, batch_bytes = [], 0, 0
+        batch.append(call)
+        batch_gas += gas_per_call
+        batch_bytes += call_bytes
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def decode_quote(success: bool, data: bytes) -> tuple[int, int] | None:
+    """Decode the (bid, ask) amounts out of a quote, None if it failed."""
+    if not success or len(data) < 64:
+        return None
+    return int.from_bytes(data[:32], "big"), int.from_bytes(data[32:64], "big")
+
+
+def read_batch(ledger_api: Any, batch: list[dict[str, Any]], block_identifier: int) -> list[tuple[bool, bytes]]:
+    """Read a batch of calls in a single Multicall3 call at the block."""
+    return aggregate3(ledger_api, batch, block_identifier)
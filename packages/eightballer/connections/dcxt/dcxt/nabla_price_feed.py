@@ -0,0 +1,154 @@
+"""Async client for the Nabla price API, with a short-lived per-feed cache."""
+
+import time
+import asyncio
+from typing import Any
+from dataclasses import dataclass
+from collections.abc import Callable, Iterable
+
+import httpx
+
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.exceptions import ExchangeError, RequestTimeout
+
+
+DEFAULT_TTL = 0.5
+# feeds asked for within this window are refreshed together with every fetch.
+DEFAULT_WATCH_WINDOW = 30.0
+
+
+def normalise_feed_id(feed_id: str | bytes) -> str:
+    """Get a feed id as lowercase hex without a `0x` prefix, as the price API reports it."""
+    if isinstance(feed_id, bytes):
+        return feed_id.hex()
+    return feed_id.lower().removeprefix("0x")
+
+
+@dataclass(frozen=True, eq=False)
+class PriceUpdate:
+    """The parsed prices and the signed update data returned by one request to the price API."""
+
+    binary: tuple[str, ...]
+    encoding: str
+    parsed: dict[str, dict[str, Any]]
+    fetched_at: float
+
+    def to_payload(self, feed_ids: Iterable[str]) -> dict[str, Any]:
+        """Get the response of the price API restricted to the given feeds, the update data covering every feed."""
+        return {
+            "binary": {"data": list(self.binary), "encoding": self.encoding},
+            "parsed": [self.parsed[feed_id] for feed_id in feed_ids if feed_id in self.parsed],
+        }
+
+
+class NablaPriceFeed:
+    """Reference prices from the Nabla price API.
+
+    Every fetch asks for the union of the requested feeds and those asked for
+    recently, in a single request through the shared session pool. Prices are
+    served from memory for `ttl` seconds, and callers needing feeds that an
+    in-flight request already covers wait for it instead of sending another.
+    """
+
+    def __init__(
+        self,
+        sessions: SessionPool,
+        url: str,
+        ttl: float = DEFAULT_TTL,
+        watch_window: float = DEFAULT_WATCH_WINDOW,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the client."""
+        self.sessions = sessions
+        self.url = url
+        self.ttl = ttl
+        self.watch_window = watch_window
+        self._clock = clock
+        self._updates: dict[str, PriceUpdate] = {}
+        self._watched: dict[str, float] = {}
+        self._in_flight: list[tuple[frozenset[str], asyncio.Future]] = []
+        self.stats = {"requests": 0, "hits": 0, "shared": 0}
+
+    def _get_cached(self, feed_ids: frozenset[str], now: float) -> PriceUpdate | None:
+        updates = {self._updates.get(feed_id) for feed_id in feed_ids}
+        if len(updates) != 1:
+            # the update data of different requests cannot be combined.
+            return None
+        update = updates.pop()
+        if update is None or now - update.fetched_at >= self.ttl:
+            return None
+        return update
+
+    async def get_prices(self, feed_ids: Iterable[str | bytes]) -> dict[str, Any]:
+        """Get the latest prices and update data of the feeds, in the format of the price API response."""
+        feed_ids = frozenset(normalise_feed_id(feed_id) for feed_id in feed_ids)
+        now = self._clock()
+        for feed_id in feed_ids:
+            self._watched[feed_id] = now
+        while True:
+            update = self._get_cached(feed_ids, self._clock())
+            if update is not None:
+                self.stats["hits"] += 1
+                return update.to_payload(feed_ids)
+            future = next((future for covered, future in self._in_flight if feed_ids <= covered), None)
+            if future is None:
+                break
+            try:
+                update = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    continue
+                raise
+            self.stats["shared"] += 1
+            return update.to_payload(feed_ids)
+        update = await self._fetch(feed_ids | self._get_watched(now))
+        return update.to_payload(feed_ids)
+
+    def _get_watched(self, now: float) -> frozenset[str]:
+        self._watched = {
+            feed_id: asked_at for feed_id, asked_at in self._watched.items() if now - asked_at < self.watch_window
+        }
+        return frozenset(self._watched)
+
+    async def _fetch(self, feed_ids: frozenset[str]) -> PriceUpdate:
+        future = asyncio.get_running_loop().create_future()
+        # waiting callers retrieve the exception, this avoids the warning when there are none.
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        flight = (feed_ids, future)
+        self._in_flight.append(flight)
+        self.stats["requests"] += 1
+        try:
+            update = await self._request(sorted(feed_ids))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            self._in_flight.remove(flight)
+        for feed_id in feed_ids:
+            self._updates[feed_id] = update
+        future.set_result(update)
+        return update
+
+    async def _request(self, feed_ids: list[str]) -> PriceUpdate:
+        try:
+            response = await self.sessions.get(self.url, params=[("ids[]", feed_id) for feed_id in feed_ids])
+        except httpx.TransportError as error:
+            msg = f"Failed to reach the Nabla price API: {error!r}"
+            raise RequestTimeout(msg) from error
+        if response.status_code != 200:
+            msg = f"Failed to fetch price data: {response.status_code} - {response.text}"
+            raise ExchangeError(msg)
+        payload = response.json()
+        return PriceUpdate(
+            binary=tuple(payload["binary"]["data"]),
+            encoding=payload["binary"]["encoding"],
+            parsed={normalise_feed_id(entry["id"]): entry for entry in payload["parsed"]},
+            fetched_at=self._clock(),
+        )
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the request counters and the feeds being refreshed."""
+        return {**self.stats, "watched": len(self._watched), "in_flight": len(self._in_flight)}
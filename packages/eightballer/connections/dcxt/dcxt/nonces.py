@@ -0,0 +1,194 @@
+"""Local nonce allocation for the accounts sending transactions."""
+
+import time
+import bisect
+import threading
+import contextlib
+from typing import Any, ClassVar
+from dataclasses import dataclass
+from collections.abc import Callable, Iterator
+
+
+# a sent transaction the node has not mined for this long triggers a resync, to find dropped nonces.
+DEFAULT_RESYNC_INTERVAL = 60.0
+# errors meaning the local view of the account's nonces is wrong.
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "already known",
+    "replacement transaction underpriced",
+    "invalid nonce",
+)
+
+
+@dataclass
+class PendingTransaction:
+    """A nonce handed out and not yet seen mined."""
+
+    nonce: int
+    tx_hash: str | None = None
+    sent_at: float | None = None
+
+
+@dataclass
+class NonceStats:
+    """Counters for a nonce manager."""
+
+    allocated: int = 0
+    reused: int = 0
+    released: int = 0
+    confirmed: int = 0
+    dropped: int = 0
+    resyncs: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        """Return the counters as a plain dict."""
+        return {
+            "allocated": self.allocated,
+            "reused": self.reused,
+            "released": self.released,
+            "confirmed": self.confirmed,
+            "dropped": self.dropped,
+            "resyncs": self.resyncs,
+        }
+
+
+class NonceManager:
+    """Hands out the nonces of an account locally, so several transactions can be in flight.
+
+    The account's nonce is read from the ledger on first use, after a send
+    fails with a nonce error, and when a sent transaction stays unmined for
+    `resync_interval`. Nonces that were handed out but never sent, or that
+    the ledger dropped, are handed out again before fresh ones, so a gap
+    cannot hold up the transactions sent after it.
+    """
+
+    _instances: ClassVar[dict[tuple[str, str], "NonceManager"]] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        address: str,
+        get_transaction_count: Callable[[str, str], int],
+        resync_interval: float = DEFAULT_RESYNC_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the manager; `get_transaction_count(address, block)` reads the ledger."""
+        self.address = address
+        self._get_transaction_count = get_transaction_count
+        self.resync_interval = resync_interval
+        self._clock = clock
+        self.stats = NonceStats()
+        self._lock = threading.Lock()
+        self._next: int | None = None
+        self._free: list[int] = []
+        self.pending: dict[int, PendingTransaction] = {}
+        self._synced_at: float | None = None
+
+    @classmethod
+    def for_account(cls, ledger_api: Any, ledger_id: str, address: str) -> "NonceManager":
+        """Get the manager shared by every exchange sending from the account on the ledger."""
+        key = (ledger_id, address)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(address, ledger_api.eth.get_transaction_count)
+            return cls._instances[key]
+
+    def allocate(self) -> int:
+        """Hand out the lowest nonce that is free."""
+        with self._lock:
+            if self._needs_resync():
+                self._resync()
+            self.stats.allocated += 1
+            if self._free:
+                self.stats.reused += 1
+                nonce = self._free.pop(0)
+            else:
+                nonce = self._next
+                self._next += 1
+            self.pending[nonce] = PendingTransaction(nonce)
+            return nonce
+
+    def sent(self, nonce: int, tx_hash: str | None) -> None:
+        """Record that the transaction using the nonce was accepted by the node."""
+        if tx_hash is None:
+            return
+        with self._lock:
+            self.pending[nonce] = PendingTransaction(nonce, tx_hash, self._clock())
+
+    def release(self, nonce: int) -> None:
+        """Give back a nonce whose transaction was never sent, so the next allocation fills the gap."""
+        with self._lock:
+            pending = self.pending.get(nonce)
+            if pending is None or pending.tx_hash is not None:
+                return
+            del self.pending[nonce]
+            self.stats.released += 1
+            bisect.insort(self._free, nonce)
+
+    def confirm(self, tx_hash: str) -> None:
+        """Forget the nonce of a transaction once it is mined."""
+        with self._lock:
+            for nonce, pending in list(self.pending.items()):
+                if pending.tx_hash == tx_hash:
+                    del self.pending[nonce]
+                    self.stats.confirmed += 1
+
+    def nonce_of(self, tx_hash: str) -> int | None:
+        """The nonce a pending transaction was sent at."""
+        with self._lock:
+            return next((nonce for nonce, pending in self.pending.items() if pending.tx_hash == tx_hash), None)
+
+    def invalidate(self) -> None:
+        """Resync with the ledger on the next allocation."""
+        with self._lock:
+            self._synced_at = None
+
+    @contextlib.contextmanager
+    def use(self) -> Iterator[int]:
+        """Allocate a nonce for building and sending a transaction.
+
+        Unless `sent` is called for it, the nonce is released when the block
+        exits; a nonce error from the node also resyncs the next allocation.
+        """
+        nonce = self.allocate()
+        try:
+            yield nonce
+        except Exception as error:
+            if any(message in str(error).lower() for message in NONCE_ERRORS):
+                self.invalidate()
+            raise
+        finally:
+            self.release(nonce)
+
+    def _needs_resync(self) -> bool:
+        if self._synced_at is None:
+            return True
+        now = self._clock()
+        if now - self._synced_at < self.resync_interval:
+            return False
+        return any(
+            pending.sent_at is not None and now - pending.sent_at >= self.resync_interval
+            for pending in self.pending.values()
+        )
+
+    def _resync(self) -> None:
+        mined = self._get_transaction_count(self.address, "latest")
+        known = max(mined, self._get_transaction_count(self.address, "pending"))
+        self.stats.resyncs += 1
+        self._synced_at = self._clock()
+        for nonce in [nonce for nonce in self.pending if nonce < mined]:
+            # mined, either as sent or as a replacement.
+            del self.pending[nonce]
+            self.stats.confirmed += 1
+        pending = self.pending.get(known)
+        if pending is not None and pending.tx_hash is not None:
+            # the node would count the transaction had it kept it.
+            del self.pending[known]
+            self.stats.dropped += 1
+        self._next = max(known, self._next or 0)
+        self._free = [nonce for nonce in range(known, self._next) if nonce not in self.pending]
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the counters, the next fresh nonce and the number of nonces in flight."""
+        return {**self.stats.to_dict(), "next": self._next, "pending": len(self.pending), "free": len(self._free)}
@@ -2,31 +2,23 @@
 
 import os
 import sys
+import time
+import random
 import asyncio
 import logging
-import contextlib
-from typing import TYPE_CHECKING, Any, cast
+from typing import Any, ClassVar
 from decimal import Decimal
 from datetime import datetime
-from functools import cache
 from dataclasses import dataclass
 
 import click
 import httpx
 from web3 import Web3
-from web3.exceptions import TimeExhausted
-from aea_ledger_ethereum import (
-    Address,
-    HexBytes,
-    JSONLike,
-    EthereumApi,
-    EthereumCrypto,
-    SignedTransaction,
-    try_decorator,
-)
+from aea_ledger_ethereum import Address, EthereumApi, EthereumCrypto
 from aea.configurations.base import PublicId
 
 from packages.eightballer.connections.dcxt.utils import load_contract
+from packages.eightballer.connections.dcxt.dcxt.rate_limit import TokenBucket
 from packages.eightballer.protocols.orders.custom_types import (
     Order,
     OrderSide,
@@ -34,39 +26,13 @@ from packages.eightballer.protocols.orders.custom_types import (
     OrderStatus,
 )
 from packages.eightballer.protocols.tickers.custom_types import Ticker
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.quote_cache import QuoteCache
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RequestTimeout, ExchangeNotAvailable
 from packages.eightballer.connections.dcxt.dcxt.data.tokens import SupportedLedgers
 from packages.eightballer.connections.dcxt.dcxt.defi_exchange import BaseErc20Exchange
 
 
-if TYPE_CHECKING:
-    from packages.eightballer.connections.dcxt.erc_20.contract import Erc20
-
-
-def signed_tx_to_dict(signed_transaction: Any) -> dict[str, str | int]:
-    """Write SignedTransaction to dict."""
-    signed_transaction_dict: dict[str, str | int] = {
-        "raw_transaction": cast(str, signed_transaction.raw_transaction.hex()),
-        "hash": cast(str, signed_transaction.hash.hex()),
-        "r": cast(int, signed_transaction.r),
-        "s": cast(int, signed_transaction.s),
-        "v": cast(int, signed_transaction.v),
-    }
-    return signed_transaction_dict
-
-
-@try_decorator("Unable to send transaction: {}", logger_method="warning")
-def try_send_signed_transaction(ethereum_api: EthereumApi, tx_signed: JSONLike, **_kwargs: Any) -> str | None:
-    """Try send a raw signed transaction."""
-    signed_transaction = SignedTransactionTranslator.from_dict(tx_signed)
-    hex_value = ethereum_api.api.eth.send_raw_transaction(  # pylint: disable=no-member
-        signed_transaction.raw_transaction
-    )
-    tx_digest = hex_value.hex()
-    if not tx_digest.startswith("0x"):
-        tx_digest = "0x" + tx_digest
-    return tx_digest
-
-
 class InvalidSwapParams(Exception):
     """Exception raised for invalid swap parameters."""
 
@@ -87,6 +53,15 @@ LEDGER_TO_CHAIN_ID = {
     SupportedLedgers.BASE: 8453,
 }
 
+# the request rate of the 1inch developer portal's free tier, shared by every client using the same key.
+DEFAULT_API_BUDGET = {"rate": 1.0, "burst": 1.0}
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BACKOFF = 1.0
+DEFAULT_MAX_BACKOFF = 16.0
+RATE_LIMIT_MESSAGE = "The limit of requests per second has been exceeded"
+# error descriptions the API returns for conditions that clear up on their own.
+TRANSIENT_ERRORS = ("insufficient liquidity",)
+
 
 @dataclass
 class OneInchSwapParams:
@@ -117,36 +92,29 @@ class OneInchSwapParams:
         }
 
 
-class SignedTransactionTranslator:
-    """Translator for SignedTransaction."""
-
-    @staticmethod
-    def to_dict(signed_transaction: SignedTransaction) -> dict[str, str | int]:
-        """Write SignedTransaction to dict."""
-        signed_transaction_dict: dict[str, str | int] = {
-            "raw_transaction": cast(str, signed_transaction.raw_transaction.hex()),
-            "hash": cast(str, signed_transaction.hash.hex()),
-            "r": cast(int, signed_transaction.r),
-            "s": cast(int, signed_transaction.s),
-            "v": cast(int, signed_transaction.v),
+@dataclass
+class EndpointStats:
+    """Counters for one 1inch API endpoint."""
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    rate_limited: int = 0
+    budget_waits: int = 0
+    budget_wait_seconds: float = 0.0
+    total_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "budget_waits": self.budget_waits,
+            "budget_wait_seconds": self.budget_wait_seconds,
+            "mean_latency": self.total_seconds / self.requests if self.requests else 0.0,
         }
-        return signed_transaction_dict
-
-    @staticmethod
-    def from_dict(signed_transaction_dict: JSONLike) -> SignedTransaction:
-        """Get SignedTransaction from dict."""
-        if not isinstance(signed_transaction_dict, dict) and len(signed_transaction_dict) == 5:
-            msg = f"Invalid for conversion. Found object: {signed_transaction_dict}."
-            raise ValueError(  # pragma: nocover
-                msg
-            )
-        return SignedTransaction(
-            raw_transaction=HexBytes(cast(str, signed_transaction_dict["raw_transaction"])),
-            hash=HexBytes(cast(str, signed_transaction_dict["hash"])),
-            r=cast(int, signed_transaction_dict["r"]),
-            s=cast(int, signed_transaction_dict["s"]),
-            v=cast(int, signed_transaction_dict["v"]),
-        )
 
 
 class OneInchSwapApi:
@@ -158,6 +126,8 @@ class OneInchSwapApi:
     api_key: str
     logger: Any
 
+    _budgets: ClassVar[dict[str | None, TokenBucket]] = {}
+
     def __init__(
         self,
         api: EthereumApi,
@@ -165,12 +135,101 @@ class OneInchSwapApi:
         chain_id: int,
         api_key: str,
         logger,
+        sessions: SessionPool | None = None,
+        budget: dict | None = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
     ):
         self.api = api
         self.account = account
         self.chain_id = chain_id
         self.api_key = api_key
         self.logger = logger
+        self.sessions = sessions or SessionPool()
+        self.budget = self.get_budget(api_key, budget)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats: dict[str, EndpointStats] = {}
+
+    @classmethod
+    def get_budget(cls, api_key: str | None, config: dict | None = None) -> TokenBucket:
+        """Get the request budget of an api key, shared by every client using it."""
+        if api_key not in cls._budgets:
+            cls._budgets[api_key] = TokenBucket(**(config or DEFAULT_API_BUDGET))
+        return cls._budgets[api_key]
+
+    def get_backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff before a retry, at least as long as the server asked for."""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    async def _acquire(self, stats: EndpointStats) -> None:
+        while not self.budget.try_acquire():
+            wait = self.budget.time_until_available()
+            stats.budget_waits += 1
+            stats.budget_wait_seconds += wait
+            await asyncio.sleep(wait)
+
+    async def request(self, method_name: str, query_params: dict, retries: int | None = None) -> dict[str, Any]:
+        """Call an API endpoint within the request budget.
+
+        Rate limits, server errors and transient swap errors are retried with
+        jittered backoff; any other error response is returned to the caller.
+        """
+        stats = self.stats.setdefault(method_name, EndpointStats())
+        url = self.api_request_url(method_name, query_params)
+        retries = self.max_retries if retries is None else retries
+        retry_after = None
+        body: dict[str, Any] = {}
+        error: Exception | None = None
+        for attempt in range(retries + 1):
+            if attempt:
+                stats.retries += 1
+                await asyncio.sleep(self.get_backoff(attempt, retry_after))
+            await self._acquire(stats)
+            start = time.monotonic()
+            try:
+                response = await self.sessions.get(url, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=5)
+            except httpx.TransportError as transport_error:
+                stats.errors += 1
+                error = transport_error
+                continue
+            finally:
+                stats.requests += 1
+                stats.total_seconds += time.monotonic() - start
+            if response.status_code == 429 or RATE_LIMIT_MESSAGE in response.text:
+                stats.rate_limited += 1
+                retry_after = float(response.headers.get("Retry-After", 0) or 0)
+                error = ExchangeNotAvailable(f"Rate limit exceeded for 1inch API {method_name}")
+                self.logger.warning(
+                    f"Rate limit exceeded for 1inch API {method_name}, retries left: {retries - attempt}"
+                )
+                continue
+            if response.status_code >= 500:
+                stats.errors += 1
+                error = ExchangeNotAvailable(f"1inch API {method_name} failed: {response.status_code}")
+                continue
+            try:
+                body = response.json()
+            except ValueError as decoding_error:
+                stats.errors += 1
+                error = decoding_error
+                continue
+            if "error" in body and any(message in body.get("description", "") for message in TRANSIENT_ERRORS):
+                stats.errors += 1
+                error = InvalidSwapParams(body["description"])
+                continue
+            return body
+        if isinstance(error, ExchangeNotAvailable | InvalidSwapParams):
+            raise error
+        msg = f"1inch API {method_name} is not available"
+        raise ExchangeNotAvailable(msg) from error
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Return the counters of every endpoint called."""
+        return {method_name: stats.to_dict() for method_name, stats in self.stats.items()}
 
     def api_request_url(
         self,
@@ -183,41 +242,17 @@ class OneInchSwapApi:
             + f"{'&'.join([f'{key}={value}' for key, value in query_params.items()])}"
         )
 
-    def sign_swap_txn(self, swap_transaction):
-        """Sign the swap transaction."""
-        return signed_tx_to_dict(self.account.entity.sign_transaction(swap_transaction))
-
-    async def build_tx_for_swap(self, swap_params, retries=5, cooldown=1):
+    async def build_tx_for_swap(self, swap_params, retries=None):
         """Build the transaction for the swap."""
-        url = self.api_request_url("/swap", swap_params.to_json())
-        try:
-            response = await httpx.get(url, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=5)  # noqa
-            swap_transaction = response.json()
-        except httpx.DecodingError:
-            if "The limit of requests per second has been exceeded" in response.text:
-                self.logger.exception(
-                    f"Rate limit exceeded for 1inch API remaining: {retries} cooldown: {cooldown}",
-                )
-                if retries == 0:
-                    raise
-                await asyncio.sleep(cooldown)
-                return await self.build_tx_for_swap(swap_params, retries - 1, cooldown * 2)
+        swap_transaction = await self.request("/swap", swap_params.to_json(), retries=retries)
         if "error" in swap_transaction:
             if "Not enough" in swap_transaction["description"]:
                 raise InsufficientBalance(swap_transaction["description"])
-            if "insufficient liquidity" in swap_transaction["description"]:
-                if retries == 0:
-                    raise InvalidSwapParams(swap_transaction["description"])
-                await asyncio.sleep(cooldown)
-                self.logger.exception(
-                    f"Rate limit exceeded for 1inch API remaining: {retries} cooldown: {cooldown}",
-                )
-                return await self.build_tx_for_swap(swap_params, retries - 1, cooldown * 2)
             raise InvalidSwapParams(swap_transaction["description"])
         return swap_transaction["tx"]
 
-    async def swap_tokens(self, swap_params, retries=5, nonce=None):
-        """Swap tokens using the 1inch API."""
+    async def build_swap_transaction(self, swap_params) -> dict[str, Any]:
+        """Build the swap transaction from the 1inch API, ready to be sent at a nonce."""
         self.logger.info(f"Starting Swap: {swap_params}")
         swap_transaction = await self.build_tx_for_swap(swap_params)
         swap_transaction["from"] = self.account.address
@@ -225,56 +260,13 @@ class OneInchSwapApi:
         swap_transaction["value"] = int(swap_transaction["value"])
         swap_transaction["gasPrice"] = int(int(swap_transaction["gasPrice"]) * 1.05)
         swap_transaction["chainId"] = self.chain_id
-        cur_nonce = self.api._try_get_transaction_count(self.account.address, raise_on_try=True)  # noqa
-        if nonce and nonce != cur_nonce:
-            self.logger.error(f"Nonce mismatch: {nonce} != {cur_nonce}")
-            return False, None
-        swap_transaction["nonce"] = cur_nonce
-        self.logger.info(f"Signing transaction: {swap_transaction}")
-        signed_txn = self.sign_swap_txn(swap_transaction)
-        self.logger.info(f"Signed transaction: {signed_txn}")
-        txn_hash = try_send_signed_transaction(self.api, signed_txn, raise_on_try=True)
-        self.logger.info(f"Transaction hash: {txn_hash}")
-        result = False
-
-        try:
-            result = self.api.api.eth.wait_for_transaction_receipt(txn_hash, timeout=60, poll_latency=1)
-        except TimeExhausted:
-            self.logger.exception(f"Transaction timed out: {txn_hash}")
-            retries -= 1
-            if retries == 0:
-                return False, txn_hash
-            await asyncio.sleep(2)
-            return await self.swap_tokens(swap_params, retries=retries, nonce=cur_nonce)
+        return swap_transaction
 
-        if not result:
-            return False, txn_hash
-        if result.get("status") == 0:
-            return False, txn_hash
-        return True, txn_hash
-
-    async def get_quote(self, swap_params, retries=10, cooldown=2):
+    async def get_quote(self, swap_params, retries=None):
         """Get a quote for the swap."""
-        try:
-            url = self.api_request_url("/quote", swap_params.to_json())
-            response = await httpx.get(url, headers={"Authorization": f"Bearer {self.api_key}"}, timeout=5)  # noqa
-            quote = response.json()
-        except httpx.DecodingError:
-            self.logger.exception(
-                f"Rate limit exceeded for 1inch API remaining: {retries} cooldown: {cooldown}",
-            )
-            if retries == 0:
-                raise
-            await asyncio.sleep(cooldown)
-            return await self.get_quote(swap_params, retries - 1, cooldown * 2)
+        quote = await self.request("/quote", swap_params.to_json(), retries=retries)
         if "error" in quote:
-            self.logger.exception(
-                f"Rate limit exceeded for 1inch API remaining: {retries} cooldown: {cooldown}",
-            )
-            if retries == 0:
-                raise InvalidSwapParams(quote["description"])
-            await asyncio.sleep(cooldown)
-            return await self.get_quote(swap_params, retries - 1, cooldown * 2)
+            raise InvalidSwapParams(quote["description"])
         return quote
 
     async def close(self):
@@ -386,7 +378,14 @@ class OneInchApiClient(BaseErc20Exchange):
             slippage=str(1),
         )
 
-        res, txn_hash = await self.one_inch_api.swap_tokens(swap_params)
+        swap_transaction = await self.one_inch_api.build_swap_transaction(swap_params)
+        txn_hash = await self.run_blocking(self.send_transaction, lambda nonce: {**swap_transaction, "nonce": nonce})
+        try:
+            receipt = await self.wait_for_receipt(txn_hash, timeout=60)
+            status = OrderStatus.FILLED if receipt.get("status") == 1 else OrderStatus.FAILED
+        except RequestTimeout:
+            self.logger.exception(f"Timeout waiting for transaction receipt: {txn_hash}")
+            status = OrderStatus.SUBMITTED
 
         return Order(
             id=txn_hash,
@@ -396,30 +395,45 @@ class OneInchApiClient(BaseErc20Exchange):
             asset_b=asset_b,
             amount=amount,
             price=kwargs.get("price"),
-            status=OrderStatus.FILLED if res else OrderStatus.FAILED,
+            status=status,
             type=OrderType.MARKET,
             timestamp=datetime.now(tz=datetime.timetz().tzinfo).timestamp(),
         )
 
-    @cache  # noqa
+    async def swap_tokens(self, swap_params, timeout=60) -> tuple[bool, str]:
+        """Swap tokens using the 1inch API, returning whether the swap succeeded and its transaction hash."""
+        swap_transaction = await self.one_inch_api.build_swap_transaction(swap_params)
+        txn_hash = await self.run_blocking(self.send_transaction, lambda nonce: {**swap_transaction, "nonce": nonce})
+        self.logger.info(f"Transaction hash: {txn_hash}")
+        try:
+            receipt = await self.wait_for_receipt(txn_hash, timeout=timeout)
+        except RequestTimeout:
+            self.logger.exception(f"Transaction timed out: {txn_hash}")
+            return False, txn_hash
+        return receipt.get("status") == 1, txn_hash
+
     def get_token_by_name(self, name):
         """Get the token by name."""
-        address = self.names_to_addresses.get(name)
-        if address:
-            return self.get_token(address)
+        token_data = self.token_index.get_by_symbol(name)
+        if token_data:
+            return self.get_token(token_data["address"])
         return None
 
     def __init__(self, ledger_id, rpc_url, key_path, logger, *args, **kwargs):
+        kwargs["sessions"] = kwargs.get("sessions") or SessionPool()
+        super().__init__(ledger_id, rpc_url, key_path, logger, *args, **kwargs)
         self.one_inch_api = OneInchSwapApi(
-            EthereumApi(
-                address=rpc_url,
-            ),
-            EthereumCrypto(key_path),
-            LEDGER_TO_CHAIN_ID[SupportedLedgers(ledger_id)],
+            self.web3,
+            self.account,
+            LEDGER_TO_CHAIN_ID[self.ledger_id],
             kwargs.get("api_key"),
             logger=logger,
+            sessions=kwargs["sessions"],
+            budget=kwargs.get("api_budget"),
+        )
+        self.quote_cache = QuoteCache.from_config(
+            kwargs.get("quote_cache"), get_head=self.block_cache.head_tracker.head, run_blocking=self.run_blocking
         )
-        super().__init__(ledger_id, rpc_url, key_path, logger, *args, **kwargs)
 
     async def get_price(
         self,
@@ -429,21 +443,27 @@ class OneInchApiClient(BaseErc20Exchange):
     ):
         """Get the price of the token."""
         amount = int(amount * 10**input_token.decimals)
-        swap_params = OneInchSwapParams(
-            src=input_token.address,
-            dst=output_token.address,
-            amount=str(amount),
-            from_=self.account.address,
-            disable_estimate=False,
-            allow_partial_fill=False,
-            slippage=str(1),
-        )
-        quote = await self.one_inch_api.get_quote(swap_params)
-        out_amt = int(quote["dstAmount"])
         in_amt_human = amount / 10**input_token.decimals
-        out_amt_human = out_amt / 10**output_token.decimals
-        ratio = in_amt_human / out_amt_human
-        return 1 / ratio, out_amt_human
+
+        async def _query_quote():
+            swap_params = OneInchSwapParams(
+                src=input_token.address,
+                dst=output_token.address,
+                amount=str(amount),
+                from_=self.account.address,
+                disable_estimate=False,
+                allow_partial_fill=False,
+                slippage=str(1),
+            )
+            quote = await self.one_inch_api.get_quote(swap_params)
+            out_amt_human = int(quote["dstAmount"]) / 10**output_token.decimals
+            return out_amt_human / in_amt_human
+
+        # quotes for a nearby amount of the same pair, fetched moments ago, are reused.
+        price = await self.quote_cache.aget_or_fetch(
+            input_token.address, output_token.address, "sell", amount, _query_quote
+        )
+        return price, in_amt_human * price
 
 
 def get_erc_details(contract, api, address, crypto):
@@ -466,51 +486,19 @@ def get_allowance(
 
 
 def increase_allowance(
+    exchange: "OneInchApiClient",
     token_address: Address,
     spender: Address,
     amount: int,
-    ledger_api: EthereumApi,
-    crypto: EthereumCrypto,
-) -> None:
-    """Increase the allowance."""
-    erc20_contract: Erc20 = load_contract(PublicId.from_str("eightballer/erc_20:0.1.0"))
-    func = erc20_contract.approve(
-        ledger_api=ledger_api,
-        contract_address=token_address,
-        to=spender,
-        value=int(amount * 1e6),  # infinite allowance
-    )
-    txn = func.build_transaction(
-        {
-            "from": crypto.address,
-            "nonce": ledger_api.api.eth.get_transaction_count(crypto.address),
-            "gas": 100000,
-            "gasPrice": ledger_api.api.eth.gas_price,
-        }
-    )
-
-    return sign_and_send_txn(txn, crypto, ledger_api)
-
-
-def sign_and_send_txn(txn, crypto, ledger_api):
-    """Sign and send transaction."""
-
-    def _sign_swap_txn(swap_transaction):
-        """Sign the swap transaction."""
-        return signed_tx_to_dict(crypto.entity.sign_transaction(swap_transaction))
-
-    signed_txn = _sign_swap_txn(txn)
-    txn_hash = try_send_signed_transaction(ledger_api, signed_txn)
-    result = False
-    with contextlib.suppress(Exception):
-        result = ledger_api.api.eth.wait_for_transaction_receipt(txn_hash, timeout=600)
-    if result.get("status") == 0:
-        return False, txn_hash
-    return True, txn_hash
+) -> tuple[bool, str]:
+    """Increase the allowance, sent from the exchange's account and waited on through its receipt watcher."""
+    txn_hash = exchange.send_approval(token_address, spender, int(amount * 1e6))  # infinite allowance
+    receipt = exchange.wait_for_receipt_blocking(txn_hash)
+    return receipt.get("status") == 1, txn_hash
 
 
 def perform_swap(
-    one_inch_api: OneInchSwapApi,
+    exchange: OneInchApiClient,
     swap_params: OneInchSwapParams,
     amount: int,
     spent_erc_20_decimals: int,
@@ -519,7 +507,7 @@ def perform_swap(
     """Perform the swap."""
 
     price_quote = asyncio.run(
-        one_inch_api.get_quote(swap_params, retries=0),
+        exchange.one_inch_api.get_quote(swap_params, retries=0),
     )
     in_amt_human = amount / 10**spent_erc_20_decimals
     out_amt_human = int(price_quote["dstAmount"]) / 10**bought_erc_20_decimals
@@ -530,7 +518,7 @@ def perform_swap(
     if input("Proceed with swap? (y/n): ").lower() != "y":
         sys.exit(0)
 
-    result, _txn = asyncio.run(one_inch_api.swap_tokens(swap_params))
+    result, _txn = asyncio.run(exchange.swap_tokens(swap_params))
 
     if result:
         pass
@@ -554,7 +542,7 @@ def perform_swap(
     default="0x8236a87084f8b84306f72007f36f2618a5634494",
 )
 @click.option("--amount", type=int, help="Amount of tokens to swap", default="10000000")
-def main(chain_id, src, dst, amount, api_key):  # noqa
+def main(chain_id, src, dst, amount, api_key):
     """Swap tokens using the 1inch API.
 
     Args:
@@ -564,24 +552,6 @@ def main(chain_id, src, dst, amount, api_key):  # noqa
 
     """
 
-    api = EthereumApi(
-        address="https://eth.drpc.org",
-        chain_id=str(chain_id),
-    )
-    crypto = EthereumCrypto(
-        private_key_path="ethereum_private_key.txt",
-    )
-
-    swap_params = OneInchSwapParams(
-        src=src,
-        dst=dst,
-        amount=amount,
-        from_=crypto.address,
-        slippage=1,
-        disable_estimate=False,
-        allow_partial_fill=False,
-    )
-
     logger = logging.getLogger(__name__)
 
     # We make sure to log to the console
@@ -594,7 +564,30 @@ def main(chain_id, src, dst, amount, api_key):  # noqa
         msg = "ONE_INCH_API_KEY environment variable not set"
         raise UserWarning(msg)
 
-    one_inch_api = OneInchSwapApi(api, crypto, chain_id, api_key=one_inch_api_key, logger=logger)
+    ledger_id = {
+        1: SupportedLedgers.ETHEREUM,
+        100: SupportedLedgers.GNOSIS,
+        8453: SupportedLedgers.BASE,
+    }[chain_id]
+    # the swap and the approval are sent through the exchange, so they share its nonces and receipt watcher.
+    exchange = OneInchApiClient(
+        ledger_id.value,
+        "https://eth.drpc.org",
+        "ethereum_private_key.txt",
+        logger,
+        api_key=one_inch_api_key,
+    )
+    api, crypto = exchange.web3, exchange.account
+
+    swap_params = OneInchSwapParams(
+        src=src,
+        dst=dst,
+        amount=amount,
+        from_=crypto.address,
+        slippage=1,
+        disable_estimate=False,
+        allow_partial_fill=False,
+    )
 
     spent_erc_20_decimals, spent_erc_20_balance, spent_erc_20_symbol = get_erc_details(erc_20, api, src, crypto)
     bought_erc_20_decimals, _bought_erc_20_balance, bought_erc_20_symbol = get_erc_details(erc_20, api, dst, crypto)
@@ -603,19 +596,13 @@ def main(chain_id, src, dst, amount, api_key):  # noqa
         msg = "Insufficient balance in source token"
         raise InsufficientBalance(msg)
 
-    ledger_id = {
-        1: SupportedLedgers.ETHEREUM,
-        100: SupportedLedgers.GNOSIS,
-        8453: SupportedLedgers.BASE,
-    }[chain_id]
     allowance = get_allowance(erc_20, api, src, crypto.address, SPENDER[ledger_id.value])
     if allowance < amount:
-        result = increase_allowance(
+        result, _txn_hash = increase_allowance(
+            exchange,
             token_address=src,
-            spender=SPENDER[str(chain_id)],
+            spender=SPENDER[ledger_id.value],
             amount=amount,
-            ledger_api=api,
-            crypto=crypto,
         )
         if not result:
             msg = "Failed to increase allowance"
@@ -625,7 +612,7 @@ def main(chain_id, src, dst, amount, api_key):  # noqa
     click.echo(f"Spent:  {spent_erc_20_symbol}  : {amount / 10**spent_erc_20_decimals}")
     click.echo(f"Bought: {bought_erc_20_symbol} : {amount / 10**bought_erc_20_decimals}")
 
-    perform_swap(one_inch_api, swap_params, amount, spent_erc_20_decimals, bought_erc_20_decimals)
+    perform_swap(exchange, swap_params, amount, spent_erc_20_decimals, bought_erc_20_decimals)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,216 @@
+"""Local table of submitted orders, polling only the live ones and reporting status changes."""
+
+import time
+import asyncio
+from typing import Any
+from dataclasses import field, dataclass
+from collections.abc import Callable, Awaitable
+
+from packages.eightballer.protocols.orders.custom_types import OrderStatus
+
+
+TERMINAL_STATUSES = frozenset(
+    {OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.CLOSED, OrderStatus.EXPIRED, OrderStatus.FAILED}
+)
+
+DEFAULT_MIN_INTERVAL = 2.0
+DEFAULT_MAX_INTERVAL = 60.0
+# an order is polled again after this share of its age, then of its validity window at most.
+DEFAULT_AGE_FACTOR = 0.25
+DEFAULT_WINDOW_FACTOR = 0.1
+DEFAULT_MAX_CONCURRENCY = 8
+# terminal orders are remembered this long, so a late poll of the account does not report them again.
+DEFAULT_RETENTION = 3600.0
+
+
+@dataclass
+class TrackedOrder:
+    """The last known state of a submitted order and when to poll it next."""
+
+    uid: str
+    status: OrderStatus
+    created_at: float
+    valid_to: float | None = None
+    order: Any = None
+    next_poll: float = 0.0
+    polls: int = 0
+    closed_at: float | None = None
+
+    @property
+    def is_terminal(self) -> bool:
+        """Whether the order can no longer change."""
+        return self.status in TERMINAL_STATUSES
+
+
+@dataclass(frozen=True)
+class OrderUpdate:
+    """The state of an order as reported by the exchange."""
+
+    status: OrderStatus
+    order: Any = None
+    valid_to: float | None = None
+
+
+@dataclass
+class OrderTrackerStats:
+    """Counters for an order tracker."""
+
+    polls: int = 0
+    skipped: int = 0
+    changes: int = 0
+    errors: int = 0
+    by_status: dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return {
+            "polls": self.polls,
+            "skipped": self.skipped,
+            "changes": self.changes,
+            "errors": self.errors,
+            "by_status": dict(self.by_status),
+        }
+
+
+class OrderTracker:
+    """Orders keyed by uid, with each live order polled on its own schedule.
+
+    Young orders are polled every `min_interval`, backing off with their age
+    up to `max_interval`, or a share of their validity window when that is
+    shorter. An order is always polled again as soon as it expires.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = DEFAULT_MIN_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        age_factor: float = DEFAULT_AGE_FACTOR,
+        window_factor: float = DEFAULT_WINDOW_FACTOR,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        retention: float = DEFAULT_RETENTION,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialise the tracker; times are unix seconds, as in order expiries."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.age_factor = age_factor
+        self.window_factor = window_factor
+        self.max_concurrency = max_concurrency
+        self.retention = retention
+        self.clock = clock
+        self.orders: dict[str, TrackedOrder] = {}
+        self.stats = OrderTrackerStats()
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "OrderTracker":
+        """Build a tracker from the `order_tracker` section of an exchange config."""
+        return cls(**(config or {}))
+
+    def __contains__(self, uid: str) -> bool:
+        """Whether the order is tracked."""
+        return uid in self.orders
+
+    def get(self, uid: str) -> TrackedOrder | None:
+        """Get a tracked order."""
+        return self.orders.get(uid)
+
+    @property
+    def live(self) -> list[TrackedOrder]:
+        """The orders that can still change."""
+        return [entry for entry in self.orders.values() if not entry.is_terminal]
+
+    def track(
+        self,
+        uid: str,
+        status: OrderStatus = OrderStatus.OPEN,
+        order: Any = None,
+        valid_to: float | None = None,
+        created_at: float | None = None,
+    ) -> bool:
+        """Track an order, returning whether it was new."""
+        if uid in self.orders:
+            return False
+        now = self.clock()
+        entry = TrackedOrder(uid, status, now if created_at is None else created_at, valid_to, order)
+        if entry.is_terminal:
+            entry.closed_at = now
+        else:
+            entry.next_poll = now + self.get_interval(entry, now)
+        self.orders[uid] = entry
+        return True
+
+    def get_interval(self, entry: TrackedOrder, now: float) -> float:
+        """How long to wait before polling a live order again."""
+        cap = self.max_interval
+        if entry.valid_to is not None:
+            cap = min(cap, max(self.min_interval, (entry.valid_to - entry.created_at) * self.window_factor))
+        interval = min(cap, max(self.min_interval, (now - entry.created_at) * self.age_factor))
+        if entry.valid_to is not None and now < entry.valid_to:
+            interval = min(interval, entry.valid_to - now)
+        return interval
+
+    def due(self) -> list[TrackedOrder]:
+        """The live orders whose next poll is due."""
+        now = self.clock()
+        return [entry for entry in self.live if entry.next_poll <= now]
+
+    async def poll(self, fetch: Callable[[str], Awaitable[OrderUpdate]]) -> list[TrackedOrder]:
+        """Poll the due orders concurrently, returning those whose status changed.
+
+        Orders that fail to poll are retried on their next slot; if every poll
+        fails, the first error is raised.
+        """
+        due = self.due()
+        self.stats.skipped += len(self.live) - len(due)
+        if not due:
+            return []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def poll_one(entry: TrackedOrder) -> OrderUpdate:
+            async with semaphore:
+                return await fetch(entry.uid)
+
+        results = await asyncio.gather(*(poll_one(entry) for entry in due), return_exceptions=True)
+        now = self.clock()
+        changed, errors = [], []
+        for entry, result in zip(due, results, strict=True):
+            self.stats.polls += 1
+            entry.polls += 1
+            if isinstance(result, BaseException):
+                errors.append(result)
+            elif self._apply(entry, result, now):
+                changed.append(entry)
+            if not entry.is_terminal:
+                entry.next_poll = now + self.get_interval(entry, now)
+        self.stats.errors += len(errors)
+        self.stats.changes += len(changed)
+        self._prune(now)
+        if errors and len(errors) == len(due):
+            raise errors[0]
+        return changed
+
+    def _apply(self, entry: TrackedOrder, update: OrderUpdate, now: float) -> bool:
+        if update.valid_to is not None:
+            entry.valid_to = update.valid_to
+        if update.order is not None:
+            entry.order = update.order
+        if update.status is entry.status:
+            return False
+        entry.status = update.status
+        self.stats.by_status[update.status.name] = self.stats.by_status.get(update.status.name, 0) + 1
+        if entry.is_terminal:
+            entry.closed_at = now
+        return True
+
+    def _prune(self, now: float) -> None:
+        expired = [
+            uid
+            for uid, entry in self.orders.items()
+            if entry.closed_at is not None and now - entry.closed_at > self.retention
+        ]
+        for uid in expired:
+            del self.orders[uid]
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the counters and the number of tracked and live orders."""
+        return {**self.stats.to_dict(), "tracked": len(self.orders), "live": len(self.live)}
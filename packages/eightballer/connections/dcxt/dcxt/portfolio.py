@@ -0,0 +1,165 @@
+"""Cross-ledger portfolio snapshots, read through Multicall3 at a pinned block."""
+
+import asyncio
+from typing import Any
+from dataclasses import field, dataclass
+from collections.abc import Iterable
+
+from web3 import Web3
+from eth_abi import encode
+
+from packages.eightballer.connections.dcxt.utils import function_selector
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import MULTICALL3_ADDRESS, aggregate3
+
+
+BALANCE_OF_SELECTOR = function_selector("balanceOf(address)")
+GET_ETH_BALANCE_SELECTOR = function_selector("getEthBalance(address)")
+
+
+@dataclass(frozen=True)
+class AccountBalances:
+    """Raw native and token balances of an account, read at a single block."""
+
+    ledger_id: str
+    address: str
+    block_number: int
+    native: int
+    tokens: dict[str, int]
+
+
+@dataclass(frozen=True)
+class PortfolioSnapshot:
+    """Balances of every account across ledgers, each ledger read at a single block."""
+
+    accounts: dict[tuple[str, str], AccountBalances] = field(default_factory=dict)
+    blocks: dict[str, int] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    def get(self, ledger_id: str, address: str) -> AccountBalances | None:
+        """Get the balances of an account on a ledger."""
+        return self.accounts.get((ledger_id, Web3.to_checksum_address(address)))
+
+
+def _decode_uint(success: bool, data: bytes) -> int | None:
+    if not success or len(data) < 32:
+        return None
+    return int.from_bytes(data[:32], "big")
+
+
+def read_account_balances(
+    ledger_api: Any,
+    ledger_id: str,
+    addresses: Iterable[str],
+    tokens: Iterable[str],
+    block_number: int,
+) -> dict[str, AccountBalances]:
+    """Read the native and token balances of the addresses in a single Multicall3 call at `block_number`.
+
+    Tokens whose `balanceOf` reverts are left out of the account's balances.
+    """
+    addresses = list(dict.fromkeys(Web3.to_checksum_address(address) for address in addresses))
+    tokens = list(dict.fromkeys(Web3.to_checksum_address(token) for token in tokens))
+    calls = []
+    for address in addresses:
+        encoded_address = encode(["address"], [address])
+        calls.append(
+            {"target": MULTICALL3_ADDRESS, "allowFailure": True, "callData": GET_ETH_BALANCE_SELECTOR + encoded_address}
+        )
+        calls.extend(
+            {"target": token, "allowFailure": True, "callData": BALANCE_OF_SELECTOR + encoded_address}
+            for token in tokens
+        )
+    results = aggregate3(ledger_api, calls, block_number)
+
+    accounts = {}
+    stride = len(tokens) + 1
+    for index, address in enumerate(addresses):
+        (native_ok, native), *token_results = results[index * stride : (index + 1) * stride]
+        native = _decode_uint(native_ok, native)
+        if native is None:
+            msg = f"Unable to read the native balance of {address} on {ledger_id} at block {block_number}"
+            raise RpcError(msg)
+        token_balances = {}
+        for token, (success, data) in zip(tokens, token_results, strict=True):
+            balance = _decode_uint(success, data)
+            if balance is not None:
+                token_balances[token] = balance
+        accounts[address] = AccountBalances(
+            ledger_id=ledger_id,
+            address=address,
+            block_number=block_number,
+            native=native,
+            tokens=token_balances,
+        )
+    return accounts
+
+
+class PortfolioReader:
+    """Snapshots the balances of every wallet used by the connection's exchanges.
+
+    Wallets shared by several exchanges on a ledger are read once, every ledger
+    is read concurrently in a single Multicall3 call, and concurrent callers
+    share the read of each ledger they ask for.
+    """
+
+    def __init__(self, exchanges: dict[str, dict[str, Any]], logger: Any = None) -> None:
+        """Initialise the reader over the connection's exchanges, keyed by ledger and exchange id."""
+        self.exchanges = exchanges
+        self.logger = logger
+        self._pending: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def is_supported(exchange: Any) -> bool:
+        """Whether the exchange's balances can be served from a snapshot."""
+        return hasattr(exchange, "balances_from_snapshot")
+
+    def get_targets(self, ledger_ids: Iterable[str] | None = None) -> dict[str, tuple[Any, list[str]]]:
+        """Get, per ledger, the exchange used to read it and the unique wallets to read."""
+        targets = {}
+        for ledger_id, ledger_exchanges in self.exchanges.items():
+            if ledger_ids is not None and ledger_id not in ledger_ids:
+                continue
+            supported = [exchange for exchange in ledger_exchanges.values() if self.is_supported(exchange)]
+            if not supported:
+                continue
+            addresses = dict.fromkeys(Web3.to_checksum_address(exchange.account.address) for exchange in supported)
+            targets[ledger_id] = (supported[0], sorted(addresses))
+        return targets
+
+    async def snapshot(self, ledger_ids: Iterable[str] | None = None) -> PortfolioSnapshot:
+        """Take a snapshot of the given ledgers, all of them by default, joining the reads in flight."""
+        targets = self.get_targets(None if ledger_ids is None else set(ledger_ids))
+        reads = []
+        for ledger_id, (exchange, addresses) in targets.items():
+            pending = self._pending.get(ledger_id)
+            if pending is None or pending.done():
+                pending = self._pending[ledger_id] = asyncio.ensure_future(
+                    self._read_ledger(ledger_id, exchange, addresses)
+                )
+            # a cancelled caller must not cancel the read the others are waiting on.
+            reads.append(asyncio.shield(pending))
+        results = await asyncio.gather(*reads, return_exceptions=True)
+        snapshot = PortfolioSnapshot()
+        for ledger_id, result in zip(targets, results, strict=True):
+            if isinstance(result, BaseException):
+                if self.logger is not None:
+                    self.logger.warning(f"Unable to snapshot balances on {ledger_id}: {result!r}")
+                snapshot.errors[ledger_id] = repr(result)
+                continue
+            for address, account in result.items():
+                snapshot.accounts[(ledger_id, address)] = account
+                snapshot.blocks[ledger_id] = account.block_number
+        return snapshot
+
+    async def _read_ledger(self, ledger_id: str, exchange: Any, addresses: list[str]) -> dict[str, AccountBalances]:
+        def _read() -> dict[str, AccountBalances]:
+            return read_account_balances(
+                exchange.web3,
+                ledger_id,
+                addresses,
+                exchange.get_balance_tokens(),
+                exchange.block_cache.head_tracker.head(),
+            )
+
+        return await exchange.run_blocking(exchange.block_cache.get_or_fetch, ("portfolio", tuple(addresses)), _read)
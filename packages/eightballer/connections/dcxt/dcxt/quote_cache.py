@@ -0,0 +1,268 @@
+"""Short-lived cache of router quotes, keyed by pair, side and amount bucket."""
+
+import math
+import time
+import asyncio
+import threading
+from typing import Any
+from dataclasses import dataclass
+from collections.abc import Hashable, Callable, Awaitable
+
+from web3 import Web3
+
+
+DEFAULT_TTL = 5.0
+DEFAULT_MAX_BLOCKS = 2
+DEFAULT_BUCKET_RATIO = 0.01
+DEFAULT_MAX_ENTRIES = 1024
+
+
+@dataclass(frozen=True)
+class CachedQuote:
+    """A quote, when and at which block it was fetched, and how long fetching it took."""
+
+    value: Any
+    fetched_at: float
+    block: int | None
+    latency: float
+
+
+@dataclass
+class QuoteCacheStats:
+    """Counters for a quote cache."""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    expired: int = 0
+    saved_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+
+class _Flight:
+    """A fetch in progress, waited on by identical concurrent lookups."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.quote: CachedQuote | None = None
+        self.error: BaseException | None = None
+
+
+class QuoteCache:
+    """Reuses quotes for the same pair, side and a nearby amount.
+
+    Amounts fall into logarithmic buckets `bucket_ratio` wide, so quotes for
+    amounts within about that fraction of each other share an entry. Entries
+    expire after `ttl` seconds or once the head is more than `max_blocks`
+    past the block they were fetched at, and identical lookups made while a
+    quote is being fetched wait for it rather than fetching it again.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        max_blocks: int | None = DEFAULT_MAX_BLOCKS,
+        bucket_ratio: float = DEFAULT_BUCKET_RATIO,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        get_head: Callable[[], int] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        run_blocking: Callable[..., Awaitable[Any]] = asyncio.to_thread,
+    ) -> None:
+        """Initialise the cache; `run_blocking` reads the head for lookups made on the event loop."""
+        if bucket_ratio <= 0:
+            msg = "The amount bucket ratio must be positive"
+            raise ValueError(msg)
+        self.ttl = ttl
+        self.max_blocks = max_blocks
+        self.bucket_ratio = bucket_ratio
+        self.max_entries = max_entries
+        self._get_head = get_head
+        self._clock = clock
+        self._run_blocking = run_blocking
+        self._lock = threading.Lock()
+        self._entries: dict[Hashable, CachedQuote] = {}
+        self._in_flight: dict[Hashable, _Flight] = {}
+        self._async_in_flight: dict[Hashable, asyncio.Future] = {}
+        self.stats = QuoteCacheStats()
+
+    @classmethod
+    def from_config(
+        cls,
+        config: dict | None,
+        get_head: Callable[[], int] | None = None,
+        run_blocking: Callable[..., Awaitable[Any]] | None = None,
+    ) -> "QuoteCache":
+        """Create the cache from the `quote_cache` block of an exchange configuration."""
+        config = config or {}
+        return cls(
+            ttl=config.get("ttl", DEFAULT_TTL),
+            max_blocks=config.get("max_blocks", DEFAULT_MAX_BLOCKS),
+            bucket_ratio=config.get("bucket_ratio", DEFAULT_BUCKET_RATIO),
+            max_entries=config.get("max_entries", DEFAULT_MAX_ENTRIES),
+            get_head=get_head,
+            run_blocking=run_blocking or asyncio.to_thread,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether quotes are kept at all."""
+        return self.ttl > 0
+
+    def get_bucket(self, amount: float) -> int:
+        """Get the logarithmic bucket of an amount."""
+        if amount <= 0:
+            msg = f"Cannot bucket a non-positive amount: {amount}"
+            raise ValueError(msg)
+        return math.floor(math.log(amount) / math.log1p(self.bucket_ratio))
+
+    def get_key(self, token_in: str, token_out: str, side: str, amount: float) -> Hashable:
+        """Get the key a quote is cached under."""
+        return (
+            Web3.to_checksum_address(token_in),
+            Web3.to_checksum_address(token_out),
+            side,
+            self.get_bucket(amount),
+        )
+
+    def _head(self) -> int | None:
+        return self._get_head() if self._uses_head else None
+
+    async def _ahead(self) -> int | None:
+        # reading the head may poll the ledger, so it is kept off the event loop.
+        return await self._run_blocking(self._get_head) if self._uses_head else None
+
+    @property
+    def _uses_head(self) -> bool:
+        return self._get_head is not None and self.max_blocks is not None
+
+    def _is_fresh(self, quote: CachedQuote, now: float, head: int | None) -> bool:
+        if now - quote.fetched_at >= self.ttl:
+            return False
+        return head is None or quote.block is None or head - quote.block <= self.max_blocks
+
+    def get_or_fetch(self, token_in: str, token_out: str, side: str, amount: float, fetch: Callable[[], Any]) -> Any:
+        """Return a fresh cached quote for the lookup, calling `fetch` on a miss."""
+        if not self.enabled:
+            return fetch()
+        key = self.get_key(token_in, token_out, side, amount)
+        head = self._head()
+        with self._lock:
+            quote = self._get_fresh(key, head)
+            if quote is not None:
+                return quote.value
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.stats.misses += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.stats.coalesced += 1
+                self.stats.saved_seconds += flight.quote.latency
+            return flight.quote.value
+
+        start = self._clock()
+        try:
+            value = fetch()
+        except BaseException as error:
+            flight.error = error
+            raise
+        else:
+            flight.quote = CachedQuote(value=value, fetched_at=self._clock(), block=head, latency=self._clock() - start)
+            self._store(key, flight.quote)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+
+    async def aget_or_fetch(
+        self, token_in: str, token_out: str, side: str, amount: float, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Return a fresh cached quote for the lookup, awaiting `fetch` on a miss.
+
+        Identical lookups on the event loop while a quote is being fetched wait for it.
+        """
+        if not self.enabled:
+            return await fetch()
+        key = self.get_key(token_in, token_out, side, amount)
+        head = await self._ahead()
+        with self._lock:
+            quote = self._get_fresh(key, head)
+        if quote is not None:
+            return quote.value
+        waiting = self._async_in_flight.get(key)
+        if waiting is not None:
+            quote = await asyncio.shield(waiting)
+            with self._lock:
+                self.stats.coalesced += 1
+                self.stats.saved_seconds += quote.latency
+            return quote.value
+
+        waiting = self._async_in_flight[key] = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self.stats.misses += 1
+        start = self._clock()
+        try:
+            value = await fetch()
+        except asyncio.CancelledError:
+            waiting.cancel()
+            raise
+        except BaseException as error:
+            waiting.set_exception(error)
+            # retrieved here so an error nobody else waited for is not reported as never retrieved.
+            waiting.exception()
+            raise
+        else:
+            quote = CachedQuote(value=value, fetched_at=self._clock(), block=head, latency=self._clock() - start)
+            self._store(key, quote)
+            waiting.set_result(quote)
+            return value
+        finally:
+            self._async_in_flight.pop(key, None)
+
+    def _get_fresh(self, key: Hashable, head: int | None) -> CachedQuote | None:
+        # called with the lock held.
+        quote = self._entries.get(key)
+        if quote is None:
+            return None
+        if self._is_fresh(quote, self._clock(), head):
+            self.stats.hits += 1
+            self.stats.saved_seconds += quote.latency
+            return quote
+        del self._entries[key]
+        self.stats.expired += 1
+        return None
+
+    def _store(self, key: Hashable, quote: CachedQuote) -> None:
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = self._clock()
+                self._entries = {k: q for k, q in self._entries.items() if now - q.fetched_at < self.ttl}
+            if len(self._entries) < self.max_entries:
+                self._entries[key] = quote
+
+    def invalidate(self) -> None:
+        """Drop every cached quote."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the counters and the number of cached quotes."""
+        with self._lock:
+            return {**self.stats.to_dict(), "entries": len(self._entries)}
@@ -0,0 +1,36 @@
+"""Token bucket rate limiting, shared by the connection scheduler and the exchange clients."""
+
+import time
+from collections.abc import Callable
+
+
+class TokenBucket:
+    """A token bucket refilled at `rate` tokens per second, holding at most `burst` tokens."""
+
+    def __init__(self, rate: float, burst: float | None = None, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialise the bucket, full."""
+        if rate <= 0:
+            msg = f"Rate limit must be positive, got {rate}"
+            raise ValueError(msg)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1)
+        self.tokens = self.burst
+        self._clock = clock
+        self._updated_at = clock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        """Take a token if one is available."""
+        self._refill(self._clock())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_available(self) -> float:
+        """Seconds until the next token is available."""
+        self._refill(self._clock())
+        return max(0.0, (1 - self.tokens) / self.rate)
@@ -0,0 +1,316 @@
+"""Per-ledger watcher resolving transaction receipts from one batched read per block."""
+
+import time
+import asyncio
+import logging
+from typing import Any
+from dataclasses import field, dataclass
+from collections.abc import Callable, Awaitable
+
+from web3 import Web3
+
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError, RequestTimeout, TransactionReplaced
+
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_TIMEOUT = 600.0
+# receipt fields returned as hex quantities.
+QUANTITY_FIELDS = (
+    "blockNumber",
+    "status",
+    "gasUsed",
+    "cumulativeGasUsed",
+    "effectiveGasPrice",
+    "transactionIndex",
+    "type",
+)
+
+Receipts = dict[str, dict[str, Any] | None]
+TransactionCounts = dict[str, int]
+
+
+def parse_receipt(result: dict[str, Any]) -> dict[str, Any]:
+    """Decode the quantities of a raw `eth_getTransactionReceipt` result."""
+    receipt = dict(result)
+    for key in QUANTITY_FIELDS:
+        if isinstance(receipt.get(key), str):
+            receipt[key] = int(receipt[key], 16)
+    return receipt
+
+
+def fetch_receipts(provider: Any, hashes: list[str], accounts: list[str]) -> tuple[Receipts, TransactionCounts]:
+    """Read the receipts of the transactions and the mined nonces of the accounts in one JSON-RPC batch."""
+    requests = [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in hashes]
+    requests += [("eth_getTransactionCount", [address, "latest"]) for address in accounts]
+    responses = provider.make_batch_request(requests)
+    if not isinstance(responses, list):
+        msg = f"Receipt batch failed: {responses}"
+        raise RpcError(msg)
+    errors = [response["error"] for response in responses if response.get("error")]
+    if errors:
+        msg = f"Receipt batch failed: {errors[0]}"
+        raise RpcError(msg)
+    results = [response.get("result") for response in responses]
+    receipts = {
+        tx_hash: parse_receipt(result) if result else None for tx_hash, result in zip(hashes, results, strict=False)
+    }
+    counts = {address: int(result, 16) for address, result in zip(accounts, results[len(hashes) :], strict=False)}
+    return receipts, counts
+
+
+@dataclass
+class WatchedTransaction:
+    """A sent transaction waiting for its receipt."""
+
+    tx_hash: str
+    future: asyncio.Future
+    submitted_at: float
+    timeout: float
+    address: str | None = None
+    nonce: int | None = None
+    # the head when the transaction was sent, set on the first poll when none had been seen yet.
+    submitted_block: int | None = None
+
+
+@dataclass
+class ReceiptWatcherStats:
+    """Counters for a receipt watcher."""
+
+    polls: int = 0
+    receipts: int = 0
+    failed: int = 0
+    replaced: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    total_latency_blocks: int = 0
+    max_latency_blocks: int = 0
+    latency_samples: int = field(default=0, repr=False)
+
+    def record_latency(self, blocks: int) -> None:
+        """Record the blocks between sending a transaction and its inclusion."""
+        self.latency_samples += 1
+        self.total_latency_blocks += blocks
+        self.max_latency_blocks = max(self.max_latency_blocks, blocks)
+
+    @property
+    def avg_latency_blocks(self) -> float:
+        """Average blocks between sending a transaction and its inclusion."""
+        return self.total_latency_blocks / self.latency_samples if self.latency_samples else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return {
+            "polls": self.polls,
+            "receipts": self.receipts,
+            "failed": self.failed,
+            "replaced": self.replaced,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_latency_blocks": self.avg_latency_blocks,
+            "max_latency_blocks": self.max_latency_blocks,
+        }
+
+
+class ReceiptWatcher:
+    """Resolves the receipts of every pending transaction on a ledger.
+
+    The head is polled once per `poll_interval`, and on each new block the
+    receipts of all pending transactions, along with the mined nonces of
+    their accounts, are read in a single batch. A transaction whose nonce was
+    mined without it was replaced, and one pending past its timeout times
+    out; both fail their waiters.
+    """
+
+    def __init__(
+        self,
+        get_block_number: Callable[[], int],
+        fetch: Callable[[list[str], list[str]], tuple[Receipts, TransactionCounts]],
+        logger: logging.Logger,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        timeout: float = DEFAULT_TIMEOUT,
+        run_blocking: Callable[..., Awaitable[Any]] = asyncio.to_thread,
+        loop: asyncio.AbstractEventLoop | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the watcher; `fetch(hashes, accounts)` makes the batched read."""
+        self._get_block_number = get_block_number
+        self._fetch = fetch
+        self.logger = logger
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._run_blocking = run_blocking
+        self.loop = loop
+        self._clock = clock
+        self.stats = ReceiptWatcherStats()
+        self.pending: dict[str, WatchedTransaction] = {}
+        self._block: int | None = None
+        self._task: asyncio.Task | None = None
+
+    @classmethod
+    def from_web3(
+        cls,
+        web3: Web3,
+        logger: logging.Logger,
+        config: dict | None = None,
+        get_block_number: Callable[[], int] | None = None,
+        run_blocking: Callable[..., Awaitable[Any]] | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> "ReceiptWatcher":
+        """Create a watcher reading through the given web3 instance."""
+        config = config or {}
+        return cls(
+            get_block_number or (lambda: web3.eth.block_number),
+            lambda hashes, accounts: fetch_receipts(web3.provider, hashes, accounts),
+            logger,
+            poll_interval=config.get("poll_interval", DEFAULT_POLL_INTERVAL),
+            timeout=config.get("timeout", DEFAULT_TIMEOUT),
+            run_blocking=run_blocking or asyncio.to_thread,
+            loop=loop,
+        )
+
+    def watch(
+        self,
+        tx_hash: str,
+        address: str | None = None,
+        nonce: int | None = None,
+        timeout: float | None = None,
+    ) -> asyncio.Future:
+        """Get a future resolving to the receipt of a sent transaction; call it on the watcher's loop."""
+        if tx_hash in self.pending:
+            return self.pending[tx_hash].future
+        loop = asyncio.get_running_loop()
+        self.loop = self.loop or loop
+        running = self._task is not None and not self._task.done()
+        self.pending[tx_hash] = WatchedTransaction(
+            tx_hash,
+            loop.create_future(),
+            submitted_at=self._clock(),
+            timeout=self.timeout if timeout is None else timeout,
+            address=address,
+            nonce=nonce,
+            # the last block polled is only current while polling runs.
+            submitted_block=self._block if running else None,
+        )
+        if not running:
+            self._task = loop.create_task(self.run())
+        return self.pending[tx_hash].future
+
+    async def wait(
+        self,
+        tx_hash: str,
+        address: str | None = None,
+        nonce: int | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Wait for the receipt of a sent transaction."""
+        # shielded, so one cancelled waiter does not fail the others waiting on the same transaction.
+        return await asyncio.shield(self.watch(tx_hash, address, nonce, timeout))
+
+    def wait_blocking(
+        self,
+        tx_hash: str,
+        address: str | None = None,
+        nonce: int | None = None,
+        timeout: float | None = None,
+    ) -> dict[str, Any]:
+        """Wait for a receipt from a worker thread, through the loop the watcher runs on."""
+        loop = self.loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is None or not loop.is_running() or running is loop:
+            return self._wait_inline(tx_hash, address, nonce, timeout)
+        return asyncio.run_coroutine_threadsafe(self.wait(tx_hash, address, nonce, timeout), loop).result()
+
+    def _wait_inline(self, tx_hash: str, address: str | None, nonce: int | None, timeout: float | None) -> dict:
+        # without a running loop to hand the wait to, the transaction is polled on its own.
+        deadline = self._clock() + (self.timeout if timeout is None else timeout)
+        accounts = [address] if address is not None and nonce is not None else []
+        while True:
+            receipts, counts = self._fetch([tx_hash], accounts)
+            if receipts.get(tx_hash):
+                return receipts[tx_hash]
+            if accounts and counts.get(address, 0) > nonce:
+                msg = f"Transaction {tx_hash} was replaced at nonce {nonce}"
+                raise TransactionReplaced(msg)
+            if self._clock() >= deadline:
+                msg = f"Transaction {tx_hash} was not mined in time"
+                raise RequestTimeout(msg)
+            time.sleep(self.poll_interval)
+
+    async def run(self) -> None:
+        """Poll once per new block while any transaction is pending."""
+        while self.pending:
+            try:
+                block = await self._run_blocking(self._get_block_number)
+            except Exception as error:  # noqa
+                self.stats.errors += 1
+                self.logger.warning(f"Unable to read the head block: {error}")
+            else:
+                if block != self._block:
+                    await self.poll(block)
+            self._expire()
+            if self.pending:
+                await asyncio.sleep(self.poll_interval)
+
+    async def poll(self, block: int) -> None:
+        """Read the receipts of the pending transactions as of a block, and resolve their waiters."""
+        self._block = block
+        watched = self._live()
+        if not watched:
+            return
+        accounts = sorted({tx.address for tx in watched if tx.address is not None and tx.nonce is not None})
+        self.stats.polls += 1
+        try:
+            receipts, counts = await self._run_blocking(self._fetch, [tx.tx_hash for tx in watched], accounts)
+        except Exception as error:  # noqa
+            self.stats.errors += 1
+            self.logger.warning(f"Unable to read receipts at block {block}: {error}")
+            return
+        for tx in watched:
+            if tx.submitted_block is None:
+                tx.submitted_block = block
+            receipt = receipts.get(tx.tx_hash)
+            if receipt:
+                self._resolve(tx, receipt)
+            elif tx.nonce is not None and counts.get(tx.address, 0) > tx.nonce:
+                self.stats.replaced += 1
+                msg = f"Transaction {tx.tx_hash} was replaced at nonce {tx.nonce}"
+                self._fail(tx, TransactionReplaced(msg))
+
+    def _live(self) -> list[WatchedTransaction]:
+        for tx_hash in [tx_hash for tx_hash, tx in self.pending.items() if tx.future.done()]:
+            del self.pending[tx_hash]
+        return list(self.pending.values())
+
+    def _resolve(self, tx: WatchedTransaction, receipt: dict[str, Any]) -> None:
+        self.stats.receipts += 1
+        if receipt.get("status") == 0:
+            self.stats.failed += 1
+        if receipt.get("blockNumber") is not None and tx.submitted_block is not None:
+            self.stats.record_latency(max(receipt["blockNumber"] - tx.submitted_block, 0))
+        del self.pending[tx.tx_hash]
+        tx.future.set_result(receipt)
+
+    def _fail(self, tx: WatchedTransaction, error: Exception) -> None:
+        del self.pending[tx.tx_hash]
+        tx.future.set_exception(error)
+
+    def _expire(self) -> None:
+        now = self._clock()
+        for tx in self._live():
+            if now - tx.submitted_at >= tx.timeout:
+                self.stats.timeouts += 1
+                msg = f"Transaction {tx.tx_hash} was not mined within {tx.timeout}s"
+                self._fail(tx, RequestTimeout(msg))
+
+    def close(self) -> None:
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the counters, the last block polled and the number of pending transactions."""
+        return {**self.stats.to_dict(), "block": self._block, "pending": len(self.pending)}
@@ -0,0 +1,281 @@
+"""Per-ledger pool of RPC endpoints with health scoring and hedged reads."""
+
+import time
+import threading
+from typing import Any
+from collections import deque
+from urllib.parse import urlparse
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from web3 import Web3
+from web3.types import RPCEndpoint, RPCResponse
+from web3.providers import HTTPProvider, JSONBaseProvider
+
+
+DEFAULT_WINDOW = 100
+DEFAULT_HEDGE_DELAY = 1.0
+MIN_HEDGE_DELAY = 0.05
+MIN_SAMPLES = 20
+DEFAULT_COOLDOWN = 30.0
+DEFAULT_REQUEST_TIMEOUT = 10
+DEFAULT_MAX_WORKERS = 8
+ERROR_PENALTY = 10
+THREAD_NAME_PREFIX = "dcxt-rpc"
+
+# writes, and the nonce reads they depend on, always go to the same endpoint.
+STICKY_METHODS = frozenset({"eth_sendRawTransaction", "eth_sendTransaction", "eth_getTransactionCount"})
+RATE_LIMIT_CODES = frozenset({429, -32005})
+
+
+def is_rate_limited(response: RPCResponse) -> bool:
+    """Whether the endpoint refused the request because we exceeded its limits."""
+    error = response.get("error") if isinstance(response, dict) else None
+    return isinstance(error, dict) and error.get("code") in RATE_LIMIT_CODES
+
+
+class Endpoint:
+    """A single RPC endpoint and its recent latency and error history."""
+
+    def __init__(self, url: str, provider: Any, window: int = DEFAULT_WINDOW) -> None:
+        """Initialise the endpoint."""
+        self.url = url
+        self.provider = provider
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.cooldown_until = 0.0
+
+    @property
+    def name(self) -> str:
+        """The endpoint host, without any credentials in the url path."""
+        return urlparse(self.url).netloc or self.url
+
+    @property
+    def error_rate(self) -> float:
+        """Fraction of recent requests that failed."""
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def mean_latency(self) -> float | None:
+        """Mean latency of recent successful requests."""
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    def p95(self) -> float | None:
+        """95th percentile latency of recent successful requests, None until there are enough samples."""
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def score(self, default_latency: float) -> float:
+        """Lower is healthier: latency, inflated by the recent error rate."""
+        latency = self.mean_latency if self.mean_latency is not None else default_latency
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+    def record(self, latency: float, ok: bool, now: float, cooldown: float) -> None:
+        """Record the outcome of a request, cooling the endpoint down after a failure."""
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+        else:
+            self.cooldown_until = now + cooldown
+
+    def to_dict(self, now: float) -> dict[str, Any]:
+        """Return the endpoint health as a plain dict."""
+        return {
+            "endpoint": self.name,
+            "mean_latency": self.mean_latency,
+            "p95_latency": self.p95(),
+            "error_rate": self.error_rate,
+            "cooling_down": now < self.cooldown_until,
+        }
+
+
+class PooledProvider(JSONBaseProvider):
+    """Web3 provider routing every request through an RPC pool."""
+
+    def __init__(self, pool: "RpcPool") -> None:
+        """Initialise the provider."""
+        super().__init__()
+        self.pool = pool
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        """Send the request to the endpoint chosen by the pool."""
+        return self.pool.make_request(method, params)
+
+    def make_batch_request(self, requests: list[tuple[RPCEndpoint, Any]]) -> list[RPCResponse]:
+        """Send a batch to the primary endpoint."""
+        return self.pool.primary().provider.make_batch_request(requests)
+
+    def __str__(self) -> str:
+        """Describe the provider."""
+        return f"RPC pool over {', '.join(endpoint.name for endpoint in self.pool.endpoints)}"
+
+
+class RpcPool:
+    """RPC endpoints of a ledger, shared by every exchange on it.
+
+    Reads go to the healthiest endpoint and are hedged to the next one once
+    they run past the first endpoint's p95 latency; a failed read moves on to
+    the next endpoint straight away. Writes stick to a primary endpoint, which
+    only changes once it starts failing.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str],
+        hedge: bool = True,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        cooldown: float = DEFAULT_COOLDOWN,
+        window: int = DEFAULT_WINDOW,
+        request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        make_provider: Callable[[str], Any] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialise the pool."""
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            msg = "An RPC pool needs at least one url"
+            raise ValueError(msg)
+        if make_provider is None:
+
+            def make_provider(url: str) -> HTTPProvider:
+                return HTTPProvider(url, request_kwargs={"timeout": request_timeout})
+
+        self.endpoints = [Endpoint(url, make_provider(url), window=window) for url in urls]
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._primary = self.endpoints[0]
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=THREAD_NAME_PREFIX)
+        self._provider: PooledProvider | None = None
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "primary_switches": 0}
+
+    @classmethod
+    def from_config(cls, urls: Iterable[str], config: dict | None = None) -> "RpcPool":
+        """Create the pool from the `rpc_pool` block of the connection configuration."""
+        config = config or {}
+        return cls(
+            urls,
+            hedge=config.get("hedge", True),
+            hedge_delay=config.get("hedge_delay", DEFAULT_HEDGE_DELAY),
+            cooldown=config.get("cooldown", DEFAULT_COOLDOWN),
+            window=config.get("window", DEFAULT_WINDOW),
+            request_timeout=config.get("request_timeout", DEFAULT_REQUEST_TIMEOUT),
+            max_workers=config.get("max_workers", DEFAULT_MAX_WORKERS),
+        )
+
+    @property
+    def provider(self) -> PooledProvider:
+        """The web3 provider shared by every client of the ledger."""
+        if self._provider is None:
+            self._provider = PooledProvider(self)
+        return self._provider
+
+    def web3(self) -> Web3:
+        """Create a web3 instance backed by the pool."""
+        return Web3(self.provider)
+
+    def ranked(self) -> list[Endpoint]:
+        """Endpoints from healthiest to least healthy, those cooling down last."""
+        now = self._clock()
+        with self._lock:
+            return sorted(
+                self.endpoints,
+                key=lambda endpoint: (now < endpoint.cooldown_until, endpoint.score(self.hedge_delay)),
+            )
+
+    def primary(self) -> Endpoint:
+        """The endpoint writes stick to, moved to the healthiest one once it is cooling down."""
+        now = self._clock()
+        if now >= self._primary.cooldown_until:
+            return self._primary
+        best = self.ranked()[0]
+        with self._lock:
+            if best is not self._primary and now >= best.cooldown_until:
+                self._primary = best
+                self.stats["primary_switches"] += 1
+            return self._primary
+
+    def get_hedge_delay(self, endpoint: Endpoint) -> float:
+        """How long to wait on an endpoint before hedging to the next one."""
+        p95 = endpoint.p95()
+        return self.hedge_delay if p95 is None else max(p95, MIN_HEDGE_DELAY)
+
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        """Send a request, to the primary for writes and to the healthiest endpoints for reads."""
+        with self._lock:
+            self.stats["requests"] += 1
+        if method in STICKY_METHODS or len(self.endpoints) == 1:
+            return self._call(self.primary(), method, params)
+        return self._hedged(method, params)
+
+    def _call(self, endpoint: Endpoint, method: RPCEndpoint, params: Any) -> RPCResponse:
+        start = self._clock()
+        try:
+            response = endpoint.provider.make_request(method, params)
+        except Exception:
+            self._record(endpoint, start, ok=False)
+            raise
+        self._record(endpoint, start, ok=not is_rate_limited(response))
+        return response
+
+    def _record(self, endpoint: Endpoint, start: float, ok: bool) -> None:
+        now = self._clock()
+        with self._lock:
+            endpoint.record(now - start, ok, now, self.cooldown)
+
+    def _submit(self, futures: dict[Future, Endpoint], endpoint: Endpoint, method: RPCEndpoint, params: Any) -> None:
+        futures[self._pool.submit(self._call, endpoint, method, params)] = endpoint
+
+    def _hedged(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        first, *remaining = self.ranked()
+        futures: dict[Future, Endpoint] = {}
+        self._submit(futures, first, method, params)
+        hedged = False
+        failure: Exception | RPCResponse | None = None
+        while futures:
+            timeout = self.get_hedge_delay(first) if self.hedge and remaining and not hedged else None
+            done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # the first endpoint is slower than usual, race it against the next one.
+                hedged = True
+                self._submit(futures, remaining.pop(0), method, params)
+                with self._lock:
+                    self.stats["hedged"] += 1
+                continue
+            for future in done:
+                endpoint = futures.pop(future)
+                if future.exception() is not None:
+                    failure = future.exception()
+                elif is_rate_limited(future.result()):
+                    failure = future.result()
+                else:
+                    if hedged and endpoint is not first:
+                        with self._lock:
+                            self.stats["hedge_wins"] += 1
+                    return future.result()
+            if not futures and remaining:
+                self._submit(futures, remaining.pop(0), method, params)
+                with self._lock:
+                    self.stats["failovers"] += 1
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the pool counters and the health of every endpoint."""
+        now = self._clock()
+        with self._lock:
+            return {
+                **self.stats,
+                "primary": self._primary.name,
+                "endpoints": [endpoint.to_dict(now) for endpoint in self.endpoints],
+            }
+
+    def close(self) -> None:
+        """Stop the hedging threads."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
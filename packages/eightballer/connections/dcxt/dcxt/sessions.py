@@ -0,0 +1,223 @@
+"""Shared async HTTP sessions for the dcxt exchange clients, one keep-alive client per host."""
+
+import time
+import asyncio
+import importlib.util
+from typing import Any
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import httpx
+from web3 import AsyncWeb3
+from web3.types import RPCEndpoint, RPCResponse
+from web3.providers.async_base import AsyncJSONBaseProvider
+
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_HOST_CONCURRENCY = 8
+
+# http/2 needs the optional `h2` package; without it the clients fall back to http/1.1 keep-alive.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def get_origin(url: str) -> str:
+    """Get the scheme and host a url is served from."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+async def close_sessions(sessions: dict[str, "HostSession"]) -> None:
+    """Close the clients of the sessions."""
+    await asyncio.gather(*(session.client.aclose() for session in sessions.values()))
+
+
+@dataclass
+class HostStats:
+    """Counters for the requests sent to a single host."""
+
+    requests: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    total_seconds: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "avg_seconds": self.total_seconds / self.requests if self.requests else 0.0,
+        }
+
+
+class HostSession:
+    """A keep-alive client for a single host, with a bound on its concurrent requests."""
+
+    def __init__(self, origin: str, client: httpx.AsyncClient, max_concurrency: int) -> None:
+        """Initialise the session."""
+        self.origin = origin
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = HostStats()
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request once a slot for the host is free."""
+        async with self.semaphore:
+            self.stats.requests += 1
+            self.stats.in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+            start = time.monotonic()
+            try:
+                return await self.client.request(method, url, **kwargs)
+            except httpx.HTTPError:
+                self.stats.errors += 1
+                raise
+            finally:
+                self.stats.in_flight -= 1
+                self.stats.total_seconds += time.monotonic() - start
+
+
+class SessionPool:
+    """Async HTTP sessions shared by every exchange client of the connection.
+
+    Each host gets its own pooled client, so TLS handshakes and connection
+    setup are paid once rather than on every request.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = DEFAULT_KEEPALIVE_EXPIRY,
+        host_concurrency: int = DEFAULT_HOST_CONCURRENCY,
+        host_limits: dict[str, int] | None = None,
+        http2: bool = True,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """Initialise the pool."""
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.host_concurrency = host_concurrency
+        self.host_limits = dict(host_limits or {})
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._transport = transport
+        self._sessions: dict[str, HostSession] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._closer: asyncio.Task | None = None
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "SessionPool":
+        """Create the pool from the `sessions` block of the connection configuration."""
+        config = config or {}
+        return cls(
+            timeout=config.get("timeout", DEFAULT_TIMEOUT),
+            max_connections=config.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+            max_keepalive_connections=config.get("max_keepalive_connections", DEFAULT_MAX_KEEPALIVE_CONNECTIONS),
+            keepalive_expiry=config.get("keepalive_expiry", DEFAULT_KEEPALIVE_EXPIRY),
+            host_concurrency=config.get("host_concurrency", DEFAULT_HOST_CONCURRENCY),
+            host_limits=config.get("host_limits"),
+            http2=config.get("http2", True),
+        )
+
+    def session(self, url: str) -> HostSession:
+        """Get the session for the host serving the url, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._bind(loop)
+        origin = get_origin(url)
+        if origin not in self._sessions:
+            host = urlsplit(url).hostname
+            client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+                transport=self._transport,
+            )
+            self._sessions[origin] = HostSession(origin, client, self.host_limits.get(host, self.host_concurrency))
+        return self._sessions[origin]
+
+    def _bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start a new set of clients on the loop.
+
+        Clients are bound to the loop they were first used on, e.g. across
+        `asyncio.run` calls, and can only be closed on it. Those of the
+        previous loop are closed by its closer task once the loop shuts down.
+        """
+        if self._closer is not None and not self._closer.done() and self._loop.is_closed():
+            msg = "The event loop of the open sessions was closed without shutting them down; close() the pool first."
+            raise RuntimeError(msg)
+        self._loop = loop
+        self._sessions = {}
+        self._closer = loop.create_task(self._close_with_loop(self._sessions))
+
+    @staticmethod
+    async def _close_with_loop(sessions: dict[str, HostSession]) -> None:
+        """Close the clients when the loop cancels its tasks on shutdown."""
+        try:
+            await asyncio.get_running_loop().create_future()
+        except asyncio.CancelledError:
+            await close_sessions(sessions)
+            raise
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a request through the session of the url's host."""
+        return await self.session(url).request(method, url, **kwargs)
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a GET request."""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        """Send a POST request."""
+        return await self.request("POST", url, **kwargs)
+
+    def async_web3(self, rpc_url: str) -> AsyncWeb3:
+        """Create an AsyncWeb3 instance whose requests go through the pool."""
+        return AsyncWeb3(PooledAsyncHTTPProvider(self, rpc_url))
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Return the counters of every host."""
+        return {origin: session.stats.to_dict() for origin, session in self._sessions.items()}
+
+    async def close(self) -> None:
+        """Close every client."""
+        closer, self._closer = self._closer, None
+        sessions, self._sessions = self._sessions, {}
+        self._loop = None
+        if closer is not None:
+            closer.cancel()
+        await close_sessions(sessions)
+
+
+class PooledAsyncHTTPProvider(AsyncJSONBaseProvider):
+    """AsyncWeb3 provider sending JSON-RPC requests through a session pool."""
+
+    def __init__(self, sessions: SessionPool, endpoint_uri: str) -> None:
+        """Initialise the provider."""
+        super().__init__()
+        self.sessions = sessions
+        self.endpoint_uri = endpoint_uri
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        """Send a JSON-RPC request."""
+        response = await self.sessions.post(
+            self.endpoint_uri,
+            content=self.encode_rpc_request(method, params),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+        return self.decode_rpc_response(response.content)
+
+    def __str__(self) -> str:
+        """Describe the provider."""
+        return f"Pooled async RPC connection {get_origin(self.endpoint_uri)}"
@@ -0,0 +1,220 @@
+"""Shared ERC-20 metadata resolver, batched through Multicall3 and persisted to disk."""
+
+import os
+import json
+import threading
+from typing import Any, ClassVar
+from pathlib import Path
+from dataclasses import dataclass
+from collections.abc import Iterable
+
+from web3 import Web3
+from eth_abi import decode
+from eth_abi.exceptions import DecodingError
+from aea.configurations.base import PublicId
+
+from packages.eightballer.connections.dcxt.utils import function_selector, contract_instance
+from packages.eightballer.connections.dcxt.erc_20.contract import Erc20Token
+from packages.eightballer.connections.dcxt.dcxt.exceptions import UnsupportedAsset
+
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_PUBLIC_ID = PublicId.from_str("dakavon/multicall3:0.1.0")
+
+NAME_SELECTOR = function_selector("name()")
+SYMBOL_SELECTOR = function_selector("symbol()")
+DECIMALS_SELECTOR = function_selector("decimals()")
+METADATA_SELECTORS = (NAME_SELECTOR, SYMBOL_SELECTOR, DECIMALS_SELECTOR)
+
+# resolved tokens are kept per user, wherever the agent is started from.
+DATA_DIR = Path.home() / ".dcxt"
+DEFAULT_STORE_PATH = DATA_DIR / "token_metadata.json"
+DEFAULT_ENCODING = "utf-8"
+
+
+def aggregate3(
+    ledger_api: Any, calls: list[dict[str, Any]], block_identifier: Any = "latest"
+) -> list[tuple[bool, bytes]]:
+    """Make the calls in a single Multicall3 call at the block, returning the (success, data) of each."""
+    multicall3 = contract_instance(MULTICALL3_PUBLIC_ID, ledger_api, MULTICALL3_ADDRESS)
+    return multicall3.functions.aggregate3(calls).call(block_identifier=block_identifier)
+
+
+def decode_text(data: bytes) -> str:
+    """Decode a `string` return value, falling back to `bytes32` as used by some older tokens."""
+    try:
+        return decode(["string"], data)[0]
+    except (DecodingError, OverflowError):
+        return data[:32].rstrip(b"\x00").decode(DEFAULT_ENCODING, errors="ignore")
+
+
+@dataclass(frozen=True)
+class TokenMetadataBatch:
+    """ERC-20 metadata read for a batch of addresses, and the addresses that did not answer as tokens."""
+
+    tokens: dict[str, Erc20Token]
+    failed: tuple[str, ...] = ()
+
+
+def read_token_metadata(
+    ledger_api: Any, addresses: Iterable[str], block_identifier: Any = "latest"
+) -> TokenMetadataBatch:
+    """Read the name, symbol and decimals of every address in a single Multicall3 call.
+
+    Addresses without a symbol or decimals are reported as failed; a missing name is left empty.
+    """
+    addresses = list(dict.fromkeys(Web3.to_checksum_address(address) for address in addresses))
+    if not addresses:
+        return TokenMetadataBatch(tokens={})
+    calls = [
+        {"target": address, "allowFailure": True, "callData": selector}
+        for address in addresses
+        for selector in METADATA_SELECTORS
+    ]
+    results = aggregate3(ledger_api, calls, block_identifier)
+
+    tokens, failed = {}, []
+    stride = len(METADATA_SELECTORS)
+    for index, address in enumerate(addresses):
+        (name_ok, name), (symbol_ok, symbol), (decimals_ok, decimals) = results[index * stride : (index + 1) * stride]
+        if not (symbol_ok and decimals_ok) or len(decimals) < 32:
+            failed.append(address)
+            continue
+        tokens[address] = Erc20Token(
+            address=address,
+            name=decode_text(name) if name_ok and name else "",
+            symbol=decode_text(symbol),
+            decimals=int.from_bytes(decimals[:32], "big"),
+        )
+    return TokenMetadataBatch(tokens=tokens, failed=tuple(failed))
+
+
+class TokenMetadataStore:
+    """JSON file of resolved token metadata, keyed by chain id and checksummed address."""
+
+    def __init__(self, path: str | Path = DEFAULT_STORE_PATH) -> None:
+        """Initialise the store."""
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict[str, dict[str, dict[str, Any]]]:
+        if not self.path.exists():
+            return {}
+        try:
+            return json.loads(self.path.read_text(encoding=DEFAULT_ENCODING))
+        except json.JSONDecodeError:
+            return {}
+
+    def load(self, chain_id: int) -> dict[str, dict[str, Any]]:
+        """Load the tokens stored for a chain."""
+        with self._lock:
+            return self._read().get(str(chain_id), {})
+
+    def save(self, chain_id: int, tokens: dict[str, dict[str, Any]]) -> None:
+        """Merge tokens into the store, replacing the file atomically."""
+        with self._lock:
+            data = self._read()
+            data.setdefault(str(chain_id), {}).update(tokens)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(data, indent=2, sort_keys=True), encoding=DEFAULT_ENCODING)
+            os.replace(tmp_path, self.path)
+
+
+class TokenMetadataResolver:
+    """Token metadata for a single chain, shared by every exchange on it.
+
+    Lookups are served from memory; unknown tokens are resolved in a single
+    Multicall3 batch and written to the store so they survive restarts.
+    """
+
+    _instances: ClassVar[dict[tuple[int, Path], "TokenMetadataResolver"]] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        ledger_api: Any,
+        chain_id: int,
+        store: TokenMetadataStore | None = None,
+        seed: dict[str, dict[str, Any]] | None = None,
+    ) -> None:
+        """Initialise the resolver from the seed token list and the store."""
+        self.ledger_api = ledger_api
+        self.chain_id = chain_id
+        self.store = store
+        self._lock = threading.Lock()
+        self._tokens: dict[str, Erc20Token] = {}
+        for token_data in (seed or {}).values():
+            self._add(token_data)
+        if store is not None:
+            for token_data in store.load(chain_id).values():
+                self._add(token_data)
+
+    @classmethod
+    def for_chain(
+        cls,
+        ledger_api: Any,
+        chain_id: int,
+        store_path: str | Path | None = None,
+        seed: dict[str, dict[str, Any]] | None = None,
+    ) -> "TokenMetadataResolver":
+        """Get the resolver shared by every exchange on the chain persisting to the store, creating it on first use.
+
+        Unknown tokens are read through the ledger api of the exchange creating it.
+        """
+        key = (chain_id, Path(store_path or DEFAULT_STORE_PATH).expanduser().resolve())
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(ledger_api, chain_id, store=TokenMetadataStore(key[1]), seed=seed)
+            return cls._instances[key]
+
+    def __len__(self) -> int:
+        """Number of known tokens."""
+        return len(self._tokens)
+
+    def _add(self, token_data: dict[str, Any]) -> Erc20Token:
+        token = Erc20Token(
+            address=Web3.to_checksum_address(token_data["address"]),
+            symbol=token_data["symbol"],
+            name=token_data.get("name", ""),
+            decimals=int(token_data["decimals"]),
+        )
+        self._tokens[token.address] = token
+        return token
+
+    def get(self, address: str) -> Erc20Token | None:
+        """Get a known token, without touching the chain."""
+        return self._tokens.get(Web3.to_checksum_address(address))
+
+    def add(self, token: Erc20Token) -> None:
+        """Record a token resolved elsewhere."""
+        with self._lock:
+            self._add(token.__dict__)
+
+    def resolve(self, addresses: Iterable[str]) -> dict[str, Erc20Token]:
+        """Get the tokens at the addresses, resolving every unknown one in a single batch."""
+        addresses = [Web3.to_checksum_address(address) for address in addresses]
+        with self._lock:
+            missing = list(dict.fromkeys(address for address in addresses if address not in self._tokens))
+            if missing:
+                resolved = self._fetch(missing)
+                if resolved and self.store is not None:
+                    self.store.save(self.chain_id, {token["address"]: token for token in resolved})
+            return {address: self._tokens[address] for address in addresses if address in self._tokens}
+
+    def resolve_one(self, address: str) -> Erc20Token:
+        """Get the token at the address, resolving it if unknown."""
+        token = self.get(address) or self.resolve([address]).get(Web3.to_checksum_address(address))
+        if token is None:
+            msg = f"Unable to resolve ERC-20 metadata for {address} on chain {self.chain_id}"
+            raise UnsupportedAsset(msg)
+        return token
+
+    def _fetch(self, addresses: list[str]) -> list[dict[str, Any]]:
+        batch = read_token_metadata(self.ledger_api, addresses)
+        resolved = []
+        for token in batch.tokens.values():
+            token_data = dict(token.__dict__)
+            self._add(token_data)
+            resolved.append(token_data)
+        return resolved
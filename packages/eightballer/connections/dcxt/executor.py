@@ -0,0 +1,141 @@
+"""Bounded executor for the blocking calls made by the dcxt exchange clients."""
+
+import time
+import asyncio
+import contextlib
+from typing import Any
+from dataclasses import field, dataclass
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+
+DEFAULT_MAX_WORKERS = 16
+DEFAULT_LEDGER_LIMIT = 4
+THREAD_NAME_PREFIX = "dcxt-executor"
+
+
+@dataclass
+class ExecutorStats:
+    """Counters for the blocking calls submitted for a single ledger."""
+
+    queue_depth: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    total_wait_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    wait_samples: int = field(default=0, repr=False)
+
+    def record_wait(self, wait_seconds: float) -> None:
+        """Record the time a call spent queued before starting on a worker thread."""
+        self.wait_samples += 1
+        self.total_wait_seconds += wait_seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, wait_seconds)
+
+    @property
+    def avg_wait_seconds(self) -> float:
+        """Average time a call spent queued before starting."""
+        return self.total_wait_seconds / self.wait_samples if self.wait_samples else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the counters as a plain dict."""
+        return {
+            "queue_depth": self.queue_depth,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_seconds": self.avg_wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+class BlockingCallExecutor:
+    """Runs blocking client calls on a bounded thread pool, off the connection's event loop.
+
+    Each ledger gets its own concurrency limit so that a slow RPC on one ledger
+    cannot take every worker thread away from the others.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        ledger_limits: dict[str, int] | None = None,
+        default_ledger_limit: int = DEFAULT_LEDGER_LIMIT,
+        logger: Any = None,
+    ) -> None:
+        """Initialise the executor."""
+        self.max_workers = max_workers
+        self.ledger_limits = dict(ledger_limits or {})
+        self.default_ledger_limit = default_ledger_limit
+        self.logger = logger
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=THREAD_NAME_PREFIX)
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self.stats: dict[str, ExecutorStats] = {}
+
+    @classmethod
+    def from_config(cls, config: dict | None, logger: Any = None) -> "BlockingCallExecutor":
+        """Create the executor from the `executor` block of the connection configuration."""
+        config = config or {}
+        return cls(
+            max_workers=config.get("max_workers", DEFAULT_MAX_WORKERS),
+            ledger_limits=config.get("ledger_limits"),
+            default_ledger_limit=config.get("default_ledger_limit", DEFAULT_LEDGER_LIMIT),
+            logger=logger,
+        )
+
+    def _get_semaphore(self, ledger_id: str) -> asyncio.Semaphore:
+        if ledger_id not in self._semaphores:
+            limit = self.ledger_limits.get(ledger_id, self.default_ledger_limit)
+            self._semaphores[ledger_id] = asyncio.Semaphore(min(limit, self.max_workers))
+            self.stats[ledger_id] = ExecutorStats()
+        return self._semaphores[ledger_id]
+
+    async def run(self, ledger_id: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run `func` on a worker thread, respecting the concurrency limit of the ledger."""
+        semaphore = self._get_semaphore(ledger_id)
+        stats = self.stats[ledger_id]
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+
+        stats.queue_depth += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats.queue_depth -= 1
+
+        def _timed_call() -> tuple[float, Any]:
+            return time.perf_counter(), func(*args, **kwargs)
+
+        def _release() -> None:
+            stats.running -= 1
+            semaphore.release()
+
+        def _on_done(_future) -> None:
+            # the slot is only freed once the thread is actually done, even if the caller was cancelled.
+            with contextlib.suppress(RuntimeError):  # the loop may already be closed on shutdown
+                loop.call_soon_threadsafe(_release)
+
+        stats.running += 1
+        try:
+            future = self._pool.submit(_timed_call)
+        except RuntimeError:
+            stats.running -= 1
+            semaphore.release()
+            raise
+        future.add_done_callback(_on_done)
+        try:
+            started_at, result = await asyncio.wrap_future(future)
+        except Exception:
+            stats.failed += 1
+            raise
+        stats.record_wait(started_at - submitted_at)
+        stats.completed += 1
+        return result
+
+    def get_stats(self) -> dict[str, dict[str, Any]]:
+        """Return the counters for every ledger that has submitted work."""
+        return {ledger_id: stats.to_dict() for ledger_id, stats in self.stats.items()}
+
+    def shutdown(self) -> None:
+        """Stop accepting work and drop anything still queued on the pool."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
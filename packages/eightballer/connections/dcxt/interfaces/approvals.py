@@ -54,11 +54,17 @@ class ApprovalsInterface(BaseInterface):
             )
 
         try:
-            exchange.set_approval(
-                asset_id=approval.asset_id,
-                is_eoa=approval.is_eoa,
-                amount=approval.amount,
-            )
+            if hasattr(exchange, "approve"):
+                # planned with the other approvals asked for from the account, rather than one at a time.
+                await exchange.approve(asset_id=approval.asset_id, is_eoa=approval.is_eoa, amount=approval.amount)
+            else:
+                await connection.run_blocking(
+                    approval.ledger_id,
+                    exchange.set_approval,
+                    asset_id=approval.asset_id,
+                    is_eoa=approval.is_eoa,
+                    amount=approval.amount,
+                )
             response_message = dialogue.reply(
                 performative=ApprovalsMessage.Performative.APPROVAL_RESPONSE,
                 approval=message.approval,
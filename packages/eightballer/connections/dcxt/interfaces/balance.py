@@ -4,6 +4,7 @@ import requests
 
 from packages.eightballer.connections.dcxt import dcxt
 from packages.eightballer.protocols.balances.message import BalancesMessage
+from packages.eightballer.protocols.balances.custom_types import Balances
 from packages.eightballer.protocols.balances.dialogues import BalancesDialogue, BaseBalancesDialogues
 from packages.eightballer.connections.dcxt.interfaces.interface_base import BaseInterface
 
@@ -15,6 +16,18 @@ class BalanceInterface(BaseInterface):
     dialogue_class = BalancesDialogue
     dialogues_class = BaseBalancesDialogues
 
+    @staticmethod
+    async def get_balances_from_snapshot(ledger_id: str, exchange, connection) -> Balances | None:
+        """Get the balances of the exchange's own wallet from the portfolio snapshot, if it covers it."""
+        portfolio = getattr(connection, "portfolio", None)
+        if portfolio is None or not portfolio.is_supported(exchange):
+            return None
+        snapshot = await portfolio.snapshot([ledger_id])
+        account = snapshot.get(ledger_id, exchange.account.address)
+        if account is None:
+            return None
+        return exchange.balances_from_snapshot(account)
+
     async def get_all_balances(
         self, message: BalancesMessage, dialogue: BalancesDialogue, connection
     ) -> BalancesMessage | None:
@@ -26,9 +39,13 @@ class BalanceInterface(BaseInterface):
             if message.params is not None:
                 for key, value in message.params.items():
                     params[key] = value.decode()
-            balances = await exchange.fetch_balance(
-                ledger_id=message.ledger_id, exchange_id=message.exchange_id, address=message.address, params=params
-            )
+            balances = None
+            if message.address is None and not params:
+                balances = await self.get_balances_from_snapshot(message.ledger_id, exchange, connection)
+            if balances is None:
+                balances = await exchange.fetch_balance(
+                    ledger_id=message.ledger_id, exchange_id=message.exchange_id, address=message.address, params=params
+                )
             response_message = dialogue.reply(
                 performative=BalancesMessage.Performative.ALL_BALANCES,
                 target_message=message,
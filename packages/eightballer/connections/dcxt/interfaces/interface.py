@@ -6,6 +6,11 @@ from aea.mail.base import Envelope
 from aea.protocols.base import Message
 
 from packages.eightballer.connections.dcxt import PUBLIC_ID
+from packages.eightballer.connections.dcxt.single_flight import (
+    SingleFlight,
+    replay_response,
+    get_request_key,
+)
 from packages.eightballer.connections.dcxt.interfaces.ohlcv import OhlcvInterface
 from packages.eightballer.connections.dcxt.interfaces.order import OrderInterface
 from packages.eightballer.connections.dcxt.interfaces.market import MarketInterface
@@ -22,6 +27,11 @@ if TYPE_CHECKING:
     from collections.abc import Callable
 
 
+def is_cacheable(response: Message | None) -> bool:
+    """Only successful responses are reused by later requests."""
+    return response is not None and response.performative.value != "error"
+
+
 class ConnectionProtocolInterface:  # pylint: disable=too-many-instance-attributes
     """Interface for the supported protocols."""
 
@@ -30,7 +40,7 @@ class ConnectionProtocolInterface:  # pylint: disable=too-many-instance-attribut
         self.loop = kwargs.get("loop")
         self.logger = kwargs.get("logger")
         self.polling_tasks = kwargs.get("polling_tasks")
-        self.executing_tasks = kwargs.get("executing_tasks")
+        self.in_flight = kwargs.get("in_flight")
         self.queue = kwargs.get("queue")
         self.exchanges: dict[str, Any] = kwargs.get("exchanges")
         self.supported_protocols = {
@@ -46,6 +56,15 @@ class ConnectionProtocolInterface:  # pylint: disable=too-many-instance-attribut
             AssetBridgingInterface.protocol_id: AssetBridgingInterface(),
         }
         self.handle_task_done = kwargs.get("done_callback")
+        self.executor = kwargs.get("executor")
+        self.single_flight: SingleFlight = kwargs.get("single_flight") or SingleFlight()
+        self.portfolio = kwargs.get("portfolio")
+
+    async def run_blocking(self, ledger_id: str, func: "Callable[..., Any]", *args, **kwargs) -> Any:
+        """Run a blocking exchange call on the executor, or inline if there is none."""
+        if self.executor is None:
+            return func(*args, **kwargs)
+        return await self.executor.run(ledger_id, func, *args, **kwargs)
 
     def validate_envelope(self, envelope: Envelope) -> bool:
         """Handles the message."""
@@ -57,7 +76,17 @@ class ConnectionProtocolInterface:  # pylint: disable=too-many-instance-attribut
         interface = self.supported_protocols.get(envelope.message.protocol_id)
         msg, dialogue, performative = interface.validate_msg(envelope.message)
         handler: Callable[[Any], Any] = interface.get_handler(performative)
-        return await handler(msg, dialogue, connection=self)
+        key = get_request_key(msg)
+        if key is None:
+            return await handler(msg, dialogue, connection=self)
+
+        async def _call() -> Message | None:
+            return await handler(msg, dialogue, connection=self)
+
+        response, shared = await self.single_flight.do(key, _call, cacheable=is_cacheable)
+        if not shared or response is None:
+            return response
+        return replay_response(response, msg, dialogue)
 
     def build_envelope(self, request: Envelope | None, response_message: Message | None) -> Envelope | None:
         """Build the envelope."""
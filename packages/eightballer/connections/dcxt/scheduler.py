@@ -0,0 +1,227 @@
+"""Priority scheduling and per-exchange rate limiting for the requests handled by the dcxt connection."""
+
+import heapq
+import asyncio
+import itertools
+from enum import IntEnum
+from typing import Any
+from dataclasses import field, dataclass
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator
+
+from aea.protocols.base import Message
+
+from packages.eightballer.connections.dcxt.dcxt.rate_limit import TokenBucket
+
+
+DEFAULT_MAX_CONCURRENCY = 32
+
+
+class RequestPriority(IntEnum):
+    """Priority classes, lower values are admitted first."""
+
+    ORDER_PLACEMENT = 0
+    ACCOUNT = 1
+    MARKET_DATA = 2
+
+
+PERFORMATIVE_PRIORITIES = {
+    "create_order": RequestPriority.ORDER_PLACEMENT,
+    "cancel_order": RequestPriority.ORDER_PLACEMENT,
+    "set_approval": RequestPriority.ORDER_PLACEMENT,
+    "request_bridge": RequestPriority.ORDER_PLACEMENT,
+    "get_all_balances": RequestPriority.ACCOUNT,
+    "get_balance": RequestPriority.ACCOUNT,
+    "get_orders": RequestPriority.ACCOUNT,
+    "get_order": RequestPriority.ACCOUNT,
+    "get_settlements": RequestPriority.ACCOUNT,
+    "get_all_positions": RequestPriority.ACCOUNT,
+    "get_position": RequestPriority.ACCOUNT,
+    "get_approval": RequestPriority.ACCOUNT,
+    "request_status": RequestPriority.ACCOUNT,
+}
+
+ExchangeKey = tuple[str, str]
+
+
+def get_priority(message: Message) -> RequestPriority:
+    """Get the priority class of a request, anything unknown is treated as market data."""
+    return PERFORMATIVE_PRIORITIES.get(message.performative.value, RequestPriority.MARKET_DATA)
+
+
+def get_exchange_key(message: Message, exchange_ledgers: dict[str, str] | None = None) -> ExchangeKey | None:
+    """Get the (ledger_id, exchange_id) a request is addressed to, if it can be determined.
+
+    Requests that do not name a ledger are keyed by the ledger their exchange is configured on, if only one.
+    """
+    ledger_id, exchange_id = None, None
+    for nested in ("order", "approval"):
+        target = message.get(nested)
+        if target is not None:
+            ledger_id, exchange_id = getattr(target, "ledger_id", None), getattr(target, "exchange_id", None)
+            break
+    else:
+        exchange_id = message.get("exchange_id")
+        if exchange_id is None:
+            return None
+        ledger_id = message.get("ledger_id")
+    if ledger_id is None and exchange_ledgers:
+        ledger_id = exchange_ledgers.get(exchange_id)
+    return ledger_id, exchange_id
+
+
+@dataclass(order=True)
+class PendingRequest:
+    """A request waiting to be admitted."""
+
+    priority: int
+    sequence: int
+    exchange_key: ExchangeKey | None = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    throttled: bool = field(default=False, compare=False)
+
+
+@dataclass
+class SchedulerStats:
+    """Counters for the scheduler."""
+
+    admitted: dict[str, int] = field(default_factory=lambda: {p.name: 0 for p in RequestPriority})
+    throttled: int = 0
+    total_wait_seconds: dict[str, float] = field(default_factory=lambda: {p.name: 0.0 for p in RequestPriority})
+
+
+class RequestScheduler:
+    """Admits requests by priority class, within a global concurrency limit and per-exchange rate limits.
+
+    A request blocked by the rate limit of its exchange does not hold up requests
+    addressed to other exchanges.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        rate_limits: dict[ExchangeKey, TokenBucket] | None = None,
+        logger: Any = None,
+        exchange_ledgers: dict[str, str] | None = None,
+    ) -> None:
+        """Initialise the scheduler; `exchange_ledgers` maps exchanges to the one ledger they are configured on."""
+        self.max_concurrency = max_concurrency
+        self.rate_limits = rate_limits or {}
+        self.exchange_ledgers = exchange_ledgers or {}
+        self.logger = logger
+        self.stats = SchedulerStats()
+        self._pending: list[PendingRequest] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    @classmethod
+    def from_config(
+        cls, config: dict | None, exchange_configs: list[dict] | None, logger: Any = None
+    ) -> "RequestScheduler":
+        """Create the scheduler from the `scheduler` block and the `rate_limit` of each exchange entry."""
+        config = config or {}
+        rate_limits = {}
+        ledgers: dict[str, set[str]] = {}
+        for exchange_config in exchange_configs or []:
+            ledgers.setdefault(exchange_config.get("name"), set()).add(exchange_config.get("ledger_id"))
+            rate_limit = exchange_config.get("rate_limit")
+            if not rate_limit:
+                continue
+            key = (exchange_config.get("ledger_id"), exchange_config.get("name"))
+            rate_limits[key] = TokenBucket(rate=rate_limit["rate"], burst=rate_limit.get("burst"))
+        return cls(
+            max_concurrency=config.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+            rate_limits=rate_limits,
+            logger=logger,
+            exchange_ledgers={name: next(iter(ids)) for name, ids in ledgers.items() if len(ids) == 1},
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for admission."""
+        return sum(1 for pending in self._pending if not pending.future.done())
+
+    @property
+    def active(self) -> int:
+        """Number of admitted requests that have not been released."""
+        return self._active
+
+    @asynccontextmanager
+    async def slot(self, message: Message) -> AsyncIterator[None]:
+        """Hold an execution slot for the message for the duration of the block."""
+        await self.acquire(get_priority(message), get_exchange_key(message, self.exchange_ledgers))
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: RequestPriority, exchange_key: ExchangeKey | None = None) -> None:
+        """Wait until the request is admitted."""
+        loop = asyncio.get_running_loop()
+        pending = PendingRequest(priority, next(self._sequence), exchange_key, loop.create_future())
+        heapq.heappush(self._pending, pending)
+        enqueued_at = loop.time()
+        self._dispatch()
+        try:
+            await pending.future
+        except asyncio.CancelledError:
+            if pending.future.done() and not pending.future.cancelled():
+                # admitted just before the cancellation was delivered, hand the slot back.
+                self.release()
+            raise
+        self.stats.admitted[priority.name] += 1
+        self.stats.total_wait_seconds[priority.name] += loop.time() - enqueued_at
+
+    def release(self) -> None:
+        """Release a slot and admit whatever can run next."""
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        blocked: list[PendingRequest] = []
+        next_wake: float | None = None
+        while self._pending and self._active < self.max_concurrency:
+            pending = heapq.heappop(self._pending)
+            if pending.future.done():
+                continue
+            bucket = self.rate_limits.get(pending.exchange_key)
+            if bucket is not None and not bucket.try_acquire():
+                if not pending.throttled:
+                    pending.throttled = True
+                    self.stats.throttled += 1
+                wait = bucket.time_until_available()
+                next_wake = wait if next_wake is None else min(next_wake, wait)
+                blocked.append(pending)
+                continue
+            self._active += 1
+            pending.future.set_result(None)
+
+        for pending in blocked:
+            heapq.heappush(self._pending, pending)
+        if next_wake is not None:
+            self._timer = asyncio.get_running_loop().call_later(next_wake, self._dispatch)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Return the scheduler counters."""
+        return {
+            "active": self._active,
+            "queue_depth": self.queue_depth,
+            "admitted": dict(self.stats.admitted),
+            "throttled": self.stats.throttled,
+            "total_wait_seconds": dict(self.stats.total_wait_seconds),
+        }
+
+    def close(self) -> None:
+        """Cancel everything still waiting for admission."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for pending in self._pending:
+            if not pending.future.done():
+                pending.future.cancel()
+        self._pending.clear()
@@ -0,0 +1,131 @@
+"""Coalescing of identical read requests handled by the dcxt connection."""
+
+import time
+import asyncio
+from typing import Any
+from collections.abc import Hashable, Callable, Awaitable
+
+from aea.protocols.base import Message
+from aea.protocols.dialogue.base import Dialogue
+
+
+DEFAULT_TTL = 0.0
+MAX_RECENT = 256
+DIALOGUE_FIELDS = frozenset({"dialogue_reference", "message_id", "target", "performative"})
+COALESCED_PERFORMATIVES = frozenset(
+    {
+        "get_all_tickers",
+        "get_ticker",
+        "get_all_balances",
+        "get_balance",
+        "get_all_markets",
+        "get_market",
+    }
+)
+
+
+def get_content(message: Message) -> dict[str, Any]:
+    """Get the content of a message, without its dialogue fields."""
+    return {key: value for key, value in message._body.items() if key not in DIALOGUE_FIELDS}
+
+
+def get_request_key(message: Message) -> Hashable | None:
+    """Get the key under which identical requests are coalesced, None if the request is not a read."""
+    if message.performative.value not in COALESCED_PERFORMATIVES:
+        return None
+    content = sorted(get_content(message).items())
+    return str(message.protocol_id), message.performative.value, repr(content)
+
+
+def replay_response(response: Message, message: Message, dialogue: Dialogue) -> Message:
+    """Reply to `message` on its own dialogue with the content of a response to an identical request."""
+    return dialogue.reply(
+        performative=response.performative,
+        target_message=message,
+        **get_content(response),
+    )
+
+
+class SingleFlight:
+    """Shares one upstream call among identical concurrent requests.
+
+    With a positive `ttl`, successful results are also reused by identical requests
+    arriving shortly after the call completed.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.monotonic) -> None:
+        """Initialise the single flight group."""
+        self.ttl = ttl
+        self._clock = clock
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self._recent: dict[Hashable, tuple[float, Any]] = {}
+        self.calls = 0
+        self.shared = 0
+        self.cached = 0
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "SingleFlight":
+        """Create the group from the `single_flight` block of the connection configuration."""
+        config = config or {}
+        return cls(ttl=config.get("ttl", DEFAULT_TTL))
+
+    async def do(
+        self, key: Hashable, func: Callable[[], Awaitable[Any]], cacheable: Callable[[Any], bool] = bool
+    ) -> tuple[Any, bool]:
+        """Run `func` unless an identical call is in flight, returns the result and whether it was shared."""
+        while True:
+            recent = self._recent.get(key)
+            if recent is not None:
+                expires_at, result = recent
+                if expires_at > self._clock():
+                    self.cached += 1
+                    return result, True
+                del self._recent[key]
+
+            future = self._in_flight.get(key)
+            if future is None:
+                break
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    # the leading call was cancelled, so one of its followers takes over.
+                    continue
+                raise
+            self.shared += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        # followers retrieve the exception, this avoids the warning when there are none.
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._in_flight[key] = future
+        self.calls += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+        future.set_result(result)
+        if self.ttl > 0 and cacheable(result):
+            self._remember(key, result)
+        return result, False
+
+    def _remember(self, key: Hashable, result: Any) -> None:
+        now = self._clock()
+        if len(self._recent) >= MAX_RECENT:
+            self._recent = {k: recent for k, recent in self._recent.items() if recent[0] > now}
+        self._recent[key] = (now + self.ttl, result)
+
+    def get_stats(self) -> dict[str, int]:
+        """Return the number of upstream calls made and the number of requests that reused one."""
+        return {
+            "calls": self.calls,
+            "shared": self.shared,
+            "cached": self.cached,
+            "in_flight": len(self._in_flight),
+        }
@@ -1 +1,24 @@
 """This module contains tests for the balancer module."""
+
+from types import SimpleNamespace
+
+import numpy as np
+
+from packages.eightballer.connections.dcxt.dcxt.balancer import BalancerClient
+
+
+def make_client(bid: float, ask: float) -> SimpleNamespace:
+    """A client whose pools quote the given bid and ask."""
+    return SimpleNamespace(pool_quoter=SimpleNamespace(get_book=lambda *_: (np.array([bid]), np.array([ask]))))
+
+
+def test_local_book_quotes_what_the_pools_can_fill() -> None:
+    """A book the pools can fill is returned as rates."""
+    book = BalancerClient.get_local_book(make_client(0.39, 0.41), "OLAS", "USDC", 100.0)
+    assert book == {"actual_buy_rate": 0.41, "actual_sell_rate": 0.39}
+
+
+def test_local_book_leaves_unfillable_amounts_to_the_sor() -> None:
+    """An amount the pools cannot fill on either side gives no local book."""
+    assert BalancerClient.get_local_book(make_client(0.0, 0.41), "OLAS", "USDC", 100.0) is None
+    assert BalancerClient.get_local_book(make_client(0.39, np.inf), "OLAS", "USDC", 100.0) is None
@@ -0,0 +1,103 @@
+"""Tests for the local Balancer quoting engine."""
+
+import numpy as np
+from eth_abi import encode
+
+from packages.eightballer.connections.dcxt.dcxt.balancer_math import (
+    STABLE,
+    WEIGHTED,
+    PoolState,
+    parse_pool_state,
+    stable_invariant,
+)
+
+
+OLAS = "0x0001A500A6B18995B03f44bb040A5fFc28E45CB0"
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+POOL_ID = "0x" + "11" * 20 + "0" * 24
+
+
+def make_weighted_pool(swap_fee: float = 0.0) -> PoolState:
+    """An 80/20 OLAS/USDC pool holding 1M OLAS and 100k USDC, so OLAS trades at 0.4 USDC."""
+    return PoolState(
+        pool_id=POOL_ID,
+        math=WEIGHTED,
+        tokens=(OLAS, USDC),
+        balances=np.array([1_000_000.0, 100_000.0]),
+        rates=np.array([1.0, 1.0]),
+        swap_fee=swap_fee,
+        weights=np.array([0.8, 0.2]),
+    )
+
+
+def make_stable_pool() -> PoolState:
+    """A balanced USDC/DAI stable pool."""
+    return PoolState(
+        pool_id=POOL_ID,
+        math=STABLE,
+        tokens=(USDC, DAI),
+        balances=np.array([1_000_000.0, 1_000_000.0]),
+        rates=np.array([1.0, 1.0]),
+        swap_fee=0.0001,
+        amplification=200.0,
+    )
+
+
+class TestWeightedPool:
+    """Tests for weighted pool quotes."""
+
+    def test_small_trades_quote_the_spot_price(self) -> None:
+        """Without fees, a tiny trade clears at the weighted spot price."""
+        pool = make_weighted_pool()
+        assert np.isclose(pool.quote_exact_in(OLAS, USDC, [1.0])[0], 0.4, rtol=1e-5)
+
+    def test_quotes_are_vectorised_and_convex(self) -> None:
+        """Larger trades get worse average prices, and trades beyond the vault limit are not quoted."""
+        pool = make_weighted_pool(swap_fee=0.003)
+        amounts = np.array([1.0, 1_000.0, 100_000.0, 400_000.0])
+        prices = pool.quote_exact_in(OLAS, USDC, amounts) / amounts
+        assert np.all(np.diff(prices[:3]) < 0)
+        assert np.isnan(prices[3])
+
+    def test_exact_out_inverts_exact_in(self) -> None:
+        """Buying what a sale would return costs what was sold."""
+        pool = make_weighted_pool(swap_fee=0.003)
+        amounts_out = pool.quote_exact_in(OLAS, USDC, [10.0, 10_000.0])
+        assert np.allclose(pool.quote_exact_out(OLAS, USDC, amounts_out), [10.0, 10_000.0])
+
+
+class TestStablePool:
+    """Tests for stable pool quotes."""
+
+    def test_balanced_pools_trade_near_par(self) -> None:
+        """A balanced pool quotes close to one for one, less the fee."""
+        pool = make_stable_pool()
+        assert np.isclose(pool.quote_exact_in(USDC, DAI, [1_000.0])[0], 999.9, rtol=1e-4)
+
+    def test_exact_out_inverts_exact_in(self) -> None:
+        """Buying what a sale would return costs what was sold."""
+        pool = make_stable_pool()
+        amounts_out = pool.quote_exact_in(USDC, DAI, [100.0, 500_000.0])
+        assert np.allclose(pool.quote_exact_out(USDC, DAI, amounts_out), [100.0, 500_000.0])
+
+    def test_invariant_of_a_balanced_pool_is_its_total(self) -> None:
+        """A balanced pool's invariant is the sum of its balances."""
+        assert np.isclose(stable_invariant(200.0, np.array([5.0, 5.0, 5.0])), 15.0)
+
+
+def test_composable_stable_pools_drop_their_own_token() -> None:
+    """The pool token held by a composable stable pool is removed from the math."""
+    bpt = "0x" + "11" * 20
+    results = [
+        (True, encode(["address[]", "uint256[]", "uint256"], [[bpt, USDC, DAI], [10**30, 10**12, 10**24], 1])),
+        (True, encode(["uint256"], [10**14])),
+        (True, encode(["uint256[]"], [[10**18, 10**30, 10**18]])),
+        (True, encode(["uint256", "bool", "uint256"], [200_000, False, 1000])),
+        (True, encode(["uint256"], [0])),
+    ]
+    state = parse_pool_state(POOL_ID, STABLE, results, {bpt: 18, USDC: 6, DAI: 18})
+    assert state.tokens == (USDC, DAI)
+    assert np.allclose(state.balances, [1_000_000.0, 1_000_000.0])
+    assert state.amplification == 200.0
+    assert state.swap_fee == 0.0001
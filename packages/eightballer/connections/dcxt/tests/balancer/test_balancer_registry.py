@@ -0,0 +1,47 @@
+"""Tests for the Balancer pool registry."""
+
+import json
+
+from packages.eightballer.connections.dcxt.dcxt.balancer_registry import BalancerPoolRegistry
+
+
+OLAS = "0x0001A500A6B18995B03f44bb040A5fFc28E45CB0"
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+DAI = "0x6B175474E89094C44Da98b954EedeAC495271d0F"
+WEIGHTED_POOL = "0x" + "AA" * 20 + "0" * 24
+STABLE_POOL = "0x" + "bb" * 20 + "0" * 24
+ELEMENT_POOL = "0x" + "cc" * 20 + "0" * 24
+
+
+def make_registry(tmp_path, whitelist=None) -> BalancerPoolRegistry:
+    """A registry over a deployment file holding a weighted, a stable and an element pool."""
+    pools = {"Weighted": [WEIGHTED_POOL], "ComposableStable": [STABLE_POOL], "Element": [ELEMENT_POOL]}
+    (tmp_path / "test.json").write_text(json.dumps({"pools": pools}))
+    return BalancerPoolRegistry("test", whitelist=whitelist, data_dir=tmp_path)
+
+
+def test_pools_by_type(tmp_path):
+    """Element pools are dropped, and whitelisting filters pools case-insensitively."""
+    registry = make_registry(tmp_path, whitelist=[WEIGHTED_POOL.lower()])
+    assert registry.get_pool_type(WEIGHTED_POOL) == "Weighted"
+    assert registry.get_pool_type(ELEMENT_POOL) is None
+    assert set(registry.get_pools_by_type(whitelisted_only=False)) == {"Weighted", "ComposableStable"}
+    assert registry.get_pools_by_type() == {"Weighted": [WEIGHTED_POOL.lower()]}
+
+
+def test_missing_deployment_file(tmp_path):
+    """Deployments without a pool file have no pools."""
+    registry = BalancerPoolRegistry("missing", data_dir=tmp_path)
+    assert registry.get_pools_by_type() == {}
+
+
+def test_pair_index(tmp_path):
+    """Pools are found by unordered pair once their tokens are indexed, until the registry is refreshed."""
+    registry = make_registry(tmp_path)
+    assert registry.get_pools_for(OLAS, USDC) == []
+    registry.index_tokens({WEIGHTED_POOL: [OLAS, USDC], STABLE_POOL: [USDC.lower(), DAI]})
+    assert registry.get_pools_for(USDC, OLAS) == [WEIGHTED_POOL.lower()]
+    assert registry.get_pools_for(DAI.lower(), USDC) == [STABLE_POOL.lower()]
+    assert registry.get_pools_for(OLAS, DAI) == []
+    registry.refresh()
+    assert registry.get_pools_for(OLAS, USDC) == []
@@ -0,0 +1,13 @@
+"""Helpers shared by the dcxt tests."""
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, now: float = 0.0) -> None:
+        """Start the clock at the given time."""
+        self.now = now
+
+    def __call__(self) -> float:
+        """Return the current time."""
+        return self.now
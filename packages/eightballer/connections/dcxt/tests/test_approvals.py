@@ -0,0 +1,124 @@
+"""Tests for the approvals planner."""
+
+import asyncio
+
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.approvals import ApprovalsPlanner
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RpcError
+
+
+TOKEN_A, TOKEN_B = "0x00000000000000000000000000000000000000aa", "0x00000000000000000000000000000000000000bb"
+VAULT, ROUTER = "0x0000000000000000000000000000000000000001", "0x0000000000000000000000000000000000000002"
+
+
+class FakeExchange:
+    """An exchange sending approvals and reporting their receipts."""
+
+    def __init__(self, failing: tuple[str, ...] = ()) -> None:
+        """Fail the approvals of the given tokens on-chain."""
+        self.failing = failing
+        self.sent: list[tuple[str, str, int]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking call inline."""
+        return func(*args)
+
+    def send_approval(self, token: str, spender: str, amount: int) -> str:
+        """Send an approval."""
+        self.sent.append((token, spender, amount))
+        return f"0x{token[-2:]}{spender[-1]}"
+
+    async def wait_for_receipt(self, tx_hash: str) -> dict:
+        """Wait for a receipt, overlapping with the other waits."""
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return {"status": 0 if any(tx_hash.startswith(f"0x{t[-2:]}") for t in self.failing) else 1}
+
+
+class TestApprovalsPlanner:
+    """Tests for planning approvals together."""
+
+    def setup_method(self) -> None:
+        """Set up a planner over an account that has approved the vault for 100 of token A."""
+        self.reads: list[list[tuple[str, str]]] = []
+        self.allowances = {(TOKEN_A, VAULT): 100}
+
+        def read(pairs):
+            self.reads.append(pairs)
+            return {pair: self.allowances.get(pair, 0) for pair in pairs}
+
+        self.planner = ApprovalsPlanner(read, window=0.01)
+
+    def request_all(self, *requests):
+        """Ask for the approvals concurrently."""
+
+        async def run():
+            return await asyncio.gather(
+                *(self.planner.request(exchange, *request) for exchange, *request in requests),
+                return_exceptions=True,
+            )
+
+        return asyncio.run(run())
+
+    def test_allowances_are_read_once_and_only_needed_approvals_sent(self) -> None:
+        """Every allowance is read in one batch, approvals already set are skipped and the rest sent together."""
+        exchange = FakeExchange()
+        results = self.request_all(
+            (exchange, TOKEN_A, VAULT, 100),
+            (exchange, TOKEN_B, VAULT, 100),
+            (exchange, TOKEN_A, ROUTER, 100),
+        )
+        assert results == [None, "0xbb1", "0xaa2"]
+        assert self.reads == [[(TOKEN_A, VAULT), (TOKEN_B, VAULT), (TOKEN_A, ROUTER)]]
+        assert exchange.sent == [(TOKEN_B, VAULT, 100), (TOKEN_A, ROUTER, 100)]
+        assert exchange.max_in_flight == 2
+        stats = self.planner.get_stats()
+        assert (stats["batches"], stats["already_approved"], stats["submitted"]) == (1, 1, 2)
+
+    def test_duplicate_requests_share_one_approval(self) -> None:
+        """Exchanges asking for the same pair get one approval, for the largest amount."""
+        balancer, cowswap = FakeExchange(), FakeExchange()
+        results = self.request_all((balancer, TOKEN_B, VAULT, 10), (cowswap, TOKEN_B, VAULT, 50))
+        assert results == ["0xbb1", "0xbb1"]
+        assert balancer.sent == []
+        assert cowswap.sent == [(TOKEN_B, VAULT, 50)]
+
+    def test_failed_approvals_fail_only_their_requests(self) -> None:
+        """An approval reverting on-chain fails its requests only."""
+        exchange = FakeExchange(failing=(TOKEN_B,))
+        results = self.request_all((exchange, TOKEN_B, VAULT, 100), (exchange, TOKEN_A, ROUTER, 100))
+        assert isinstance(results[0], RpcError)
+        assert results[1] == "0xaa2"
+        assert self.planner.get_stats()["failed"] == 1
+
+    def test_requests_after_a_batch_start_the_next_one(self) -> None:
+        """A request arriving while a batch is carried out is planned in the next batch."""
+        exchange = FakeExchange()
+
+        async def run():
+            first = asyncio.create_task(self.planner.request(exchange, TOKEN_B, VAULT, 100))
+            await asyncio.sleep(0.015)
+            second = await self.planner.request(exchange, TOKEN_A, ROUTER, 100)
+            return await first, second
+
+        assert asyncio.run(run()) == ("0xbb1", "0xaa2")
+        assert len(self.reads) == 2
+
+    def test_read_errors_fail_the_batch(self) -> None:
+        """Without the allowances nothing is sent."""
+        exchange = FakeExchange()
+
+        def read(pairs):
+            del pairs
+            msg = "down"
+            raise ConnectionError(msg)
+
+        self.planner = ApprovalsPlanner(read, window=0.01)
+        with pytest.raises(RpcError, match="down"):
+            asyncio.run(self.planner.request(exchange, TOKEN_B, VAULT, 100))
+        assert exchange.sent == []
@@ -0,0 +1,73 @@
+"""Tests for the block-scoped read cache."""
+
+from packages.eightballer.connections.dcxt.dcxt.block_cache import BlockCache, HeadTracker
+
+
+class FakeChain:
+    """A chain whose head only moves when told to."""
+
+    def __init__(self) -> None:
+        """Start at block 1."""
+        self.block_number = 1
+        self.polls = 0
+
+    def get_block_number(self) -> int:
+        """Return the head block."""
+        self.polls += 1
+        return self.block_number
+
+
+class TestBlockCache:
+    """Tests for the block cache."""
+
+    def setup_method(self) -> None:
+        """Set up a cache polling the fake chain on every lookup."""
+        self.chain = FakeChain()
+        self.cache = BlockCache(HeadTracker(self.chain.get_block_number, poll_interval=0))
+        self.reads = 0
+
+    def read(self) -> int:
+        """A read that counts how often it reaches the chain."""
+        self.reads += 1
+        return self.chain.block_number
+
+    def test_repeat_reads_are_served_within_a_block(self) -> None:
+        """The second read at the same head is a hit."""
+        assert self.cache.get_or_fetch("key", self.read) == 1
+        assert self.cache.get_or_fetch("key", self.read) == 1
+        assert self.reads == 1
+        assert self.cache.get_stats()["hits"] == 1
+
+    def test_new_block_invalidates(self) -> None:
+        """Entries are dropped when the head moves."""
+        self.cache.get_or_fetch("key", self.read)
+        self.chain.block_number = 2
+        assert self.cache.get_or_fetch("key", self.read) == 2
+        assert self.reads == 2
+        assert self.cache.get_stats()["invalidations"] == 1
+
+    def test_call_sites_can_opt_out(self) -> None:
+        """Reads with use_cache=False always reach the chain."""
+        self.cache.get_or_fetch("key", self.read)
+        self.cache.get_or_fetch("key", self.read, use_cache=False)
+        assert self.reads == 2
+        assert self.cache.get_stats()["bypassed"] == 1
+
+    def test_invalidate(self) -> None:
+        """Explicit invalidation drops the entries of the current block."""
+        self.cache.get_or_fetch("key", self.read)
+        self.cache.invalidate()
+        self.cache.get_or_fetch("key", self.read)
+        assert self.reads == 2
+
+
+def test_head_tracker_polls_at_most_once_per_interval() -> None:
+    """Repeated head lookups within the interval do not poll the chain."""
+    chain = FakeChain()
+    tracker = HeadTracker(chain.get_block_number, poll_interval=60)
+    assert tracker.head() == 1
+    chain.block_number = 5
+    assert tracker.head() == 1
+    tracker.observe(5)
+    assert tracker.head() == 5
+    assert chain.polls == 1
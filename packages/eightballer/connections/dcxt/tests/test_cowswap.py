@@ -0,0 +1,162 @@
+"""Tests for the CoW Swap ticker quotes."""
+
+import json
+import asyncio
+import logging
+from pathlib import Path
+
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.cowswap import CowSwapClient, ReferencePrice, OrderQuoteResponse
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RequestTimeout
+
+
+COWSWAP = "packages.eightballer.connections.dcxt.dcxt.cowswap"
+KEY_PATH = Path(__file__).parent / "data" / "key"
+WETH, USDC = "0x4200000000000000000000000000000000000006", "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913"
+# USDC received per WETH sold, and paid per WETH bought.
+BID, ASK = 2990.0, 3010.0
+
+
+def make_quote(sell_token: str, buy_token: str, sell_amount: int, owner: str) -> dict:
+    """Quote selling the amount at the bid, or buying at the ask."""
+    if sell_token.lower() == WETH:
+        buy_amount = int(sell_amount * BID / 10**12)
+    else:
+        buy_amount = int(sell_amount / ASK * 10**12)
+    return {
+        "quote": {
+            "sellToken": sell_token,
+            "buyToken": buy_token,
+            "sellAmount": str(sell_amount),
+            "buyAmount": str(buy_amount),
+            "validTo": 1,
+            "appData": "0x" + "00" * 32,
+            "feeAmount": "0",
+            "kind": "sell",
+            "partiallyFillable": False,
+            "sellTokenBalance": "erc20",
+            "buyTokenBalance": "erc20",
+            "signingScheme": "eip712",
+        },
+        "expiration": "2030-01-01T00:00:00Z",
+        "verified": True,
+        "from": owner,
+        "id": 1,
+    }
+
+
+class TestTickerQuotes:
+    """Tests for quoting both sides of a ticker, in turn or at once."""
+
+    def setup_method(self) -> None:
+        """Set up a client over an order book quoting at the bid and ask."""
+        self.posted: list[dict] = []
+        # seconds the order book takes to quote a sell of each token.
+        self.delays: dict[str, float] = {}
+
+        async def handle(request: httpx.Request) -> httpx.Response:
+            body = json.loads(request.content)
+            self.posted.append(body)
+            await asyncio.sleep(self.delays.get(body["sellToken"].lower(), 0))
+            return httpx.Response(
+                200,
+                json=make_quote(body["sellToken"], body["buyToken"], int(body["sellAmountBeforeFee"]), body["from"]),
+            )
+
+        self.clock = FakeClock(100.0)
+        self.client = self.make_client(handle, concurrent_quotes=True, quote_deadline=0.05)
+
+    def make_client(self, handle, **kwargs) -> CowSwapClient:
+        """Make a client on base, quoting through the handler."""
+        client = CowSwapClient(
+            "base",
+            "http://localhost:8545",
+            key_path=str(KEY_PATH),
+            logger=logging.getLogger(__name__),
+            sessions=SessionPool(transport=httpx.MockTransport(handle)),
+            **kwargs,
+        )
+        client.clock = self.clock
+        return client
+
+    def fetch_ticker(self):
+        """Fetch the ticker of half a WETH."""
+        return asyncio.run(self.client.fetch_ticker(symbol="WETH/USDC"))
+
+    def seed_reference(self, bid: float, ask: float, quoted_at: float) -> ReferencePrice:
+        """Record the last prices of the pair."""
+        reference = ReferencePrice(bid, ask, quoted_at, quoted_at)
+        self.client.reference_prices[(WETH, USDC)] = reference
+        return reference
+
+    def test_first_ticker_is_quoted_in_turn(self) -> None:
+        """Without a last price the sell of USDC is sized from the quote of the WETH sold."""
+        sells = []
+
+        async def get_quote(buy_token, sell_token, sell_amount_int, chain, address, order_book_api):
+            del chain
+            sells.append((sell_token.symbol, sell_amount_int))
+            quote = make_quote(sell_token.address, buy_token.address, sell_amount_int, address)
+            return order_book_api.deserialize_model(quote, OrderQuoteResponse)
+
+        with patch(f"{COWSWAP}.get_quote", get_quote):
+            ticker = self.fetch_ticker()
+        assert (ticker.bid, ticker.ask) == (pytest.approx(BID), pytest.approx(ASK))
+        assert sells == [("WETH", 5 * 10**17), ("USDC", int(0.5 * BID * 10**6))]
+        assert self.client.reference_prices[(WETH, USDC)] == ReferencePrice(
+            ticker.bid, ticker.ask, 100.0, 100.0
+        )
+        assert self.posted == []
+
+    def test_concurrent_quotes_are_opt_in(self) -> None:
+        """By default both sides are quoted in turn, even with a last price."""
+        self.client = self.make_client(lambda request: httpx.Response(500))
+        self.seed_reference(2000.0, 2100.0, 100.0)
+
+        async def get_quote(buy_token, sell_token, sell_amount_int, chain, address, order_book_api):
+            del chain
+            quote = make_quote(sell_token.address, buy_token.address, sell_amount_int, address)
+            return order_book_api.deserialize_model(quote, OrderQuoteResponse)
+
+        with patch(f"{COWSWAP}.get_quote", get_quote):
+            ticker = self.fetch_ticker()
+        assert (ticker.bid, ticker.ask) == (pytest.approx(BID), pytest.approx(ASK))
+
+    def test_both_sides_are_quoted_at_once(self) -> None:
+        """With a last price both sides are quoted together, the sell of USDC sized from the last bid."""
+        reference = self.seed_reference(2000.0, 2100.0, 90.0)
+        ticker = self.fetch_ticker()
+        assert (ticker.bid, ticker.ask) == (pytest.approx(BID), pytest.approx(ASK))
+        assert [body["sellAmountBeforeFee"] for body in self.posted] == [str(5 * 10**17), str(1000 * 10**6)]
+        assert (reference.bid, reference.ask, reference.bid_at, reference.ask_at) == (
+            ticker.bid,
+            ticker.ask,
+            100.0,
+            100.0,
+        )
+
+    def test_a_side_missing_its_deadline_falls_back_to_its_last_price(self) -> None:
+        """The last price is used while recent, and the miss raised once it is too old."""
+        reference = self.seed_reference(2000.0, 2100.0, 90.0)
+        self.delays[USDC] = 1.0
+        ticker = self.fetch_ticker()
+        assert (ticker.bid, ticker.ask) == (pytest.approx(BID), 2100.0)
+        # the fallback does not refresh the side it stands in for.
+        assert (reference.bid_at, reference.ask_at) == (100.0, 90.0)
+
+        self.clock.now = 90.0 + self.client.max_quote_staleness + 1
+        with pytest.raises(RequestTimeout, match="old"):
+            self.fetch_ticker()
+
+    def test_both_sides_missing_their_deadline_raise(self) -> None:
+        """Without a fresh quote on either side no ticker is returned."""
+        self.seed_reference(2000.0, 2100.0, 100.0)
+        self.delays[WETH] = self.delays[USDC] = 1.0
+        with pytest.raises(RequestTimeout, match="Both"):
+            self.fetch_ticker()
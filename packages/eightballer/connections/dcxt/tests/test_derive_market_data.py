@@ -0,0 +1,84 @@
+"""Tests for the Derive market data feed, replayed from recorded websocket messages."""
+
+import json
+import asyncio
+import logging
+from pathlib import Path
+
+import msgspec
+from derive_client.data_types.generated_models import TickerSlimSchema
+
+from packages.eightballer.connections.dcxt.dcxt.derive_market_data import ReplayConnection, DeriveMarketData
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+
+
+MESSAGES = json.loads((Path(__file__).parent / "data" / "derive_market_data.json").read_text())
+INSTRUMENT = "ETH-USDC"
+
+
+class TestDeriveMarketData:
+    """Tests for the local tickers and books."""
+
+    def setup_method(self) -> None:
+        """Set up a feed over a replayed connection and a REST snapshot counting its calls."""
+        self.clock = FakeClock()
+        self.snapshots: list[str] = []
+        self.connection = ReplayConnection(MESSAGES)
+
+        async def snapshot(instrument_name: str) -> TickerSlimSchema:
+            self.snapshots.append(instrument_name)
+            return msgspec.convert(
+                {**MESSAGES[1]["params"]["data"]["instrument_ticker"], "t": 1760659200200, "b": "2999.65"},
+                TickerSlimSchema,
+                strict=False,
+            )
+
+        self.feed = DeriveMarketData(
+            "wss://example/ws",
+            [INSTRUMENT],
+            snapshot,
+            logging.getLogger(__name__),
+            connect=self.connection,
+            clock=self.clock,
+        )
+
+    def replay(self) -> None:
+        """Play back the recorded messages through the feed."""
+
+        async def run():
+            async with self.connection as websocket:
+                await self.feed.consume(websocket)
+
+        asyncio.run(run())
+
+    def test_subscribes_to_the_configured_instruments(self) -> None:
+        """Ticker and book channels of each instrument are subscribed to in one request."""
+        self.replay()
+        assert self.connection.sent[0]["method"] == "subscribe"
+        assert self.connection.sent[0]["params"]["channels"] == ["ticker_slim.ETH-USDC.100", "orderbook.ETH-USDC.1.10"]
+
+    def test_books_are_sequence_checked(self) -> None:
+        """Stale publishes are dropped and gaps are counted, keeping the latest book."""
+        self.replay()
+        book = self.feed.get_order_book(INSTRUMENT)
+        assert book.publish_id == 105
+        assert book.bids[0] == (2999.7, 0.4)
+        assert book.asks[0] == (3000.3, 0.9)
+        stats = self.feed.get_stats()
+        assert (stats["books"], stats["tickers"], stats["stale"], stats["gaps"]) == (3, 2, 2, 1)
+
+    def test_tickers_are_read_from_memory_and_resynced_over_rest(self) -> None:
+        """A gap or a stale ticker is resynced from REST once, fresh tickers are memory reads."""
+        self.replay()
+
+        async def read():
+            return await self.feed.get_ticker(INSTRUMENT)
+
+        # the recorded stream has a gap, so the first read resyncs.
+        assert float(asyncio.run(read()).b) == 2999.65
+        assert float(asyncio.run(read()).b) == 2999.65
+        assert self.snapshots == [INSTRUMENT]
+        self.clock.now += 10
+        asyncio.run(read())
+        assert self.snapshots == [INSTRUMENT] * 2
+        assert self.feed.get_stats()["hits"] == 1
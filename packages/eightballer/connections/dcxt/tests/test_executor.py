@@ -0,0 +1,57 @@
+"""Tests for the blocking call executor."""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from packages.eightballer.connections.dcxt.executor import BlockingCallExecutor
+
+
+@pytest.mark.asyncio
+class TestBlockingCallExecutor:
+    """Tests for the blocking call executor."""
+
+    def setup_method(self) -> None:
+        """Set up the executor."""
+        self.executor = BlockingCallExecutor(max_workers=4, ledger_limits={"base": 1}, default_ledger_limit=2)
+
+    def teardown_method(self) -> None:
+        """Shut the executor down."""
+        self.executor.shutdown()
+
+    async def test_runs_off_the_event_loop(self) -> None:
+        """Blocking calls run on a worker thread and return their result."""
+        result = await self.executor.run("ethereum", threading.current_thread)
+        assert result is not threading.current_thread()
+        assert self.executor.get_stats()["ethereum"]["completed"] == 1
+
+    async def test_ledger_limit_is_respected(self) -> None:
+        """No more calls than the ledger limit run at the same time."""
+        running, peak = 0, 0
+        lock = threading.Lock()
+
+        def work() -> None:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+
+        await asyncio.gather(*(self.executor.run("base", work) for _ in range(3)))
+        assert peak == 1
+        assert self.executor.get_stats()["base"]["max_wait_seconds"] > 0
+
+    async def test_failures_are_counted(self) -> None:
+        """Exceptions propagate to the caller and are counted."""
+
+        def fail() -> None:
+            msg = "boom"
+            raise ValueError(msg)
+
+        with pytest.raises(ValueError, match="boom"):
+            await self.executor.run("ethereum", fail)
+        assert self.executor.get_stats()["ethereum"]["failed"] == 1
@@ -0,0 +1,78 @@
+"""Tests for the fee oracle."""
+
+from packages.eightballer.connections.dcxt.dcxt.fees import FeeOracle
+
+
+GWEI = 10**9
+
+
+class FakeLedger:
+    """A ledger answering fee reads and counting them."""
+
+    def __init__(self, base_fees: list[int], rewards: list[list[int]], gas_price: int = 3 * GWEI) -> None:
+        """Answer with the given fee history."""
+        self.block = 100
+        self.base_fees = base_fees
+        self.rewards = rewards
+        self.gas_price = gas_price
+        self.reads = 0
+
+    def get_fee_history(self, blocks: int, percentiles: list[int]) -> dict:
+        """Read the fee history."""
+        assert (blocks, percentiles) == (3, [10, 50, 90])
+        self.reads += 1
+        return {"baseFeePerGas": self.base_fees, "reward": self.rewards}
+
+    def get_gas_price(self) -> int:
+        """Read the legacy gas price."""
+        self.reads += 1
+        return self.gas_price
+
+
+def make_oracle(ledger: FakeLedger, **kwargs) -> FeeOracle:
+    """Make an oracle over the fake ledger."""
+    return FeeOracle(lambda: ledger.block, ledger.get_fee_history, ledger.get_gas_price, history_blocks=3, **kwargs)
+
+
+class TestFeeOracle:
+    """Tests for fees served from a sample per block."""
+
+    def setup_method(self) -> None:
+        """Set up an EIP-1559 ledger whose next base fee is 10 gwei."""
+        self.ledger = FakeLedger(
+            base_fees=[9 * GWEI, 9 * GWEI, 10 * GWEI, 10 * GWEI],
+            rewards=[[1 * GWEI, 2 * GWEI, 5 * GWEI], [1 * GWEI, 3 * GWEI, 4 * GWEI], [2 * GWEI, 2 * GWEI, 9 * GWEI]],
+        )
+
+    def test_fees_are_sampled_once_per_block(self) -> None:
+        """Every read in a block is served from one fee history read."""
+        oracle = make_oracle(self.ledger)
+        for _ in range(3):
+            oracle.fees("high")
+            oracle.gas_price()
+        assert self.ledger.reads == 1
+        self.ledger.block += 1
+        oracle.fees()
+        assert self.ledger.reads == 2
+        assert oracle.get_stats()["hits"] == 5
+
+    def test_priority_fees_follow_urgency(self) -> None:
+        """The priority fee is the median of the urgency's percentile, with room for the base fee to rise."""
+        oracle = make_oracle(self.ledger)
+        assert oracle.fees("low") == {"maxFeePerGas": 21 * GWEI, "maxPriorityFeePerGas": 1 * GWEI}
+        assert oracle.fees("medium") == {"maxFeePerGas": 22 * GWEI, "maxPriorityFeePerGas": 2 * GWEI}
+        assert oracle.fees("high") == {"maxFeePerGas": 25 * GWEI, "maxPriorityFeePerGas": 5 * GWEI}
+        assert oracle.gas_price() == 12 * GWEI
+
+    def test_fees_are_bounded(self) -> None:
+        """The minimum priority fee and the fee cap apply."""
+        oracle = make_oracle(self.ledger, min_priority_fee=3 * GWEI, max_fee=20 * GWEI)
+        assert oracle.fees("low") == {"maxFeePerGas": 20 * GWEI, "maxPriorityFeePerGas": 3 * GWEI}
+
+    def test_ledgers_without_a_base_fee_get_legacy_prices(self) -> None:
+        """Without a base fee the node's gas price is used, with a premium for urgency."""
+        ledger = FakeLedger(base_fees=[0, 0, 0, 0], rewards=[])
+        oracle = make_oracle(ledger)
+        assert oracle.fees("low") == {"gasPrice": 3 * GWEI}
+        assert oracle.fees("high") == {"gasPrice": int(4.5 * GWEI)}
+        assert oracle.get_stats()["legacy"] == 1
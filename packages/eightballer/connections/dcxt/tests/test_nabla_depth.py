@@ -0,0 +1,61 @@
+"""Tests for the Nabla depth batching."""
+
+import json
+from pathlib import Path
+
+from web3 import Web3
+
+from packages.eightballer.connections.dcxt.dcxt.nabla_depth import (
+    CALL_OVERHEAD_BYTES,
+    DepthCurve,
+    chunk_calls,
+    decode_quote,
+    get_reference_amount,
+    encode_quote_with_reference_price,
+)
+
+
+NABLA_QUOTE_ABI = Path(__file__).parents[4] / "dakavon" / "contracts" / "nabla_quote" / "build" / "nabla_quote.json"
+QUOTE = "0x0000000000000000000000000000000000001234"
+WETH = "0x4200000000000000000000000000000000000006"
+USDC = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"
+ROUTER = "0x000000000000000000000000000000000000dEaD"
+
+
+def test_calldata_matches_the_contract_abi() -> None:
+    """The pre-encoded call is what the contract instance would encode."""
+    abi = json.loads(NABLA_QUOTE_ABI.read_text())["abi"]
+    contract = Web3().eth.contract(address=QUOTE, abi=abi)
+    args = [10**18, 3000 * 10**6, [WETH, USDC], [ROUTER], [3000 * 10**8, 10**8]]
+    expected = contract.functions.quoteWithReferencePrice(*args)._encode_transaction_data()  # noqa: SLF001
+    assert "0x" + encode_quote_with_reference_price(*args).hex() == expected
+
+
+def test_reference_amount() -> None:
+    """One WETH at 3000 USD buys 3000 USDC."""
+    assert get_reference_amount(10**18, 3000 * 10**8, 10**8, 18, 6) == 3000 * 10**6
+
+
+def test_calls_are_chunked_within_budgets() -> None:
+    """Batches stay within the gas and calldata budgets, in order."""
+    calls = [{"target": QUOTE, "allowFailure": True, "callData": bytes([index]) * 100} for index in range(10)]
+    assert chunk_calls(calls) == [calls]
+    by_gas = chunk_calls(calls, gas_per_call=100, max_batch_gas=300)
+    assert [len(batch) for batch in by_gas] == [3, 3, 3, 1]
+    by_size = chunk_calls(calls, max_batch_bytes=2 * (100 + CALL_OVERHEAD_BYTES))
+    assert [len(batch) for batch in by_size] == [2] * 5
+    assert [call for batch in by_size for call in batch] == calls
+
+
+def test_decode_quote() -> None:
+    """Both amounts out are decoded, failed or short results are None."""
+    data = (5).to_bytes(32, "big") + (7).to_bytes(32, "big")
+    assert decode_quote(True, data) == (5, 7)
+    assert decode_quote(False, data) is None
+    assert decode_quote(True, data[:32]) is None
+
+
+def test_depth_curve_levels() -> None:
+    """Levels pair the ask and bid of each amount."""
+    curve = DepthCurve(WETH, USDC, (1.0, 2.0), (3001.0, None), (2999.0, None), block_number=1)
+    assert curve.levels == [(3001.0, 2999.0), (None, None)]
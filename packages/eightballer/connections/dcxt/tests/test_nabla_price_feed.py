@@ -0,0 +1,88 @@
+"""Tests for the Nabla price feed client."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.exceptions import ExchangeError
+from packages.eightballer.connections.dcxt.dcxt.nabla_price_feed import NablaPriceFeed
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+
+
+URL = "https://prices.example/v1/updates/price/latest"
+ETH_FEED = "aa" * 32
+USDC_FEED = "bb" * 32
+BTC_FEED = "cc" * 32
+
+
+class TestNablaPriceFeed:
+    """Tests for the price feed client."""
+
+    def setup_method(self) -> None:
+        """Set up a feed over a mocked price API recording the feeds of every request."""
+        self.requests: list[list[str]] = []
+        self.clock = FakeClock()
+        self.status = 200
+
+        async def handle(request: httpx.Request) -> httpx.Response:
+            feed_ids = request.url.params.get_list("ids[]")
+            self.requests.append(feed_ids)
+            await asyncio.sleep(0.01)
+            return httpx.Response(
+                self.status,
+                json={
+                    "binary": {"data": [f"{len(self.requests):02x}"], "encoding": "hex"},
+                    "parsed": [{"id": feed_id, "price": {"price": 1}} for feed_id in feed_ids],
+                },
+            )
+
+        self.feed = NablaPriceFeed(SessionPool(transport=httpx.MockTransport(handle)), URL, clock=self.clock)
+
+    def test_prices_are_cached_per_feed(self) -> None:
+        """Feeds covered by a fresh request are served from memory until the ttl runs out."""
+
+        async def run():
+            first = await self.feed.get_prices([bytes.fromhex(ETH_FEED), "0x" + USDC_FEED])
+            cached = await self.feed.get_prices([ETH_FEED])
+            self.clock.now += 0.5
+            refreshed = await self.feed.get_prices([ETH_FEED])
+            return first, cached, refreshed
+
+        first, cached, refreshed = asyncio.run(run())
+        assert {entry["id"] for entry in first["parsed"]} == {ETH_FEED, USDC_FEED}
+        assert cached["binary"] == first["binary"]
+        assert [entry["id"] for entry in cached["parsed"]] == [ETH_FEED]
+        assert refreshed["binary"]["data"] == ["02"]
+        # the refresh also covers the feed asked for recently.
+        assert sorted(self.requests[1]) == [ETH_FEED, USDC_FEED]
+
+    def test_concurrent_callers_share_a_request(self) -> None:
+        """Callers needing feeds covered by a request in flight wait for it."""
+
+        async def run():
+            await asyncio.gather(
+                self.feed.get_prices([ETH_FEED, USDC_FEED]),
+                self.feed.get_prices([USDC_FEED]),
+                self.feed.get_prices([ETH_FEED]),
+            )
+            await self.feed.get_prices([BTC_FEED])
+
+        asyncio.run(run())
+        assert len(self.requests) == 2
+        assert sorted(self.requests[1]) == [ETH_FEED, USDC_FEED, BTC_FEED]
+        assert self.feed.get_stats()["shared"] == 2
+
+    def test_errors_are_raised_and_not_cached(self) -> None:
+        """A failed request is retried by the next caller."""
+        self.status = 500
+
+        async def run():
+            with pytest.raises(ExchangeError):
+                await self.feed.get_prices([ETH_FEED])
+            self.status = 200
+            return await self.feed.get_prices([ETH_FEED])
+
+        assert asyncio.run(run())["parsed"][0]["id"] == ETH_FEED
+        assert len(self.requests) == 2
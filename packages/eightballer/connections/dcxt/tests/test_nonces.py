@@ -0,0 +1,101 @@
+"""Tests for the nonce manager."""
+
+import threading
+
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.nonces import NonceManager
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+
+
+ADDRESS = "0x000000000000000000000000000000000000dEaD"
+
+
+class FakeLedger:
+    """The mined and pending transaction counts of an account."""
+
+    def __init__(self, mined: int = 0, pending: int | None = None) -> None:
+        """Start the account at the given counts."""
+        self.mined = mined
+        self.pending = mined if pending is None else pending
+        self.reads = 0
+
+    def get_transaction_count(self, address: str, block: str) -> int:
+        """Read a count."""
+        assert address == ADDRESS
+        self.reads += 1
+        return self.mined if block == "latest" else self.pending
+
+
+class TestNonceManager:
+    """Tests for local nonce allocation."""
+
+    def setup_method(self) -> None:
+        """Set up a manager over an account that has sent 5 transactions."""
+        self.clock = FakeClock()
+        self.ledger = FakeLedger(mined=5)
+        self.nonces = NonceManager(ADDRESS, self.ledger.get_transaction_count, resync_interval=60, clock=self.clock)
+
+    def send(self, tx_hash: str) -> int:
+        """Send a transaction at the next nonce."""
+        with self.nonces.use() as nonce:
+            self.nonces.sent(nonce, tx_hash)
+        return nonce
+
+    def test_nonces_are_handed_out_without_reading_the_ledger(self) -> None:
+        """Only the first allocation reads the ledger, so many transactions can be in flight."""
+        assert [self.send(f"0x{i}") for i in range(3)] == [5, 6, 7]
+        assert self.ledger.reads == 2
+        assert self.nonces.get_stats()["pending"] == 3
+        self.nonces.confirm("0x0")
+        assert self.nonces.get_stats()["pending"] == 2
+
+    def test_unsent_nonces_fill_the_gap(self) -> None:
+        """A nonce whose transaction failed to build or send is handed out again first."""
+        self.send("0xa")
+        with pytest.raises(ValueError, match="gas"), self.nonces.use():
+            msg = "gas required exceeds allowance"
+            raise ValueError(msg)
+        self.send("0xc")
+        assert self.send("0xd") == 7
+        assert self.nonces.get_stats()["reused"] == 1
+
+    def test_nonce_errors_resync(self) -> None:
+        """A nonce error from the node makes the next allocation read the ledger again."""
+        self.send("0xa")
+        # another process sent from the account in the meantime.
+        self.ledger.mined = self.ledger.pending = 9
+        with pytest.raises(ValueError, match="nonce too low"), self.nonces.use():
+            msg = "nonce too low"
+            raise ValueError(msg)
+        assert self.send("0xb") == 9
+        stats = self.nonces.get_stats()
+        assert (stats["resyncs"], stats["confirmed"], stats["pending"]) == (2, 1, 1)
+
+    def test_dropped_transactions_are_resent_after_the_interval(self) -> None:
+        """A transaction the node no longer knows about frees its nonce once it is overdue."""
+        self.send("0xa")
+        self.send("0xb")
+        # the node dropped both.
+        self.ledger.pending = 5
+        self.clock.now += 30
+        assert self.send("0xc") == 7
+        self.clock.now += 60
+        assert self.send("0xd") == 5
+        assert self.nonces.get_stats()["dropped"] == 1
+        assert self.send("0xe") == 8
+
+    def test_concurrent_allocations_are_unique(self) -> None:
+        """Threads sharing the manager never get the same nonce."""
+        allocated: list[int] = []
+
+        def allocate():
+            for _ in range(50):
+                allocated.append(self.nonces.allocate())
+
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(allocated) == list(range(5, 205))
@@ -0,0 +1,141 @@
+"""Tests for the 1inch API client."""
+
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.one_inch import (
+    RATE_LIMIT_MESSAGE,
+    OneInchSwapApi,
+    OneInchApiClient,
+    OneInchSwapParams,
+    InvalidSwapParams,
+)
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RequestTimeout, ExchangeNotAvailable
+
+
+SWAP_PARAMS = OneInchSwapParams(
+    src="0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48",
+    dst="0x0001A500A6B18995B03f44bb040A5fFc28E45CB0",
+    amount="1000000",
+    slippage=1,
+    from_="0x000000000000000000000000000000000000dEaD",
+    disable_estimate=False,
+    allow_partial_fill=False,
+)
+
+
+class TestOneInchSwapApi:
+    """Tests for the request budget, retries and counters of the 1inch client."""
+
+    def make_api(self, responses: list[httpx.Response], budget: dict | None = None, **kwargs) -> OneInchSwapApi:
+        """Make a client over a mocked API answering with the responses in turn."""
+        self.requests: list[httpx.Request] = []
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            return responses.pop(0)
+
+        return OneInchSwapApi(
+            api=None,
+            account=None,
+            chain_id=1,
+            # each test gets its own key, so it does not share a budget with the others.
+            api_key=f"key-{id(self)}-{len(OneInchSwapApi._budgets)}",  # noqa: SLF001
+            logger=logging.getLogger(__name__),
+            sessions=SessionPool(transport=httpx.MockTransport(handle)),
+            budget=budget or {"rate": 1000, "burst": 1000},
+            backoff=0.0,
+            **kwargs,
+        )
+
+    def test_rate_limits_are_retried(self) -> None:
+        """Throttled and failed requests are retried and counted per endpoint."""
+        api = self.make_api(
+            [
+                httpx.Response(429, text="Too Many Requests"),
+                httpx.Response(200, text=RATE_LIMIT_MESSAGE),
+                httpx.Response(502),
+                httpx.Response(200, json={"dstAmount": "42"}),
+            ]
+        )
+        assert asyncio.run(api.get_quote(SWAP_PARAMS)) == {"dstAmount": "42"}
+        assert self.requests[0].url.path == "/swap/v6.0/1/quote"
+        assert self.requests[0].headers["Authorization"].startswith("Bearer key-")
+        stats = api.get_stats()["/quote"]
+        assert (stats["requests"], stats["retries"], stats["rate_limited"], stats["errors"]) == (4, 3, 2, 1)
+
+    def test_retries_are_bounded(self) -> None:
+        """Once the retries are spent the last error is raised."""
+        api = self.make_api([httpx.Response(429)] * 3, max_retries=2)
+        with pytest.raises(ExchangeNotAvailable):
+            asyncio.run(api.get_quote(SWAP_PARAMS))
+        assert len(self.requests) == 3
+
+    def test_errors_are_not_retried_unless_transient(self) -> None:
+        """Insufficient liquidity is retried, other errors are raised straight away."""
+        api = self.make_api(
+            [
+                httpx.Response(400, json={"error": "Bad Request", "description": "insufficient liquidity"}),
+                httpx.Response(400, json={"error": "Bad Request", "description": "cannot estimate"}),
+            ]
+        )
+        with pytest.raises(InvalidSwapParams, match="cannot estimate"):
+            asyncio.run(api.get_quote(SWAP_PARAMS))
+        assert len(self.requests) == 2
+
+    def test_requests_wait_for_the_budget(self) -> None:
+        """Requests beyond the burst wait for the bucket to refill."""
+        api = self.make_api([httpx.Response(200, json={"dstAmount": "1"}) for _ in range(3)], {"rate": 100, "burst": 1})
+
+        async def run():
+            await asyncio.gather(*(api.get_quote(SWAP_PARAMS) for _ in range(3)))
+
+        asyncio.run(run())
+        stats = api.get_stats()["/quote"]
+        assert stats["requests"] == 3
+        assert stats["budget_waits"] >= 2
+        assert stats["budget_wait_seconds"] > 0
+
+
+class TestSwapTokens:
+    """Tests for sending swaps through the exchange's nonces and receipt watcher."""
+
+    def make_exchange(self, receipt: dict | None) -> SimpleNamespace:
+        """Make an exchange sending at nonce 7 and answering with the receipt, timing out without one."""
+        self.sent: list[dict] = []
+
+        async def build_swap_transaction(swap_params):
+            return {"to": swap_params.dst, "value": 0}
+
+        async def run_blocking(func, *args):
+            return func(*args)
+
+        def send_transaction(build):
+            self.sent.append(build(7))
+            return "0xhash"
+
+        async def wait_for_receipt(tx_hash, timeout=None):
+            del tx_hash, timeout
+            if receipt is None:
+                raise RequestTimeout
+            return receipt
+
+        return SimpleNamespace(
+            one_inch_api=SimpleNamespace(build_swap_transaction=build_swap_transaction),
+            run_blocking=run_blocking,
+            send_transaction=send_transaction,
+            wait_for_receipt=wait_for_receipt,
+            logger=logging.getLogger(__name__),
+        )
+
+    @pytest.mark.parametrize(("receipt", "result"), [({"status": 1}, True), ({"status": 0}, False), (None, False)])
+    def test_swaps_are_sent_at_the_next_nonce_and_waited_on(self, receipt: dict | None, result: bool) -> None:
+        """The swap is sent at the account's next nonce and succeeds only with a successful receipt."""
+        exchange = self.make_exchange(receipt)
+        assert asyncio.run(OneInchApiClient.swap_tokens(exchange, SWAP_PARAMS)) == (result, "0xhash")
+        assert self.sent == [{"to": SWAP_PARAMS.dst, "value": 0, "nonce": 7}]
@@ -0,0 +1,88 @@
+"""Tests for the order tracker."""
+
+import asyncio
+
+import pytest
+
+from packages.eightballer.protocols.orders.custom_types import OrderStatus
+from packages.eightballer.connections.dcxt.dcxt.exceptions import ExchangeNotAvailable
+from packages.eightballer.connections.dcxt.dcxt.order_tracker import OrderUpdate, OrderTracker
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+
+
+class TestOrderTracker:
+    """Tests for the order tracker."""
+
+    def setup_method(self) -> None:
+        """Set up a tracker over an exchange recording the uids it is asked about."""
+        self.clock = FakeClock(1_700_000_000.0)
+        self.statuses: dict[str, OrderStatus] = {}
+        self.polled: list[str] = []
+        self.tracker = OrderTracker(min_interval=2.0, max_interval=60.0, clock=self.clock)
+
+    async def fetch(self, uid: str) -> OrderUpdate:
+        """Report the status the exchange currently has for an order."""
+        self.polled.append(uid)
+        await asyncio.sleep(0)
+        status = self.statuses[uid]
+        if status is None:
+            msg = "down"
+            raise ExchangeNotAvailable(msg)
+        return OrderUpdate(status, order=f"order-{uid}-{status.name}")
+
+    def poll(self) -> list[str]:
+        """Poll the due orders and return the uids that changed."""
+        return [entry.uid for entry in asyncio.run(self.tracker.poll(self.fetch))]
+
+    def test_only_live_due_orders_are_polled(self) -> None:
+        """Terminal orders and orders not yet due are left alone."""
+        self.statuses = {"a": OrderStatus.OPEN, "b": OrderStatus.OPEN}
+        self.tracker.track("a")
+        self.tracker.track("b")
+        self.tracker.track("c", status=OrderStatus.FILLED)
+        assert self.poll() == []
+        self.clock.now += 2
+        self.statuses["a"] = OrderStatus.FILLED
+        assert self.poll() == ["a"]
+        assert sorted(self.polled) == ["a", "b"]
+        assert self.tracker.get("a").order == "order-a-FILLED"
+        self.clock.now += 60
+        assert self.poll() == []
+        assert self.polled[2:] == ["b"]
+        assert self.tracker.get_stats()["live"] == 1
+
+    def test_backoff_grows_with_age_and_stops_at_expiry(self) -> None:
+        """Older orders are polled less often, within a share of their validity window and by their expiry."""
+        now = self.clock.now
+        self.tracker.track("young")
+        self.tracker.track("old", created_at=now - 1000)
+        self.tracker.track("expiring", created_at=now - 1000, valid_to=now + 5)
+        self.tracker.track("short", created_at=now - 100, valid_to=now + 100)
+        intervals = {uid: entry.next_poll - now for uid, entry in self.tracker.orders.items()}
+        assert intervals == {"young": 2.0, "old": 60.0, "expiring": 5.0, "short": 20.0}
+
+    def test_failed_polls_are_retried(self) -> None:
+        """A failing order is polled again later, and an error is raised only when every poll fails."""
+        self.statuses = {"a": None, "b": OrderStatus.OPEN}
+        self.tracker.track("a")
+        self.tracker.track("b")
+        self.clock.now += 2
+        assert self.poll() == []
+        self.clock.now += 2
+        self.statuses["b"] = None
+        with pytest.raises(ExchangeNotAvailable):
+            self.poll()
+        assert self.tracker.get_stats()["errors"] == 3
+
+    def test_terminal_orders_are_forgotten_after_retention(self) -> None:
+        """Closed orders are kept for the retention period only."""
+        self.tracker.retention = 10
+        self.statuses = {"a": OrderStatus.CANCELLED, "b": OrderStatus.OPEN}
+        self.tracker.track("a")
+        self.tracker.track("b")
+        self.clock.now += 2
+        assert self.poll() == ["a"]
+        self.clock.now += 11
+        self.poll()
+        assert "a" not in self.tracker
+        assert "b" in self.tracker
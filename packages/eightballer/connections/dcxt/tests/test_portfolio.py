@@ -0,0 +1,110 @@
+"""Tests for the portfolio snapshots."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+from eth_abi import encode
+
+from packages.eightballer.connections.dcxt.dcxt.portfolio import PortfolioReader, read_account_balances
+from packages.eightballer.connections.dcxt.dcxt.block_cache import BlockCache, HeadTracker
+
+
+WALLET = "0x000000000000000000000000000000000000dEaD"
+OTHER_WALLET = "0x000000000000000000000000000000000000bEEF"
+OLAS = "0x0001A500A6B18995B03f44bb040A5fFc28E45CB0"
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+
+
+def uint(value: int) -> tuple[bool, bytes]:
+    """A successful call returning a uint256."""
+    return True, encode(["uint256"], [value])
+
+
+class FakeExchange:
+    """An exchange exposing what the portfolio reader needs."""
+
+    def __init__(self, address: str, block_cache: BlockCache) -> None:
+        """Initialise the exchange."""
+        self.account = MagicMock(address=address)
+        self.web3 = MagicMock()
+        self.block_cache = block_cache
+
+    def get_balance_tokens(self) -> list[str]:
+        """The tokens to read."""
+        return [OLAS, USDC]
+
+    def balances_from_snapshot(self, account):
+        """Unused here, only marks the exchange as supported."""
+        return account
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run inline."""
+        return func(*args, **kwargs)
+
+
+def test_native_and_token_balances_are_read_in_one_call_at_one_block() -> None:
+    """Every balance comes from a single aggregate3 call pinned to the given block."""
+    results = [uint(10**18), uint(5), (False, b"")]
+    with patch("packages.eightballer.connections.dcxt.dcxt.portfolio.aggregate3", return_value=results) as aggregate3:
+        accounts = read_account_balances(MagicMock(), "ethereum", [WALLET, WALLET.lower()], [OLAS, USDC], 42)
+    account = accounts[WALLET]
+    assert account.native == 10**18
+    assert account.tokens == {OLAS: 5}
+    assert account.block_number == 42
+    aggregate3.assert_called_once()
+    _ledger_api, calls, block_identifier = aggregate3.call_args.args
+    assert (len(calls), block_identifier) == (3, 42)
+
+
+def test_shared_wallets_are_read_once_and_callers_share_the_snapshot() -> None:
+    """Exchanges sharing a wallet on a ledger are deduplicated and concurrent snapshots share its read."""
+    block_cache = BlockCache(HeadTracker(lambda: 7, poll_interval=60))
+    exchanges = {
+        "ethereum": {
+            "balancer": FakeExchange(WALLET, block_cache),
+            "one_inch": FakeExchange(WALLET.lower(), block_cache),
+            "cowswap": FakeExchange(OTHER_WALLET, block_cache),
+            "derive": object(),
+        }
+    }
+    results = [uint(1), uint(2), uint(3)] * 2
+    reader = PortfolioReader(exchanges)
+    assert reader.get_targets()["ethereum"][1] == [OTHER_WALLET, WALLET]
+
+    async def take_snapshots():
+        return await asyncio.gather(reader.snapshot(), reader.snapshot())
+
+    with patch("packages.eightballer.connections.dcxt.dcxt.portfolio.aggregate3", return_value=results) as aggregate3:
+        first, second = asyncio.run(take_snapshots())
+    assert first.accounts == second.accounts
+    assert first.blocks == {"ethereum": 7}
+    assert first.get("ethereum", WALLET.lower()).tokens == {OLAS: 2, USDC: 3}
+    aggregate3.assert_called_once()
+    assert aggregate3.call_args.args[2] == 7
+
+
+def test_a_ledger_is_read_without_waiting_on_the_others() -> None:
+    """A snapshot of one ledger reads only that ledger, however slow the others are."""
+
+    class StalledExchange(FakeExchange):
+        """An exchange whose reads never complete."""
+
+        async def run_blocking(self, func, *args, **kwargs):
+            """Wait forever."""
+            await asyncio.Event().wait()
+
+    block_cache = BlockCache(HeadTracker(lambda: 7, poll_interval=60))
+    reader = PortfolioReader(
+        {
+            "ethereum": {"balancer": FakeExchange(WALLET, block_cache)},
+            "base": {"balancer": StalledExchange(WALLET, block_cache)},
+        }
+    )
+
+    async def take_snapshot():
+        return await asyncio.wait_for(reader.snapshot(["ethereum"]), timeout=1)
+
+    with patch("packages.eightballer.connections.dcxt.dcxt.portfolio.aggregate3", return_value=[uint(1)] * 3):
+        snapshot = asyncio.run(take_snapshot())
+    assert snapshot.blocks == {"ethereum": 7}
+    assert snapshot.get("base", WALLET) is None
@@ -0,0 +1,134 @@
+"""Tests for the router quote cache."""
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.quote_cache import QuoteCache
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+
+
+OLAS = "0x0001A500A6B18995B03f44bb040A5fFc28E45CB0"
+USDC = "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48"
+
+
+class TestQuoteCache:
+    """Tests for the quote cache."""
+
+    def setup_method(self) -> None:
+        """Set up a cache on a fake clock and head."""
+        self.clock = FakeClock()
+        self.head = 100
+        self.fetches = 0
+        self.cache = QuoteCache(ttl=5.0, max_blocks=2, bucket_ratio=0.01, get_head=lambda: self.head, clock=self.clock)
+
+    def fetch(self) -> float:
+        """Fetch a quote, counting upstream calls."""
+        self.fetches += 1
+        self.clock.now += 0.5
+        return 0.4
+
+    def test_nearby_amounts_share_a_quote(self) -> None:
+        """Amounts within the bucket ratio hit, other sides, pairs and amounts miss."""
+        assert self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, self.fetch) == 0.4
+        assert self.cache.get_or_fetch(OLAS.lower(), USDC, "sell", 1000.5, self.fetch) == 0.4
+        assert self.fetches == 1
+        self.cache.get_or_fetch(OLAS, USDC, "buy", 1000, self.fetch)
+        self.cache.get_or_fetch(USDC, OLAS, "sell", 1000, self.fetch)
+        self.cache.get_or_fetch(OLAS, USDC, "sell", 1100, self.fetch)
+        assert self.fetches == 4
+        stats = self.cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["hit_ratio"] == pytest.approx(0.2)
+        assert stats["saved_seconds"] == pytest.approx(0.5)
+
+    def test_quotes_expire_by_time_and_blocks(self) -> None:
+        """Quotes older than the ttl, or too many blocks behind the head, are fetched again."""
+        self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, self.fetch)
+        self.clock.now += 5.0
+        self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, self.fetch)
+        self.head += 3
+        self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, self.fetch)
+        assert self.fetches == 3
+        assert self.cache.get_stats()["expired"] == 2
+
+    def test_failures_are_not_cached(self) -> None:
+        """A failed fetch is retried by the next lookup."""
+
+        def fail() -> float:
+            raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, fail)
+        assert self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, self.fetch) == 0.4
+
+    def test_concurrent_lookups_are_coalesced(self) -> None:
+        """Identical lookups made while a quote is being fetched wait for it instead of fetching again."""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch() -> float:
+            started.set()
+            release.wait(timeout=5)
+            return self.fetch()
+
+        results = []
+
+        def lookup() -> None:
+            results.append(self.cache.get_or_fetch(OLAS, USDC, "sell", 1000, slow_fetch))
+
+        threads = [threading.Thread(target=lookup) for _ in range(4)]
+        threads[0].start()
+        started.wait(timeout=5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=5)
+        assert results == [0.4] * 4
+        assert self.fetches == 1
+        assert self.cache.stats.coalesced + self.cache.stats.hits == 3
+
+    def test_concurrent_async_lookups_are_coalesced(self) -> None:
+        """Identical lookups on the event loop share one fetch, and its failure."""
+
+        async def slow_fetch() -> float:
+            await asyncio.sleep(0.01)
+            return self.fetch()
+
+        async def fail() -> float:
+            await asyncio.sleep(0.01)
+            raise RuntimeError
+
+        async def run():
+            quotes = await asyncio.gather(
+                *(self.cache.aget_or_fetch(OLAS, USDC, "sell", 1000, slow_fetch) for _ in range(3))
+            )
+            errors = await asyncio.gather(
+                *(self.cache.aget_or_fetch(OLAS, USDC, "buy", 1000, fail) for _ in range(2)), return_exceptions=True
+            )
+            return quotes, errors
+
+        quotes, errors = asyncio.run(run())
+        assert quotes == [0.4] * 3
+        assert self.fetches == 1
+        assert self.cache.stats.coalesced == 2
+        assert [type(error) for error in errors] == [RuntimeError] * 2
+
+    def test_async_lookups_read_the_head_off_the_event_loop(self) -> None:
+        """The head, which may poll the ledger, is read through `run_blocking`."""
+        readers = []
+
+        def get_head() -> int:
+            readers.append(threading.current_thread())
+            return self.head
+
+        async def fetch() -> float:
+            return self.fetch()
+
+        cache = QuoteCache(ttl=5.0, max_blocks=2, get_head=get_head, clock=self.clock)
+        assert asyncio.run(cache.aget_or_fetch(OLAS, USDC, "sell", 1000, fetch)) == 0.4
+        assert readers
+        assert threading.main_thread() not in readers
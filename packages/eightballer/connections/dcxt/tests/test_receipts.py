@@ -0,0 +1,132 @@
+"""Tests for the receipt watcher."""
+
+import asyncio
+import logging
+
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.receipts import ReceiptWatcher, fetch_receipts
+from packages.eightballer.connections.dcxt.dcxt.exceptions import RequestTimeout, TransactionReplaced
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+
+
+ADDRESS = "0x000000000000000000000000000000000000dEaD"
+
+
+class FakeChain:
+    """A ledger mining transactions when told to, and counting the batches read from it."""
+
+    def __init__(self) -> None:
+        """Start at block 100 with nothing mined."""
+        self.block = 100
+        self.receipts: dict[str, dict] = {}
+        self.mined_nonce = 0
+        self.batches: list[list[str]] = []
+
+    def mine(self, *hashes: str, status: int = 1) -> None:
+        """Mine the transactions in the next block."""
+        self.block += 1
+        for tx_hash in hashes:
+            self.receipts[tx_hash] = {"transactionHash": tx_hash, "blockNumber": self.block, "status": status}
+
+    def fetch(self, hashes: list[str], accounts: list[str]) -> tuple[dict, dict]:
+        """Read the receipts and mined nonces in one batch."""
+        self.batches.append(hashes)
+        return {tx_hash: self.receipts.get(tx_hash) for tx_hash in hashes}, dict.fromkeys(accounts, self.mined_nonce)
+
+
+async def inline(func, *args):
+    """Run a blocking call inline."""
+    return func(*args)
+
+
+class TestReceiptWatcher:
+    """Tests for resolving receipts once per block."""
+
+    def setup_method(self) -> None:
+        """Set up a watcher over the fake chain."""
+        self.chain = FakeChain()
+        self.clock = FakeClock()
+        self.watcher = ReceiptWatcher(
+            lambda: self.chain.block,
+            self.chain.fetch,
+            logging.getLogger(__name__),
+            poll_interval=0,
+            timeout=30,
+            run_blocking=inline,
+            clock=self.clock,
+        )
+
+    def test_pending_receipts_are_read_in_one_batch_per_block(self) -> None:
+        """Every pending transaction is read in the same batch, only when the head moves."""
+
+        async def run():
+            waiters = [asyncio.create_task(self.watcher.wait(tx_hash)) for tx_hash in ("0xa", "0xb", "0xc")]
+            for _ in range(5):
+                await asyncio.sleep(0)
+            self.chain.mine("0xa", "0xb")
+            self.chain.block += 1
+            self.chain.mine("0xc", status=0)
+            return await asyncio.gather(*waiters)
+
+        receipts = asyncio.run(run())
+        assert [receipt["blockNumber"] for receipt in receipts] == [101, 101, 103]
+        assert self.chain.batches[0] == ["0xa", "0xb", "0xc"]
+        assert len(self.chain.batches) <= 4
+        stats = self.watcher.get_stats()
+        assert (stats["receipts"], stats["failed"], stats["pending"]) == (3, 1, 0)
+        assert stats["max_latency_blocks"] == 3
+
+    def test_replaced_transactions_fail(self) -> None:
+        """A transaction whose nonce was mined without it was replaced."""
+
+        async def run():
+            waiter = asyncio.create_task(self.watcher.wait("0xa", ADDRESS, nonce=4))
+            await asyncio.sleep(0)
+            self.chain.block += 1
+            self.chain.mined_nonce = 5
+            await waiter
+
+        with pytest.raises(TransactionReplaced):
+            asyncio.run(run())
+        assert self.watcher.get_stats()["replaced"] == 1
+
+    def test_unmined_transactions_time_out(self) -> None:
+        """A transaction still pending after its timeout fails its waiter."""
+
+        async def run():
+            waiter = asyncio.create_task(self.watcher.wait("0xa", timeout=10))
+            await asyncio.sleep(0)
+            self.clock.now += 10
+            await waiter
+
+        with pytest.raises(RequestTimeout):
+            asyncio.run(run())
+        assert self.watcher.get_stats()["timeouts"] == 1
+
+
+class FakeProvider:
+    """A provider answering a JSON-RPC batch."""
+
+    def __init__(self, results: list) -> None:
+        """Answer with the results in order."""
+        self.results = results
+        self.requests: list = []
+
+    def make_batch_request(self, requests: list) -> list[dict]:
+        """Record the batch and answer it."""
+        self.requests = requests
+        return [{"jsonrpc": "2.0", "id": i, "result": result} for i, result in enumerate(self.results)]
+
+
+def test_fetch_receipts_decodes_the_batch() -> None:
+    """Receipts and nonces are read in a single batch and their quantities decoded."""
+    provider = FakeProvider([{"status": "0x1", "blockNumber": "0x65", "gasUsed": "0x5208"}, None, "0x7"])
+    receipts, counts = fetch_receipts(provider, ["0xa", "0xb"], [ADDRESS])
+    assert [method for method, _ in provider.requests] == [
+        "eth_getTransactionReceipt",
+        "eth_getTransactionReceipt",
+        "eth_getTransactionCount",
+    ]
+    assert receipts == {"0xa": {"status": 1, "blockNumber": 101, "gasUsed": 21000}, "0xb": None}
+    assert counts == {ADDRESS: 7}
@@ -0,0 +1,78 @@
+"""Tests for the in-flight request registry."""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+
+from packages.eightballer.connections.dcxt.registry import InFlightRegistry, percentile
+
+
+def make_envelope(performative: str, dialogue_reference: str = "1") -> MagicMock:
+    """Make an envelope carrying a message with the given performative."""
+    envelope = MagicMock()
+    envelope.message.performative.value = performative
+    envelope.message.dialogue_reference = (dialogue_reference, "")
+    return envelope
+
+
+def test_percentile() -> None:
+    """Nearest-rank percentiles."""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) == 0
+
+
+@pytest.mark.asyncio
+class TestInFlightRegistry:
+    """Tests for the in-flight request registry."""
+
+    def setup_method(self) -> None:
+        """Set up the registry."""
+        self.registry = InFlightRegistry(request_timeout=0.01)
+
+    async def test_deadline_cancels_request(self) -> None:
+        """A request still running after its deadline is cancelled and flagged as expired."""
+        task = asyncio.ensure_future(asyncio.sleep(1))
+        self.registry.add(task, make_envelope("get_all_tickers"))
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert self.registry.is_expired(task)
+        request = self.registry.pop(task)
+        assert request.expired
+        assert len(self.registry) == 0
+        assert self.registry.get_stats()["expired"] == 1
+
+    async def test_orders_have_no_deadline_by_default(self) -> None:
+        """Requests that may have submitted a transaction are not cancelled."""
+        task = asyncio.ensure_future(asyncio.sleep(0.05))
+        request = self.registry.add(task, make_envelope("create_order"))
+        assert request.timeout is None
+        await task
+        assert not self.registry.is_expired(task)
+
+    async def test_cancel_by_dialogue(self) -> None:
+        """Only the requests of the given dialogue are cancelled and marked."""
+        cancelled = asyncio.ensure_future(asyncio.sleep(1))
+        kept = asyncio.ensure_future(asyncio.sleep(1))
+        self.registry.add(cancelled, make_envelope("create_order", "a"))
+        self.registry.add(kept, make_envelope("create_order", "b"))
+        assert self.registry.cancel_by_dialogue("a") == 1
+        assert self.registry.cancel_by_dialogue("c") == 0
+        await asyncio.sleep(0)
+        assert cancelled.cancelled()
+        assert not kept.done()
+        assert self.registry.pop(cancelled).cancelled
+        assert self.registry.get_stats()["cancelled"] == 1
+        self.registry.cancel_all()
+
+    async def test_cancel_all(self) -> None:
+        """Every request still running is cancelled and counted."""
+        tasks = [asyncio.ensure_future(asyncio.sleep(1)) for _ in range(2)]
+        for dialogue, task in zip("ab", tasks, strict=True):
+            self.registry.add(task, make_envelope("create_order", dialogue))
+        self.registry.cancel_all()
+        await asyncio.sleep(0)
+        assert all(task.cancelled() for task in tasks)
+        assert self.registry.get_stats()["cancelled"] == 2
@@ -0,0 +1,74 @@
+"""Tests for the RPC pool."""
+
+import time
+
+import pytest
+import requests
+
+from packages.eightballer.connections.dcxt.dcxt.rpc_pool import RpcPool
+
+
+class FakeProvider:
+    """An endpoint answering with a fixed block number, optionally slowly or not at all."""
+
+    def __init__(self, block_number: int, delay: float = 0.0, fail: bool = False) -> None:
+        """Initialise the endpoint."""
+        self.block_number = block_number
+        self.delay = delay
+        self.fail = fail
+        self.methods = []
+
+    def make_request(self, method, params):
+        """Answer a request."""
+        del params
+        self.methods.append(method)
+        time.sleep(self.delay)
+        if self.fail:
+            msg = "endpoint down"
+            raise requests.exceptions.ConnectionError(msg)
+        return {"jsonrpc": "2.0", "id": 1, "result": hex(self.block_number)}
+
+
+def make_pool(*providers: FakeProvider, **kwargs) -> RpcPool:
+    """Make a pool over the fake endpoints."""
+    by_url = {f"https://rpc-{index}.example": provider for index, provider in enumerate(providers)}
+    return RpcPool(by_url, make_provider=by_url.__getitem__, **kwargs)
+
+
+def test_failed_reads_move_on_and_the_endpoint_cools_down() -> None:
+    """A failing endpoint is skipped at once, then ranked last."""
+    down, healthy = FakeProvider(1, fail=True), FakeProvider(2)
+    pool = make_pool(down, healthy)
+    assert pool.web3().eth.block_number == 2
+    assert pool.web3().eth.block_number == 2
+    assert len(down.methods) == 1
+    assert pool.get_stats()["failovers"] == 1
+
+
+def test_slow_reads_are_hedged() -> None:
+    """A read slower than the hedge delay is raced against the next endpoint."""
+    slow, fast = FakeProvider(1, delay=0.5), FakeProvider(2)
+    pool = make_pool(slow, fast, hedge_delay=0.01)
+    assert pool.make_request("eth_blockNumber", [])["result"] == hex(2)
+    stats = pool.get_stats()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+    pool.close()
+
+
+def test_writes_stick_to_the_primary() -> None:
+    """Writes keep going to the primary while it is healthy, however fast the others are."""
+    primary, other = FakeProvider(1, delay=0.02), FakeProvider(2)
+    pool = make_pool(primary, other, hedge=False)
+    for _ in range(3):
+        pool.make_request("eth_blockNumber", [])
+        pool.make_request("eth_sendRawTransaction", ["0x00"])
+    assert primary.methods.count("eth_sendRawTransaction") == 3
+    assert "eth_sendRawTransaction" not in other.methods
+    assert pool.get_stats()["primary"] == "rpc-0.example"
+
+
+def test_a_pool_needs_an_endpoint() -> None:
+    """An empty pool is a configuration error."""
+    with pytest.raises(ValueError):
+        RpcPool([])
@@ -0,0 +1,125 @@
+"""Tests for the request scheduler."""
+
+import asyncio
+
+import pytest
+
+from packages.eightballer.connections.dcxt.scheduler import (
+    RequestPriority,
+    RequestScheduler,
+    get_exchange_key,
+)
+from packages.eightballer.connections.dcxt.tests.helpers import FakeClock
+from packages.eightballer.connections.dcxt.dcxt.rate_limit import TokenBucket
+
+
+class FakeMessage:
+    """A request carrying only the given fields."""
+
+    def __init__(self, **fields) -> None:
+        """Hold the fields."""
+        self.fields = fields
+
+    def get(self, name: str):
+        """Get a field, None if not set."""
+        return self.fields.get(name)
+
+
+def test_token_bucket_refills() -> None:
+    """Tokens are consumed up to the burst and refilled at the configured rate."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.time_until_available() == pytest.approx(0.5)
+    clock.now = 0.5
+    assert bucket.try_acquire()
+
+
+@pytest.mark.asyncio
+class TestRequestScheduler:
+    """Tests for the request scheduler."""
+
+    async def test_orders_are_admitted_before_market_data(self) -> None:
+        """Once a slot frees up, the highest priority waiting request takes it."""
+        scheduler = RequestScheduler(max_concurrency=1)
+        await scheduler.acquire(RequestPriority.MARKET_DATA)
+        admitted = []
+
+        async def request(priority: RequestPriority) -> None:
+            await scheduler.acquire(priority)
+            admitted.append(priority)
+            scheduler.release()
+
+        tasks = [
+            asyncio.ensure_future(request(RequestPriority.MARKET_DATA)),
+            asyncio.ensure_future(request(RequestPriority.ACCOUNT)),
+            asyncio.ensure_future(request(RequestPriority.ORDER_PLACEMENT)),
+        ]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        assert admitted == [
+            RequestPriority.ORDER_PLACEMENT,
+            RequestPriority.ACCOUNT,
+            RequestPriority.MARKET_DATA,
+        ]
+
+    async def test_rate_limited_exchange_does_not_block_others(self) -> None:
+        """A throttled exchange waits for its bucket while other exchanges are admitted."""
+        limited = ("ethereum", "one_inch")
+        scheduler = RequestScheduler(rate_limits={limited: TokenBucket(rate=20, burst=1)})
+        await scheduler.acquire(RequestPriority.ORDER_PLACEMENT, limited)
+
+        throttled = asyncio.ensure_future(scheduler.acquire(RequestPriority.ORDER_PLACEMENT, limited))
+        await asyncio.sleep(0)
+        assert not throttled.done()
+        await asyncio.wait_for(scheduler.acquire(RequestPriority.MARKET_DATA, ("ethereum", "balancer")), timeout=0.01)
+
+        await asyncio.wait_for(throttled, timeout=1)
+        # counted once, however many dispatch passes it stayed blocked for.
+        assert scheduler.get_stats()["throttled"] == 1
+        assert scheduler.active == 3
+
+    async def test_cancelled_request_is_dropped(self) -> None:
+        """A request cancelled while waiting never takes a slot."""
+        scheduler = RequestScheduler(max_concurrency=1)
+        await scheduler.acquire(RequestPriority.ACCOUNT)
+        waiting = asyncio.ensure_future(scheduler.acquire(RequestPriority.ACCOUNT))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        scheduler.release()
+        assert scheduler.active == 0
+        assert scheduler.queue_depth == 0
+
+    async def test_from_config(self) -> None:
+        """Rate limits are read from the exchange entries."""
+        scheduler = RequestScheduler.from_config(
+            {"max_concurrency": 4},
+            [
+                {"name": "one_inch", "ledger_id": "ethereum", "rate_limit": {"rate": 1, "burst": 1}},
+                {"name": "balancer", "ledger_id": "ethereum"},
+            ],
+        )
+        assert scheduler.max_concurrency == 4
+        assert list(scheduler.rate_limits) == [("ethereum", "one_inch")]
+
+    async def test_requests_without_a_ledger_use_the_configured_one(self) -> None:
+        """Requests naming only the exchange are keyed by its ledger, so its rate limit applies."""
+        scheduler = RequestScheduler.from_config(
+            {},
+            [
+                {"name": "one_inch", "ledger_id": "ethereum", "rate_limit": {"rate": 1, "burst": 1}},
+                {"name": "balancer", "ledger_id": "ethereum"},
+                {"name": "balancer", "ledger_id": "gnosis"},
+            ],
+        )
+        assert get_exchange_key(FakeMessage(exchange_id="one_inch"), scheduler.exchange_ledgers) == (
+            "ethereum",
+            "one_inch",
+        )
+        # an exchange on several ledgers cannot be resolved without one.
+        assert get_exchange_key(FakeMessage(exchange_id="balancer"), scheduler.exchange_ledgers) == (None, "balancer")
+        assert get_exchange_key(FakeMessage(exchange_id="balancer", ledger_id="gnosis")) == ("gnosis", "balancer")
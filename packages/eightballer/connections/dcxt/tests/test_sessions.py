@@ -0,0 +1,88 @@
+"""Tests for the shared HTTP sessions."""
+
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.sessions import SessionPool
+
+
+def handle(request: httpx.Request) -> httpx.Response:
+    """Answer JSON-RPC requests with a block number and anything else with the path."""
+    if request.method == "POST":
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": "0x10"})
+    return httpx.Response(200, json={"path": request.url.path})
+
+
+def test_one_client_per_host() -> None:
+    """Requests to the same host share a client, other hosts get their own."""
+    sessions = SessionPool(transport=httpx.MockTransport(handle))
+
+    async def run():
+        await sessions.get("https://api.example/a")
+        await sessions.get("https://api.example/b")
+        await sessions.get("https://other.example/c")
+        clients = {origin: session.client for origin, session in sessions._sessions.items()}
+        await sessions.close()
+        return clients
+
+    clients = asyncio.run(run())
+    assert set(clients) == {"https://api.example", "https://other.example"}
+    assert all(client.is_closed for client in clients.values())
+
+
+def test_clients_are_closed_with_their_loop() -> None:
+    """Clients of a loop are closed when it shuts down, and the next loop gets its own."""
+    sessions = SessionPool(transport=httpx.MockTransport(handle))
+
+    async def run():
+        await sessions.get("https://api.example/a")
+        return sessions.session("https://api.example").client
+
+    first = asyncio.run(run())
+    assert first.is_closed
+    second = asyncio.run(run())
+    assert second is not first
+    assert second.is_closed
+
+
+def test_closing_a_loop_with_open_clients_fails_loudly() -> None:
+    """Clients left open on a closed loop can no longer be closed, so the next loop refuses to start."""
+    sessions = SessionPool(transport=httpx.MockTransport(handle))
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(sessions.get("https://api.example/a"))
+    loop.close()
+    with pytest.raises(RuntimeError, match="close\\(\\) the pool"):
+        asyncio.run(sessions.get("https://api.example/a"))
+
+
+def test_concurrency_is_bounded_per_host() -> None:
+    """No more than the host limit of requests run at once."""
+
+    async def slow(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        return handle(request)
+
+    sessions = SessionPool(host_limits={"api.example": 2}, transport=httpx.MockTransport(slow))
+
+    async def run():
+        await asyncio.gather(*(sessions.get(f"https://api.example/{index}") for index in range(6)))
+        return sessions.get_stats()["https://api.example"]
+
+    stats = asyncio.run(run())
+    assert stats["requests"] == 6
+    assert stats["max_in_flight"] == 2
+
+
+def test_async_web3_goes_through_the_pool() -> None:
+    """The AsyncWeb3 provider sends its requests through the pooled client."""
+    sessions = SessionPool(transport=httpx.MockTransport(handle))
+
+    async def run():
+        return await sessions.async_web3("https://rpc.example").eth.block_number
+
+    assert asyncio.run(run()) == 16
+    assert sessions.get_stats()["https://rpc.example"]["requests"] == 1
@@ -0,0 +1,86 @@
+"""Tests for the single flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from packages.eightballer.protocols.balances.message import BalancesMessage
+from packages.eightballer.connections.dcxt.single_flight import SingleFlight, get_request_key
+
+
+def make_balances_request(ledger_id: str, performative=BalancesMessage.Performative.GET_ALL_BALANCES):
+    """Make a balances request."""
+    return BalancesMessage(performative=performative, exchange_id="balancer", ledger_id=ledger_id, params={})
+
+
+def test_request_key() -> None:
+    """Identical reads share a key, other requests are not coalesced."""
+    assert get_request_key(make_balances_request("base")) == get_request_key(make_balances_request("base"))
+    assert get_request_key(make_balances_request("base")) != get_request_key(make_balances_request("gnosis"))
+    error = BalancesMessage(
+        performative=BalancesMessage.Performative.ERROR,
+        error_code=BalancesMessage.ErrorCode.API_ERROR,
+        error_msg="",
+        error_data={},
+    )
+    assert get_request_key(error) is None
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Tests for the single flight group."""
+
+    async def test_identical_calls_are_shared(self) -> None:
+        """Concurrent calls with the same key run once."""
+        group = SingleFlight()
+        calls = 0
+
+        async def fetch() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(group.do("key", fetch) for _ in range(3)))
+        assert calls == 1
+        assert sorted(shared for _, shared in results) == [False, True, True]
+        assert {result for result, _ in results} == {"result"}
+
+    async def test_errors_are_shared(self) -> None:
+        """Followers see the error of the leading call."""
+        group = SingleFlight()
+
+        async def fail() -> None:
+            await asyncio.sleep(0.01)
+            msg = "boom"
+            raise ValueError(msg)
+
+        results = await asyncio.gather(group.do("key", fail), group.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        assert group.get_stats()["calls"] == 1
+
+    async def test_follower_takes_over_cancelled_leader(self) -> None:
+        """When the leading call is cancelled, a follower makes the call itself."""
+        group = SingleFlight()
+
+        async def fetch() -> str:
+            await asyncio.sleep(0.01)
+            return "result"
+
+        leader = asyncio.ensure_future(group.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == ("result", False)
+
+    async def test_ttl_reuses_recent_results(self) -> None:
+        """Results are reused within the ttl."""
+        group = SingleFlight(ttl=60)
+
+        async def fetch() -> str:
+            return "result"
+
+        assert await group.do("key", fetch) == ("result", False)
+        assert await group.do("key", fetch) == ("result", True)
+        assert group.get_stats()["cached"] == 1
@@ -0,0 +1,39 @@
+"""Tests for the token index."""
+
+import pytest
+
+from packages.eightballer.connections.dcxt.dcxt.data.tokens import TokenIndex, get_token_index
+
+
+TOKENS = [
+    {"address": "0xA0b86991c6218b36c1d19D4a2e9Eb0cE3606eB48", "symbol": "USDC", "name": "USD Coin", "decimals": 6},
+    {"address": "0x0000000000000000000000000000000000000001", "symbol": "usdc", "name": "Fake", "decimals": 6},
+    {"address": "0x0000000000000000000000000000000000000002", "symbol": "USDC", "name": "Bridged", "decimals": 6},
+]
+
+
+class TestTokenIndex:
+    """Tests for the token index."""
+
+    def setup_method(self) -> None:
+        """Set up an index over colliding symbols."""
+        self.index = TokenIndex.build(1, TOKENS)
+
+    def test_address_lookup_ignores_case(self) -> None:
+        """Addresses resolve whatever their checksum casing."""
+        assert self.index.get_by_address(TOKENS[0]["address"].lower())["name"] == "USD Coin"
+        assert self.index.get_by_address("0xdead") is None
+
+    def test_symbol_lookup_prefers_exact_case_then_file_order(self) -> None:
+        """Colliding symbols keep the token list order, with an exact-case match winning."""
+        assert len(self.index.get_all_by_symbol("Usdc")) == 3
+        assert self.index.get_by_symbol("usdc")["name"] == "Fake"
+        assert self.index.get_by_symbol("USDC")["name"] == "USD Coin"
+        assert self.index.get_by_symbol("Usdc")["name"] == "USD Coin"
+
+
+def test_indexes_are_built_once() -> None:
+    """The shipped token list is parsed once and shared."""
+    assert get_token_index(1) is get_token_index(1)
+    with pytest.raises(ValueError):
+        get_token_index(-1)
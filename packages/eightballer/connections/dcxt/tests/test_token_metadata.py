@@ -0,0 +1,99 @@
+"""Tests for the token metadata resolver."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+from eth_abi import encode
+
+from packages.eightballer.connections.dcxt.dcxt.exceptions import UnsupportedAsset
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import (
+    TokenMetadataStore,
+    TokenMetadataResolver,
+    decode_text,
+    read_token_metadata,
+)
+
+
+KNOWN = "0x0001A500A6B18995B03f44bb040A5fFc28E45CB0"
+UNKNOWN = "0x4200000000000000000000000000000000000006"
+NOT_A_TOKEN = "0x000000000000000000000000000000000000dEaD"
+TOKEN_METADATA = "packages.eightballer.connections.dcxt.dcxt.token_metadata"
+
+
+def test_decode_text() -> None:
+    """Both string and bytes32 return values are decoded."""
+    assert decode_text(encode(["string"], ["Wrapped Ether"])) == "Wrapped Ether"
+    assert decode_text(b"MKR".ljust(32, b"\x00")) == "MKR"
+
+
+def test_read_token_metadata() -> None:
+    """Name, symbol and decimals are read in one call, with non-tokens reported as failed."""
+    results = [
+        [
+            (False, b""),
+            (True, b"MKR".ljust(32, b"\x00")),
+            (True, encode(["uint8"], [18])),
+            (True, encode(["string"], ["Dead"])),
+            (False, b""),
+            (False, b""),
+        ]
+    ]
+    with patch(f"{TOKEN_METADATA}.aggregate3", side_effect=results) as aggregate3:
+        batch = read_token_metadata(MagicMock(), [UNKNOWN.lower(), NOT_A_TOKEN, UNKNOWN])
+    assert len(aggregate3.call_args.args[1]) == 6
+    assert batch.tokens[UNKNOWN].symbol == "MKR"
+    assert batch.tokens[UNKNOWN].name == ""
+    assert batch.failed == (NOT_A_TOKEN,)
+
+
+class TestTokenMetadataResolver:
+    """Tests for the token metadata resolver."""
+
+    def setup_method(self) -> None:
+        """Set up a resolver seeded with a single token."""
+        self.seed = {KNOWN: {"address": KNOWN, "symbol": "OLAS", "name": "Autonolas", "decimals": 18}}
+
+    def make_resolver(self, tmp_path) -> TokenMetadataResolver:
+        """Make a resolver persisting to a temporary store."""
+        return TokenMetadataResolver(MagicMock(), 1, store=TokenMetadataStore(tmp_path / "tokens.json"), seed=self.seed)
+
+    def test_known_tokens_are_served_from_memory(self, tmp_path) -> None:
+        """Seeded tokens never touch the chain."""
+        resolver = self.make_resolver(tmp_path)
+        with patch(f"{TOKEN_METADATA}.aggregate3") as aggregate3:
+            assert resolver.resolve_one(KNOWN.lower()).symbol == "OLAS"
+        aggregate3.assert_not_called()
+
+    def test_unknown_tokens_are_batched_and_persisted(self, tmp_path) -> None:
+        """Unknown tokens are resolved in one batch and survive a restart."""
+        results = [
+            [
+                (True, encode(["string"], ["Wrapped Ether"])),
+                (True, encode(["string"], ["WETH"])),
+                (True, encode(["uint8"], [18])),
+                (False, b""),
+                (False, b""),
+                (False, b""),
+            ],
+            [(False, b"")] * 3,
+        ]
+        resolver = self.make_resolver(tmp_path)
+        with patch(f"{TOKEN_METADATA}.aggregate3", side_effect=results) as aggregate3:
+            tokens = resolver.resolve([UNKNOWN, NOT_A_TOKEN, KNOWN])
+            with pytest.raises(UnsupportedAsset):
+                resolver.resolve_one(NOT_A_TOKEN)
+        assert tokens[UNKNOWN].symbol == "WETH"
+        assert NOT_A_TOKEN not in tokens
+        assert len(aggregate3.call_args_list[0].args[1]) == 6
+
+        restarted = TokenMetadataResolver(MagicMock(), 1, store=TokenMetadataStore(tmp_path / "tokens.json"))
+        assert restarted.get(UNKNOWN).decimals == 18
+
+    def test_resolvers_are_shared_per_chain_and_store(self, tmp_path, monkeypatch) -> None:
+        """Exchanges on a chain share the resolver of their store, however its path is spelt."""
+        monkeypatch.chdir(tmp_path)
+        resolver = TokenMetadataResolver.for_chain(MagicMock(), 1, store_path="tokens.json", seed=self.seed)
+        assert TokenMetadataResolver.for_chain(MagicMock(), 1, store_path=tmp_path / "tokens.json") is resolver
+        assert TokenMetadataResolver.for_chain(MagicMock(), 1, store_path=tmp_path / "other.json") is not resolver
+        assert TokenMetadataResolver.for_chain(MagicMock(), 100, store_path="tokens.json") is not resolver
+        assert resolver.store.path == tmp_path / "tokens.json"
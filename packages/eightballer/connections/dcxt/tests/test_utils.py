@@ -0,0 +1,77 @@
+"""Tests for the contract cache."""
+
+import gc
+import weakref
+from unittest.mock import MagicMock, patch
+
+from web3 import Web3
+from eth_utils.abi import function_abi_to_4byte_selector
+from aea.configurations.base import PublicId
+
+from packages.eightballer.connections.dcxt import utils
+from packages.eightballer.connections.dcxt.utils import ContractCache
+from packages.eightballer.connections.dcxt.dcxt.approvals import ALLOWANCE_SELECTOR
+from packages.eightballer.connections.dcxt.dcxt.portfolio import BALANCE_OF_SELECTOR
+from packages.eightballer.connections.dcxt.dcxt.nabla_depth import QUOTE_WITH_REFERENCE_PRICE
+from packages.eightballer.connections.dcxt.dcxt.token_metadata import DECIMALS_SELECTOR
+
+
+NABLA_QUOTE = PublicId.from_str("dakavon/nabla_quote:0.1.0")
+ADDRESS = "0x0000000000000000000000000000000000001234"
+
+
+def make_ledger_api() -> MagicMock:
+    """Make a ledger api over an offline web3 instance."""
+    ledger_api = MagicMock()
+    ledger_api.identifier = "ethereum"
+    ledger_api.api = Web3()
+    ledger_api.get_contract_instance.side_effect = lambda interface, address: ledger_api.api.eth.contract(
+        address=address, abi=interface["abi"]
+    )
+    return ledger_api
+
+
+def test_packages_are_loaded_once() -> None:
+    """The package configuration is read from disk on first use only."""
+    cache = ContractCache()
+    with patch.object(utils, "load_component_configuration", wraps=utils.load_component_configuration) as load:
+        assert cache.load(NABLA_QUOTE) is cache.load(str(NABLA_QUOTE))
+    assert load.call_count == 1
+
+
+def test_instances_are_memoised_per_address() -> None:
+    """The contract object of an address is built once per ledger api."""
+    cache = ContractCache()
+    ledger_api = make_ledger_api()
+    instance = cache.get_instance(NABLA_QUOTE, ledger_api, ADDRESS)
+    assert cache.get_instance(NABLA_QUOTE, ledger_api, ADDRESS.lower()) is instance
+    assert cache.get_instance(NABLA_QUOTE, ledger_api, "0x0000000000000000000000000000000000005678") is not instance
+    assert cache.get_instance(NABLA_QUOTE, make_ledger_api(), ADDRESS) is not instance
+    assert ledger_api.get_contract_instance.call_count == 2
+    # the package's own classes are left as they are.
+    assert cache.load(NABLA_QUOTE).get_instance(ledger_api, ADDRESS) is not instance
+
+
+def test_instances_are_dropped_with_their_ledger_api() -> None:
+    """The cached contract objects keep neither their ledger api nor its web3 instance alive."""
+    cache = ContractCache()
+    ledger_api = make_ledger_api()
+    cache.get_instance(NABLA_QUOTE, ledger_api, ADDRESS)
+    dropped = weakref.ref(ledger_api), weakref.ref(ledger_api.api)
+    del ledger_api
+    # web3 builds a class per contract function, freed over successive collections.
+    for _ in range(3):
+        gc.collect()
+    assert [ref() for ref in dropped] == [None, None]
+
+
+def test_selectors() -> None:
+    """Selectors computed from signatures match the package ABIs."""
+    abi = ContractCache().load(NABLA_QUOTE).contract_interface["ethereum"]["abi"]
+    [quote_with_reference_price] = [entry for entry in abi if entry.get("name") == "quoteWithReferencePrice"]
+    assert function_abi_to_4byte_selector(quote_with_reference_price) == QUOTE_WITH_REFERENCE_PRICE
+    assert [bytes.fromhex(selector) for selector in ("dd62ed3e", "70a08231", "313ce567")] == [
+        ALLOWANCE_SELECTOR,
+        BALANCE_OF_SELECTOR,
+        DECIMALS_SELECTOR,
+    ]
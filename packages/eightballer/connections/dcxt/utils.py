@@ -1,27 +1,83 @@
 """Utils for the DCXT package."""
 
-from typing import cast
+import weakref
+import threading
+from typing import Any, cast
 from pathlib import Path
 
+from web3 import Web3
 from aea.contracts.base import Contract, contract_registry
 from aea.configurations.base import PublicId
 from aea.configurations.loader import ComponentType, ContractConfig, load_component_configuration
 from aea.configurations.constants import CONTRACTS
 
 
+class ContractCache:
+    """Contract packages and web3 contract objects, each built once per process.
+
+    Contract packages are loaded from disk on first use. The web3 contract
+    objects are kept per ledger api and address, and dropped along with the
+    ledger api; they only reference its web3 instance, not the ledger api.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the cache."""
+        self._lock = threading.RLock()
+        self._contracts: dict[str, Contract] = {}
+        self._instances: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def load(self, public_id: PublicId | str) -> Contract:
+        """Get the contract of a package, loading it from disk on first use."""
+        key = str(public_id)
+        contract = self._contracts.get(key)
+        if contract is not None:
+            return contract
+        with self._lock:
+            if key not in self._contracts:
+                self._contracts[key] = self._load(PublicId.from_str(key))
+            return self._contracts[key]
+
+    @staticmethod
+    def _load(public_id: PublicId) -> Contract:
+        is_built = Path("vendor").exists()
+        contract_path = (
+            (Path("packages") / public_id.author / CONTRACTS / public_id.name)
+            if not is_built
+            else Path("vendor") / public_id.author / CONTRACTS / public_id.name
+        )
+        configuration = cast(
+            ContractConfig,
+            load_component_configuration(ComponentType.CONTRACT, contract_path),
+        )
+        configuration._directory = contract_path  # noqa
+        if str(configuration.public_id) not in contract_registry.specs:
+            Contract.from_config(configuration)
+        return contract_registry.make(str(configuration.public_id))
+
+    def get_instance(self, public_id: PublicId | str, ledger_api: Any, contract_address: str | None = None) -> Any:
+        """Get the web3 contract object of a package's contract at an address, building it on first use."""
+        contract = self.load(public_id)
+        key = (str(public_id), contract_address and contract_address.lower())
+        with self._lock:
+            instances = self._instances.setdefault(ledger_api, {})
+            if key not in instances:
+                instances[key] = contract.get_instance(ledger_api, contract_address)
+            return instances[key]
+
+
+CONTRACT_CACHE = ContractCache()
+
+
 def load_contract(public_id: PublicId):
-    """Load the contract from the path."""
-    is_built = Path("vendor").exists()
-    contract_path = (
-        (Path("packages") / public_id.author / CONTRACTS / public_id.name)
-        if not is_built
-        else Path("vendor") / public_id.author / CONTRACTS / public_id.name
-    )
-    configuration = cast(
-        ContractConfig,
-        load_component_configuration(ComponentType.CONTRACT, contract_path),
-    )
-    configuration._directory = contract_path  # noqa
-    if str(configuration.public_id) not in contract_registry.specs:
-        Contract.from_config(configuration)
-    return contract_registry.make(str(configuration.public_id))
+    """Load the contract from the path, once per process."""
+    return CONTRACT_CACHE.load(public_id)
+
+
+def contract_instance(public_id: PublicId | str, ledger_api: Any, contract_address: str | None = None) -> Any:
+    """Get the web3 contract object of a contract package at an address, once per ledger api."""
+    return CONTRACT_CACHE.get_instance(public_id, ledger_api, contract_address)
+
+
+def function_selector(signature: str) -> bytes:
+    """Get the 4-byte selector of a function signature, e.g. `balanceOf(address)`."""
+    return bytes(Web3.keccak(text=signature)[:4])